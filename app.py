@@ -43,10 +43,11 @@ if config.MODE == 'hub':
     
     # 导入集线器相关模块 -> 集线器类和处理程序注册函数
     from core.hub import Hub
+    from core.hub_shards import ShardedHub
     from core.hub_handlers import register_hub_handlers
     
-    # 创建集线器实例并注册处理程序
-    hub = Hub(config.NODE_URLS)
+    # 创建集线器实例并注册处理程序（HUB_WORKERS > 0 时由多个工作进程接收节点数据）
+    hub = ShardedHub(config.NODE_URLS) if config.HUB_WORKERS > 0 else Hub(config.NODE_URLS)
     register_hub_handlers(app, hub)
     monitor_or_hub = hub
 
@@ -57,7 +58,7 @@ else:
     
     # 导入监控相关模块 -> GPU监控器和处理程序注册函数
     from core.monitor import GPUMonitor
-    from core.handlers import register_handlers
+    from core.handlers import register_handlers, current_gpu_data
     
     # 创建GPU监控器实例并注册处理程序
     monitor = GPUMonitor()
@@ -83,7 +84,12 @@ async def api_gpu_data():
     
     # 默认监控模式下返回GPU数据
     if hasattr(monitor_or_hub, 'get_gpu_data'):
-        return {"gpus": await monitor_or_hub.get_gpu_data(), "timestamp": "async"}
+        # 快速轮询时返回最近发布的 tick，否则采集一次
+        gpu_data = await current_gpu_data(monitor_or_hub)
+        # 合并缓存的静态信息，使 REST 接口返回完整的 GPU 数据
+        static_info = monitor_or_hub.get_static_info()
+        gpus = {gpu_id: {**static_info.get(gpu_id, {}), **gpu} for gpu_id, gpu in gpu_data.items()}
+        return {"gpus": gpus, "timestamp": "async"}
     
     # 如果没有数据则返回空
     return {"gpus": {}, "timestamp": "no_data"}
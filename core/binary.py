@@ -0,0 +1,168 @@
+"""紧凑的列式二进制帧格式（?protocol=binary）
+
+数值字段的 schema 只发送一次（文本消息）：
+
+    {'type': 'binary_schema', 'id': n, 'fields': [[name, typecode], ...]}
+
+之后每帧为一条二进制消息（小端序）：
+
+    header   : magic 'GH', version u8, reserved u8, schema_id u16,
+               gpu_count u16, seq u32, trailer_len u32
+    trailer  : JSON（gpu_ids、每个 GPU 的非数值字段以及帧的其余部分）
+    columns  : 按 schema 顺序，每个字段一列，包含 gpu_count 个值
+
+typecode 为 'i'（int32）、'f'（float32）或 'd'（float64）。缺失值用 NaN
+（int32 列用 INT32_MIN）表示。新字段出现或现有列放不下新值时，
+schema 会以新的 id 重新发送。
+"""
+
+import sys
+import json
+import math
+import struct
+from array import array
+
+MAGIC = b'GH'
+VERSION = 1
+HEADER = struct.Struct('<2sBBHHII')
+
+INT32_MISSING = -2 ** 31
+FLOAT32_EXACT = 2 ** 24  # 超过此值 float32 无法保留整数精度
+
+_WIDTH = {'i': 0, 'f': 1, 'd': 2}
+_BIG_ENDIAN = sys.byteorder == 'big'
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _typecode(value):
+    """能无损（float32 为 7 位有效数字）容纳 value 的最窄类型"""
+    if isinstance(value, int) and INT32_MISSING < value < 2 ** 31:
+        return 'i'
+    if abs(value) < FLOAT32_EXACT:
+        return 'f'
+    return 'd'
+
+
+def _fits(code, value):
+    return _WIDTH[_typecode(value)] <= _WIDTH[code] and not (code == 'i' and isinstance(value, float))
+
+
+def _missing(code):
+    return INT32_MISSING if code == 'i' else math.nan
+
+
+class BinaryEncoder:
+    """将 {'gpus': {...}, ...} 帧编码为列式二进制消息"""
+
+    def __init__(self):
+        self.schema_id = 0
+        self.fields = []  # [(name, typecode)]
+        self._positions = {}  # name -> 列位置
+        self.seq = 0
+
+    def schema_message(self):
+        """当前 schema 的文本消息"""
+        return {'type': 'binary_schema', 'id': self.schema_id, 'fields': [list(f) for f in self.fields]}
+
+    def _update_schema(self, gpus):
+        """为新字段添加列、为放不下的值加宽列类型，返回 schema 是否变化"""
+        codes = dict(self.fields)
+        changed = False
+        for gpu in gpus.values():
+            for key, value in gpu.items():
+                if not _is_number(value) or (isinstance(value, float) and math.isnan(value)):
+                    continue
+                code = codes.get(key)
+                if code is None:
+                    codes[key] = _typecode(value)
+                    changed = True
+                elif not _fits(code, value):
+                    codes[key] = 'd' if _typecode(value) == 'd' else 'f'
+                    changed = True
+
+        if changed:
+            self.fields = list(codes.items())
+            self._positions = {name: i for i, (name, _) in enumerate(self.fields)}
+            self.schema_id = (self.schema_id + 1) % 65536
+        return changed
+
+    def encode(self, data):
+        """编码一帧，返回 (schema 是否变化, 二进制消息)"""
+        gpus = data.get('gpus') or {}
+        schema_changed = self._update_schema(gpus)
+        self.seq = (self.seq + 1) % 2 ** 32
+
+        gpu_ids = list(gpus)
+        count = len(gpu_ids)
+        columns = [[_missing(code)] * count for _, code in self.fields]
+        extras = {}
+
+        for row, gpu_id in enumerate(gpu_ids):
+            rest = {}
+            for key, value in gpus[gpu_id].items():
+                position = self._positions.get(key)
+                if position is not None and _is_number(value):
+                    if value == value:  # NaN 按缺失值处理
+                        columns[position][row] = value
+                else:
+                    rest[key] = value
+            extras[gpu_id] = rest
+
+        trailer = {key: value for key, value in data.items() if key != 'gpus'}
+        trailer['gpu_ids'] = gpu_ids
+        trailer['gpus'] = extras
+        trailer_bytes = json.dumps(trailer).encode('utf-8')
+
+        parts = [HEADER.pack(MAGIC, VERSION, 0, self.schema_id, count, self.seq, len(trailer_bytes)), trailer_bytes]
+        for (_, code), column in zip(self.fields, columns):
+            packed = array(code, column)
+            if _BIG_ENDIAN:
+                packed.byteswap()
+            parts.append(packed.tobytes())
+        return schema_changed, b''.join(parts)
+
+
+class BinaryDecoder:
+    """接收端：用最近的 schema 解码二进制帧"""
+
+    def __init__(self):
+        self.schema_id = None
+        self.fields = []
+
+    def set_schema(self, message):
+        self.schema_id = message['id']
+        self.fields = [tuple(field) for field in message['fields']]
+
+    def decode(self, payload):
+        """返回解码后的完整帧；schema 不匹配或格式错误时返回 None"""
+        magic, version, _, schema_id, count, _, trailer_len = HEADER.unpack_from(payload)
+        if magic != MAGIC or version != VERSION or schema_id != self.schema_id:
+            return None
+
+        offset = HEADER.size
+        trailer = json.loads(payload[offset:offset + trailer_len])
+        offset += trailer_len
+
+        gpu_ids = trailer.pop('gpu_ids')
+        gpus = trailer['gpus']
+        names = [name for name, _ in self.fields]
+        columns = []
+        for _, code in self.fields:
+            column = array(code)
+            size = column.itemsize * count
+            column.frombytes(payload[offset:offset + size])
+            offset += size
+            if _BIG_ENDIAN:
+                column.byteswap()
+            columns.append(column)
+
+        # 按行转置后用推导式构建，缺失值（NaN / INT32_MIN）被跳过
+        for gpu_id, row in zip(gpu_ids, zip(*columns)):
+            gpus[gpu_id].update({
+                name: value for name, value in zip(names, row)
+                if value == value and value != INT32_MISSING
+            })
+        return trailer
@@ -0,0 +1,192 @@
+"""WebSocket 广播 - 每帧只编码一次，通过每个客户端的有界队列并发发送"""
+
+import time
+import json
+import asyncio
+import logging
+from collections import deque
+
+from .config import BROADCAST_QUEUE_SIZE
+from .delta import DeltaEncoder
+from .binary import BinaryEncoder
+
+logger = logging.getLogger(__name__)
+
+
+class _Client:
+    """单个仪表盘客户端的发送队列和统计"""
+
+    def __init__(self, websocket, protocol):
+        self.websocket = websocket
+        self.protocol = protocol  # 'json'（完整帧）、'delta'（增量帧）或 'binary'（列式二进制帧）
+        self.needs_keyframe = True
+        self.schema_id = None  # 已发送给 binary 客户端的 schema
+        self.queue = deque()  # (text 或 bytes, 入队时间, 是否可丢弃)
+        self.ready = asyncio.Event()
+        self.task = None
+        self.sent = 0
+        self.dropped = 0
+        self.lag = 0.0  # 最近一帧从入队到发送完成的时间（秒）
+
+
+class Broadcaster:
+    """将帧广播给所有客户端，慢客户端丢弃过期帧（只保留最新的）"""
+
+    PROTOCOLS = ('json', 'delta', 'binary')
+
+    def __init__(self, queue_size=BROADCAST_QUEUE_SIZE, copy_frames=True):
+        self.queue_size = queue_size
+        self.clients = {}  # websocket -> _Client
+        self.delta = DeltaEncoder(copy_frames=copy_frames)
+        self.binary = BinaryEncoder()
+
+    def __len__(self):
+        return len(self.clients)
+
+    def __bool__(self):
+        return bool(self.clients)
+
+    def protocols(self):
+        """当前客户端使用的协议集合"""
+        return {client.protocol for client in self.clients.values()}
+
+    def add(self, websocket, protocol='json'):
+        """注册客户端并启动其发送任务"""
+        if protocol not in self.PROTOCOLS:
+            protocol = 'json'
+        client = _Client(websocket, protocol)
+        client.task = asyncio.create_task(self._sender(client))
+        self.clients[websocket] = client
+
+    def remove(self, websocket):
+        """注销客户端并停止其发送任务"""
+        client = self.clients.pop(websocket, None)
+        if client is None:
+            return
+        if client.task and client.task is not asyncio.current_task():
+            client.task.cancel()
+        if client.dropped:
+            logger.debug(f'客户端断开连接，共丢弃 {client.dropped} 帧')
+
+    def request_keyframe(self, websocket):
+        """客户端请求重新同步，下一帧发送关键帧"""
+        if client := self.clients.get(websocket):
+            client.needs_keyframe = True
+
+    def broadcast(self, message, droppable=True, text=None):
+        """每种格式只编码一次并放入每个客户端的队列
+
+        droppable=False 的帧（例如静态信息）不会因为客户端慢而被丢弃，
+        并且始终以完整 JSON 发送。text 为调用方预先序列化的 JSON（可选）
+        """
+        if not self.clients:
+            return
+        now = time.monotonic()
+
+        if not droppable:
+            text = message if isinstance(message, str) else json.dumps(message)
+            for client in self.clients.values():
+                client.queue.append((text, now, False))
+                client.ready.set()
+            return
+
+        protocols = self.protocols()
+        texts = {} if text is None else {'json': text}
+        delta = None
+        if 'delta' in protocols:
+            delta = self.delta.encode(message)
+        if 'binary' in protocols:
+            _, texts['binary'] = self.binary.encode(message)
+
+        def encoded(kind):
+            if kind not in texts:
+                if kind == 'json':
+                    texts[kind] = json.dumps(message)
+                elif kind == 'keyframe':
+                    texts[kind] = json.dumps(self.delta.keyframe())
+                elif kind == 'binary_schema':
+                    texts[kind] = json.dumps(self.binary.schema_message())
+                else:
+                    texts[kind] = json.dumps(delta)
+            return texts[kind]
+
+        for client in self.clients.values():
+            if self._drop_stale(client) and client.protocol == 'delta':
+                # 丢弃增量帧后客户端状态已失效，改为发送关键帧
+                client.needs_keyframe = True
+
+            if client.protocol == 'json':
+                text = encoded('json')
+            elif client.protocol == 'binary':
+                # schema 变化或新客户端：先发送 schema（不可丢弃）
+                if client.schema_id != self.binary.schema_id:
+                    client.schema_id = self.binary.schema_id
+                    client.queue.append((encoded('binary_schema'), now, False))
+                text = texts['binary']
+            elif client.needs_keyframe or delta is None:
+                client.needs_keyframe = False
+                text = encoded('keyframe')
+            else:
+                text = encoded('delta')
+
+            client.queue.append((text, now, True))
+            client.ready.set()
+
+    def _drop_stale(self, client):
+        """队列已满时丢弃过期帧（latest-wins），返回是否有帧被丢弃
+
+        完整帧客户端（json、binary）只丢弃最旧的帧；增量客户端丢弃所有排队的数据帧，
+        因为后续的增量帧已无法应用
+        """
+        pending = sum(1 for _, _, droppable in client.queue if droppable)
+        if pending < self.queue_size:
+            return False
+
+        drop = pending if client.protocol == 'delta' else pending - self.queue_size + 1
+        dropped = 0
+        for item in list(client.queue):
+            if dropped >= drop:
+                break
+            if item[2]:
+                client.queue.remove(item)
+                dropped += 1
+        client.dropped += dropped
+        return True
+
+    async def _sender(self, client):
+        """按顺序发送客户端队列中的帧，发送失败时移除客户端"""
+        try:
+            while True:
+                await client.ready.wait()
+                while client.queue:
+                    payload, enqueued_at, _ = client.queue.popleft()
+                    if isinstance(payload, bytes):
+                        await client.websocket.send_bytes(payload)
+                    else:
+                        await client.websocket.send_text(payload)
+                    client.lag = time.monotonic() - enqueued_at
+                    client.sent += 1
+                client.ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f'发送到客户端失败: {e}')
+            self.remove(client.websocket)
+
+    def stats(self):
+        """报告每个客户端的队列长度、已发送/丢弃帧数和延迟"""
+        now = time.monotonic()
+        result = []
+        for client in self.clients.values():
+            address = getattr(client.websocket, 'client', None)
+            oldest = client.queue[0][1] if client.queue else None
+            result.append({
+                'client': f'{address.host}:{address.port}' if address else 'unknown',
+                'protocol': client.protocol,
+                'queued': len(client.queue),
+                'sent': client.sent,
+                'dropped': client.dropped,
+                'lag_ms': round(client.lag * 1000, 1),
+                'pending_ms': round((now - oldest) * 1000, 1) if oldest is not None else 0.0,
+            })
+        return result
@@ -14,12 +14,112 @@ DEBUG = False
 # 监测配置
 UPDATE_INTERVAL = 0.5  # NVML 的更新间隔（亚秒监控）
 NVIDIA_SMI_INTERVAL = 2.0  # nvidia-smi 回退更新间隔（较慢以减少开销）
+STATIC_INFO_CHECK_INTERVAL = 60.0  # 检查驱动是否重新加载的间隔（静态信息缓存失效）
+DEVICE_CHECK_INTERVAL = 10.0  # 检查设备数量/句柄是否变化的间隔（热插拔）
+BROADCAST_QUEUE_SIZE = 2  # 每个客户端最多排队的数据帧数，超出时丢弃最旧的帧
+DELTA_KEYFRAME_INTERVAL = 20  # 增量协议（?protocol=delta）每隔多少帧发送一次完整关键帧
+PROCESS_REVALIDATE_INTERVAL = 30.0  # 缓存的进程元数据多久确认一次 create_time（检测 PID 复用）
+PROCESS_UTILIZATION_HOLD = 2.0  # 按进程的 GPU 利用率样本有效时长（驱动采样周期可能长于轮询间隔）
+NVML_FIELD_VALUES = True  # 用 nvmlDeviceGetFieldValues 批量读取功率/温度/ECC 等字段（不支持的字段自动回退）
+CAPABILITY_REFRESH_INTERVAL = 3600.0  # 每个设备不支持的 NVML 调用被跳过多久后重新探测（秒，驱动重新加载时立即重新探测）
+
+# NVML 采集线程：一个专用线程独占 NVML，每个 tick 一次收集所有 GPU 和进程
+# 可以通过环境变量设置 : NVML_COLLECTOR_THREAD=false 恢复每个 GPU 提交一次默认线程池
+NVML_COLLECTOR_THREAD = os.getenv('NVML_COLLECTOR_THREAD', 'true').lower() == 'true'
+
+# 设备看门狗：单个 GPU 的采集超过截止时间时不再等待它，使用最近的有效值（标记 stale），
+# 卡住或连续超时的 GPU 被隔离，按指数退避重新探测，其他 GPU 保持正常的轮询节奏
+GPU_COLLECT_TIMEOUT = 0.25       # 单个 GPU 一次采集的截止时间（秒），超过时这个 tick 使用 stale 值并记一次超时
+GPU_TIMEOUT_STRIKES = 3          # 连续超时多少次后隔离
+GPU_HANG_TIMEOUT = 2.0           # 调用超过该时间仍未返回视为卡住：立即隔离并替换采集线程（秒）
+GPU_REPROBE_MIN_INTERVAL = 5.0   # 隔离后第一次重新探测的等待时间（秒），之后每次失败加倍
+GPU_REPROBE_MAX_INTERVAL = 300.0 # 重新探测的最长间隔（秒）
+
+# NVML 事件（XID、ECC、降频）：专用线程等待事件并立即推送 'gpu_event' 消息
+# 可以通过环境变量设置 : NVML_EVENTS=false
+NVML_EVENTS = os.getenv('NVML_EVENTS', 'true').lower() == 'true'
+
+# 自适应轮询：没有仪表盘客户端时放慢（只有历史/导出器）或暂停（没有任何消费者），
+# 所有 GPU 空闲且读数稳定时逐步退避，利用率或功率变化时立即恢复 UPDATE_INTERVAL
+# 可以通过环境变量设置 : ADAPTIVE_POLLING=false 始终按固定间隔轮询
+ADAPTIVE_POLLING = os.getenv('ADAPTIVE_POLLING', 'true').lower() == 'true'
+POLL_BACKGROUND_INTERVAL = 2.0  # 没有仪表盘客户端、只有历史记录或 /metrics 抓取时的间隔（秒）
+POLL_IDLE_MAX_INTERVAL = 4.0    # GPU 空闲且读数稳定时退避到的最长间隔（秒）
+POLL_IDLE_UTILIZATION = 5.0     # 利用率不超过此值（%）视为空闲
+POLL_UTILIZATION_CHANGE = 5.0   # 利用率变化超过此值（百分点）时恢复快速轮询
+POLL_POWER_CHANGE = 10.0        # 功率变化超过此值（W）时恢复快速轮询
+EXPORTER_SCRAPE_TIMEOUT = 120.0 # /metrics 在此时长内被抓取过才算作消费者（秒）
+
+# 缓冲采样：每个 tick 读取驱动缓冲的所有利用率/功率/时钟样本（nvmlDeviceGetSamples），
+# 输出 <指标>_min、<指标>_max、<指标>_avg，不提高轮询频率也能看到短暂的峰值
+# 可以通过环境变量设置 : NVML_SAMPLES=true
+NVML_SAMPLES = os.getenv('NVML_SAMPLES', 'false').lower() == 'true'
+
+# 服务端历史（/api/history）
+# 可以通过环境变量设置 : HISTORY=false 关闭
+HISTORY = os.getenv('HISTORY', 'true').lower() == 'true'
+HISTORY_DURATION = 3600  # 内存中保留的历史时长（秒）
+HISTORY_METRICS = [
+    'utilization', 'memory_utilization', 'temperature', 'temperature_memory',
+    'memory_used', 'memory_total', 'power_draw', 'power_limit', 'fan_speed',
+    'clock_graphics', 'clock_sm', 'clock_memory', 'clock_video',
+    'pcie_tx_throughput', 'pcie_rx_throughput',
+    'encoder_utilization', 'decoder_utilization', 'memory_change_rate',
+]
+
+# 多分辨率汇总（长时间范围的 /api/history 查询）
+# 可以通过环境变量设置 : ROLLUPS=false 关闭
+ROLLUPS = os.getenv('ROLLUPS', 'true').lower() == 'true'
+ROLLUP_TIERS = {  # 分辨率（秒）-> 保留时长（秒）
+    1: 15 * 60,
+    10: 6 * 3600,
+    60: 2 * 86400,
+    3600: 30 * 86400,
+}
+ROLLUP_QUANTILE = 0.95  # 每个桶记录的分位数
+ROLLUP_SKETCH_GAMMA = 1.05  # 分位数草图相邻桶的比例（相对误差约 2.5%）
+
+# Prometheus 导出（/metrics）
+# 可以通过环境变量设置 : METRICS_EXPORTER=false 关闭
+METRICS_EXPORTER = os.getenv('METRICS_EXPORTER', 'true').lower() == 'true'
+
+# 磁盘存储（内存映射的列文件，用于事后分析）
+# 可以通过环境变量设置 : STORAGE_PATH=/var/lib/gpu-hot 启用（默认关闭）
+STORAGE_PATH = os.getenv('STORAGE_PATH', '')
+STORAGE_PARTITION_SECONDS = 3600  # 每个分区文件覆盖的时长，写满或到期后轮转
+STORAGE_RETENTION_SECONDS = int(float(os.getenv('STORAGE_RETENTION_DAYS', '7')) * 86400)  # 0 = 不按时间删除
+STORAGE_MAX_BYTES = int(float(os.getenv('STORAGE_MAX_GB', '0')) * 1024 ** 3)  # 0 = 不限制大小
+STORAGE_METRICS = HISTORY_METRICS + [
+    'memory_free', 'bar1_memory_used', 'bar1_memory_total',
+    'clock_graphics_app', 'clock_sm_app', 'clock_memory_app', 'clock_video_app',
+    'pcie_gen', 'pcie_width', 'encoder_sessions', 'encoder_fps', 'decoder_sessions',
+    'energy_consumption', 'ecc_errors_corrected', 'retired_pages',
+    'graphics_processes_count', 'nvlink_active_count',
+]
+
+# 各指标组的轮询间隔（秒），两次刷新之间沿用上次的值
+# 未列出的组使用 UPDATE_INTERVAL
+METRIC_GROUP_INTERVALS = {
+    'performance': 0.5,     # 利用率、P-State
+    'memory': 0.5,          # 显存使用
+    'power_thermal': 0.5,   # 温度、功耗、风扇、节流
+    'clocks': 2.0,          # 当前/应用时钟
+    'connectivity': 2.0,    # PCIe 链路和吞吐量
+    'media_engines': 2.0,   # 编码器/解码器
+    'health_status': 30.0,  # ECC 错误、退役页
+    'advanced': 30.0,       # 持久模式、MIG、NVLink
+}
 
 
 # GPU 监测模式
 # 可以通过环境变量设置 : NVIDIA_SMI=true
 NVIDIA_SMI = os.getenv('NVIDIA_SMI', 'false').lower() == 'true'
 
+# nvidia-smi 流式读取：一个常驻的 nvidia-smi -lms 进程，不再每次轮询启动一个子进程
+# 可以通过环境变量设置 : NVIDIA_SMI_STREAM=false 恢复每次轮询运行 nvidia-smi
+NVIDIA_SMI_STREAM = os.getenv('NVIDIA_SMI_STREAM', 'true').lower() == 'true'
+NVIDIA_SMI_STREAM_INTERVAL = UPDATE_INTERVAL  # 流式读取时 nvidia-smi 的输出间隔
+
 # Multi-Node Configuration
 # MODE: default (single node monitoring), hub (aggregate multiple nodes)
 # 多节点配置 
@@ -29,4 +129,11 @@ NODE_NAME = os.getenv('NODE_NAME', socket.gethostname())
 # NODE_URLS: comma-separated URLs for hub mode (e.g., http://node1:1312,http://node2:1312)
 # 多个节点: 从http://node1:1321 开始
 NODE_URLS = [url.strip() for url in os.getenv('NODE_URLS', '').split(',') if url.strip()]
+# HUB_NODE_PROTOCOL: hub 从节点接收数据的协议 - binary（列式二进制）、delta（增量）或 json
+HUB_NODE_PROTOCOL = os.getenv('HUB_NODE_PROTOCOL', 'binary')
+# 分片 hub：HUB_WORKERS 个工作进程分别连接一部分节点并解码节点帧，把每个节点的最新条目
+# 写入共享内存表，前端进程直接从表中拼接客户端帧（节点很多、单个事件循环跟不上时使用）
+# 可以通过环境变量设置 : HUB_WORKERS=4（默认 0：所有节点在前端进程的事件循环中处理）
+HUB_WORKERS = int(os.getenv('HUB_WORKERS', '0'))
+HUB_SHARD_SLOT_SIZE = 256 * 1024  # 共享内存表中每个节点的槽位大小（字节），节点条目的 JSON 超过时丢弃该节点的更新
 
@@ -0,0 +1,116 @@
+"""增量（delta）编码的 WebSocket 协议
+
+第一帧为完整快照（keyframe），之后的帧只包含变化的字段：
+
+    {'type': 'keyframe', 'seq': n, 'data': {...}}
+    {'type': 'delta', 'seq': n, 'changes': {...}}
+
+changes 与原数据结构相同：嵌套的 dict 递归合并，其他值（包括列表）整体替换，
+被删除的键列在该层的 '__removed__' 中。客户端发现 seq 不连续时发送 'resync'
+请求下一帧为关键帧。
+"""
+
+from .config import DELTA_KEYFRAME_INTERVAL
+
+REMOVED_KEY = '__removed__'
+RESYNC_MESSAGE = 'resync'
+
+_MISSING = object()
+
+
+def diff(old, new):
+    """计算从 old 到 new 的变化（仅包含变化的字段）"""
+    changes = {}
+    for key, value in new.items():
+        previous = old.get(key, _MISSING)
+        if value is previous:
+            continue
+        if isinstance(value, dict) and isinstance(previous, dict):
+            if sub := diff(previous, value):
+                changes[key] = sub
+        elif previous is _MISSING or previous != value:
+            changes[key] = value
+
+    removed = [key for key in old if key not in new]
+    if removed:
+        changes[REMOVED_KEY] = removed
+    return changes
+
+
+def apply_delta(base, changes):
+    """将变化合并到 base，返回新的 dict（不修改 base）"""
+    result = dict(base)
+    for key, value in changes.items():
+        if key == REMOVED_KEY:
+            for removed in value:
+                result.pop(removed, None)
+            continue
+        previous = result.get(key)
+        if isinstance(value, dict) and isinstance(previous, dict):
+            result[key] = apply_delta(previous, value)
+        else:
+            result[key] = value
+    return result
+
+
+def _snapshot(value):
+    """复制嵌套的 dict，防止上一帧被调用方修改后影响下一次 diff"""
+    if isinstance(value, dict):
+        return {key: _snapshot(item) for key, item in value.items()}
+    return value
+
+
+class DeltaEncoder:
+    """为一串数据帧生成增量消息，并定期插入关键帧用于重新同步"""
+
+    def __init__(self, keyframe_interval=DELTA_KEYFRAME_INTERVAL, copy_frames=True):
+        self.keyframe_interval = keyframe_interval
+        # 调用方保证帧在发送后不被修改时可关闭复制，未变化的子树按引用相等直接跳过
+        self.copy_frames = copy_frames
+        self.seq = 0
+        self.previous = None
+        self._since_keyframe = 0
+
+    def encode(self, data):
+        """编码下一帧，返回增量消息；需要发送关键帧时返回 None"""
+        self.seq += 1
+        previous, self.previous = self.previous, _snapshot(data) if self.copy_frames else data
+
+        if previous is None or self._since_keyframe >= self.keyframe_interval:
+            self._since_keyframe = 0
+            return None
+
+        self._since_keyframe += 1
+        return {'type': 'delta', 'seq': self.seq, 'changes': diff(previous, self.previous)}
+
+    def keyframe(self):
+        """当前帧的完整快照"""
+        return {'type': 'keyframe', 'seq': self.seq, 'data': self.previous}
+
+
+class DeltaDecoder:
+    """接收端：从关键帧和增量消息重建完整数据"""
+
+    def __init__(self):
+        self.seq = None
+        self.data = None
+
+    def decode(self, message):
+        """返回重建后的完整数据；seq 不连续时返回 None（需要 resync）
+
+        不带 type 的消息视为旧版本节点发送的完整数据
+        """
+        kind = message.get('type')
+        if kind == 'keyframe':
+            self.seq = message['seq']
+            self.data = message['data']
+            return self.data
+        if kind == 'delta':
+            if self.data is None or message['seq'] != self.seq + 1:
+                self.seq = None
+                self.data = None
+                return None
+            self.seq = message['seq']
+            self.data = apply_delta(self.data, message['changes'])
+            return self.data
+        return message
@@ -0,0 +1,108 @@
+"""NVML 设备注册表 - 缓存设备句柄和 UUID"""
+
+import time
+import logging
+import pynvml
+
+from .metrics.utils import decode_bytes, HANDLE_LOST_ERRORS
+from .config import DEVICE_CHECK_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceRegistry:
+    """一次性解析 NVML 设备句柄和 UUID，仅在设备数量变化或句柄失效时重新枚举"""
+
+    def __init__(self, check_interval=DEVICE_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self.devices = {}  # gpu_id -> {'index', 'handle', 'uuid'}
+        self.version = 0   # 每次重新枚举后递增
+        self._last_check = 0.0
+        self._stale = True
+
+    def __len__(self):
+        return len(self.devices)
+
+    def items(self):
+        """按索引顺序返回 (gpu_id, device) 列表"""
+        return list(self.devices.items())
+
+    def handle(self, gpu_id):
+        """返回 gpu_id 对应的缓存句柄，不存在时返回 None"""
+        device = self.devices.get(gpu_id)
+        return device['handle'] if device else None
+
+    def uuid(self, gpu_id):
+        """返回 gpu_id 对应的 UUID，不存在时返回 None"""
+        device = self.devices.get(gpu_id)
+        return device['uuid'] if device else None
+
+    def invalidate(self):
+        """标记句柄失效，下一次 refresh 时重新枚举"""
+        self._stale = True
+
+    def refresh(self, force=False, skip=(), on_device=None):
+        """低频检查设备数量和句柄有效性，必要时重新枚举
+
+        skip 中的设备（例如被隔离、调用可能卡住的设备）不访问 NVML，沿用缓存的句柄；
+        on_device(gpu_id) 在访问每个设备之前调用，用于看门狗记录进度。
+        返回发生变化的 gpu_id 集合（新增、移除或 UUID 改变）
+        """
+        now = time.monotonic()
+        if not force and not self._stale and now - self._last_check < self.check_interval:
+            return set()
+        self._last_check = now
+
+        count = pynvml.nvmlDeviceGetCount()
+        if not force and not self._stale and count == len(self.devices) and self._handles_valid(skip, on_device):
+            return set()
+
+        return self._enumerate(count, skip, on_device)
+
+    def _handles_valid(self, skip=(), on_device=None):
+        """确认每个缓存句柄仍然指向同一设备"""
+        for gpu_id, device in self.devices.items():
+            if gpu_id in skip:
+                continue
+            if on_device is not None:
+                on_device(gpu_id)
+            try:
+                if decode_bytes(pynvml.nvmlDeviceGetUUID(device['handle'])) != device['uuid']:
+                    return False
+            except pynvml.NVMLError:
+                return False
+        return True
+
+    def _enumerate(self, count, skip=(), on_device=None):
+        """重新解析所有设备的句柄和 UUID"""
+        devices = {}
+
+        for i in range(count):
+            gpu_id = str(i)
+            if gpu_id in skip and gpu_id in self.devices:
+                devices[gpu_id] = self.devices[gpu_id]
+                continue
+            if on_device is not None:
+                on_device(gpu_id)
+            try:
+                handle = pynvml.nvmlDeviceGetHandleByIndex(i)
+                uuid = decode_bytes(pynvml.nvmlDeviceGetUUID(handle))
+            except pynvml.NVMLError as e:
+                logger.warning(f"GPU {i}: Failed to resolve device handle - {e}")
+                continue
+
+            devices[gpu_id] = {'index': i, 'handle': handle, 'uuid': uuid}
+
+        changed = {
+            gpu_id for gpu_id in set(devices) | set(self.devices)
+            if (devices.get(gpu_id) or {}).get('uuid') != (self.devices.get(gpu_id) or {}).get('uuid')
+        }
+
+        if changed and self.devices:
+            logger.info(f"GPU devices changed ({len(self.devices)} -> {len(devices)}), re-enumerated: {sorted(changed)}")
+
+        # 整体替换，线程池中的读取方始终看到一致的映射
+        self.devices = devices
+        self._stale = False
+        self.version += 1
+        return changed
@@ -0,0 +1,183 @@
+"""NVML 事件 - XID 错误、ECC 错误和降频变化立即推送，不依赖轮询
+
+专用线程为所有设备注册一个 nvmlEventSet 并阻塞在 nvmlEventSetWait 上，收到事件后
+通过 call_soon_threadsafe 交给事件循环，作为单独的 'gpu_event' 消息立即发送给
+仪表盘客户端和 hub。时钟事件在升降频时非常频繁，只有降频原因变化时才推送。
+"""
+
+import time
+import ctypes
+import logging
+import threading
+from collections import Counter, deque
+from datetime import datetime
+
+import pynvml
+
+from .metrics.utils import throttle_labels
+
+logger = logging.getLogger(__name__)
+
+# 事件类型 -> 消息中的 kind
+EVENT_KINDS = {
+    pynvml.nvmlEventTypeXidCriticalError: 'xid',
+    pynvml.nvmlEventTypeDoubleBitEccError: 'ecc_double_bit',
+    pynvml.nvmlEventTypeSingleBitEccError: 'ecc_single_bit',
+    pynvml.nvmlEventTypeClock: 'throttle',
+}
+
+# 不算作降频的原因（空闲降频和应用时钟设置是正常状态）
+IGNORED_THROTTLE = pynvml.nvmlClocksThrottleReasonGpuIdle | pynvml.nvmlClocksThrottleReasonApplicationsClocksSetting
+
+WAIT_TIMEOUT_MS = 1000  # 每隔多久醒来检查停止标志和设备变化
+RECENT_EVENTS = 100     # /api/events 保留的最近事件数
+
+
+def _handle_key(handle):
+    """NVML 设备句柄的地址，用于把事件中的句柄对应到 gpu_id"""
+    return ctypes.cast(handle, ctypes.c_void_p).value
+
+
+class NvmlEventWatcher:
+    """在后台线程中等待 NVML 事件，通过 publish(event) 在事件循环中发布"""
+
+    def __init__(self, devices, publish=None, event_types=EVENT_KINDS):
+        self.devices = devices
+        self.publish = publish
+        self.event_types = event_types
+        self.recent = deque(maxlen=RECENT_EVENTS)
+        self.counts = Counter()    # kind -> 事件数
+        self.registered = {}       # gpu_id -> 注册成功的事件类型掩码
+        self._throttle = {}        # gpu_id -> 上一次推送的降频原因掩码
+        self._loop = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, loop):
+        """启动事件线程（重复调用无效），事件在 loop 中发布"""
+        if self.running:
+            return
+        self._loop = loop
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='nvml-events', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=WAIT_TIMEOUT_MS / 1000 * 2)
+            self._thread = None
+
+    def _run(self):
+        event_set = None
+        version = None
+        handles = {}
+        try:
+            while not self._stop.is_set():
+                # 设备重新枚举后重新注册（句柄可能已变化）
+                if version != self.devices.version:
+                    if event_set is not None:
+                        pynvml.nvmlEventSetFree(event_set)
+                    version = self.devices.version
+                    event_set, handles = self._register()
+
+                if event_set is None:
+                    # 没有设备支持这些事件，低频重新检查设备
+                    self._stop.wait(10)
+                    continue
+
+                try:
+                    data = pynvml.nvmlEventSetWait(event_set, WAIT_TIMEOUT_MS)
+                except pynvml.NVMLError_Timeout:
+                    continue
+                except pynvml.NVMLError as e:
+                    logger.debug(f"nvmlEventSetWait failed: {e}")
+                    self._stop.wait(1)
+                    continue
+
+                event = self._event(handles, data)
+                if event is not None:
+                    self._loop.call_soon_threadsafe(self._emit, event)
+        except Exception as e:
+            logger.error(f"NVML event thread stopped: {e}")
+        finally:
+            if event_set is not None:
+                try:
+                    pynvml.nvmlEventSetFree(event_set)
+                except pynvml.NVMLError:
+                    pass
+
+    def _register(self):
+        """为每个设备注册它支持的事件类型，返回 (event_set, {句柄地址: gpu_id})"""
+        wanted = 0
+        for event_type in self.event_types:
+            wanted |= event_type
+
+        event_set = pynvml.nvmlEventSetCreate()
+        handles = {}
+        self.registered = {}
+        for gpu_id, device in self.devices.items():
+            handle = device['handle']
+            try:
+                mask = pynvml.nvmlDeviceGetSupportedEventTypes(handle) & wanted
+                if mask:
+                    pynvml.nvmlDeviceRegisterEvents(handle, mask, event_set)
+            except pynvml.NVMLError as e:
+                logger.debug(f"GPU {gpu_id}: Event registration failed - {e}")
+                continue
+            if mask:
+                self.registered[gpu_id] = mask
+                handles[_handle_key(handle)] = gpu_id
+                if mask & pynvml.nvmlEventTypeClock:
+                    self._throttle[gpu_id] = self._throttle_mask(handle)
+
+        if not handles:
+            pynvml.nvmlEventSetFree(event_set)
+            return None, {}
+        logger.info(f"NVML events registered for {len(handles)} GPU(s)")
+        return event_set, handles
+
+    @staticmethod
+    def _throttle_mask(handle):
+        try:
+            return pynvml.nvmlDeviceGetCurrentClocksThrottleReasons(handle) & ~IGNORED_THROTTLE
+        except pynvml.NVMLError:
+            return None
+
+    def _event(self, handles, data):
+        """把 nvmlEventData_t 转换为消息，不需要推送的事件返回 None"""
+        gpu_id = handles.get(_handle_key(data.device))
+        kind = self.event_types.get(data.eventType)
+        if gpu_id is None or kind is None:
+            return None
+
+        event = {
+            'gpu_id': gpu_id,
+            'uuid': self.devices.uuid(gpu_id),
+            'kind': kind,
+            'time': time.time(),
+            'timestamp': datetime.now().isoformat(),
+        }
+        if kind == 'xid':
+            event['xid'] = int(data.eventData)
+        elif kind == 'throttle':
+            mask = self._throttle_mask(data.device)
+            if mask is None or mask == self._throttle.get(gpu_id):
+                return None
+            self._throttle[gpu_id] = mask
+            event['throttle_reasons'] = throttle_labels(mask)
+        return event
+
+    def _emit(self, event):
+        """在事件循环中记录并发布事件"""
+        self.recent.append(event)
+        self.counts[event['kind']] += 1
+        if event['kind'] != 'throttle' or event['throttle_reasons']:
+            detail = event.get('xid', ', '.join(event.get('throttle_reasons', [])))
+            logger.warning(f"GPU {event['gpu_id']}: NVML event {event['kind']} {detail}".rstrip())
+        if self.publish is not None:
+            self.publish(event)
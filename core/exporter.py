@@ -0,0 +1,176 @@
+"""Prometheus 指标导出（/metrics）
+
+抓取请求只读取监测循环（或 hub 聚合）产生的最新快照，从不调用 NVML。
+暴露文本在新快照后的第一次抓取时渲染一次，之后的抓取直接返回缓存的字节
+（需要时还有缓存的 gzip 版本）。hub 模式下每个节点的样本行按节点条目缓存，
+只有收到新消息的节点需要重新渲染。
+"""
+
+import gzip
+from fastapi import Response
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# (字段, 指标名, 类型, 说明)
+GPU_METRICS = [
+    ('utilization', 'gpu_hot_utilization_percent', 'gauge', 'GPU utilization'),
+    ('memory_utilization', 'gpu_hot_memory_utilization_percent', 'gauge', 'Memory controller utilization'),
+    ('temperature', 'gpu_hot_temperature_celsius', 'gauge', 'GPU temperature'),
+    ('temperature_memory', 'gpu_hot_memory_temperature_celsius', 'gauge', 'Memory temperature'),
+    ('memory_used', 'gpu_hot_memory_used_mib', 'gauge', 'Used GPU memory in MiB'),
+    ('memory_free', 'gpu_hot_memory_free_mib', 'gauge', 'Free GPU memory in MiB'),
+    ('memory_total', 'gpu_hot_memory_total_mib', 'gauge', 'Total GPU memory in MiB'),
+    ('bar1_memory_used', 'gpu_hot_bar1_memory_used_mib', 'gauge', 'Used BAR1 memory in MiB'),
+    ('power_draw', 'gpu_hot_power_draw_watts', 'gauge', 'Power draw'),
+    ('power_limit', 'gpu_hot_power_limit_watts', 'gauge', 'Enforced power limit'),
+    ('energy_consumption', 'gpu_hot_energy_joules_total', 'counter', 'Energy consumed since driver load'),
+    ('fan_speed', 'gpu_hot_fan_speed_percent', 'gauge', 'Fan speed'),
+    ('clock_graphics', 'gpu_hot_clock_graphics_mhz', 'gauge', 'Graphics clock'),
+    ('clock_sm', 'gpu_hot_clock_sm_mhz', 'gauge', 'SM clock'),
+    ('clock_memory', 'gpu_hot_clock_memory_mhz', 'gauge', 'Memory clock'),
+    ('clock_video', 'gpu_hot_clock_video_mhz', 'gauge', 'Video clock'),
+    ('pcie_gen', 'gpu_hot_pcie_link_gen', 'gauge', 'Current PCIe link generation'),
+    ('pcie_width', 'gpu_hot_pcie_link_width', 'gauge', 'Current PCIe link width'),
+    ('pcie_tx_throughput', 'gpu_hot_pcie_tx_kilobytes_per_second', 'gauge', 'PCIe transmit throughput'),
+    ('pcie_rx_throughput', 'gpu_hot_pcie_rx_kilobytes_per_second', 'gauge', 'PCIe receive throughput'),
+    ('pcie_replay_count', 'gpu_hot_pcie_replays_total', 'counter', 'PCIe replay events'),
+    ('nvlink_tx_kib', 'gpu_hot_nvlink_tx_kibibytes_total', 'counter', 'NVLink data transmitted in KiB'),
+    ('nvlink_rx_kib', 'gpu_hot_nvlink_rx_kibibytes_total', 'counter', 'NVLink data received in KiB'),
+    ('encoder_utilization', 'gpu_hot_encoder_utilization_percent', 'gauge', 'Video encoder utilization'),
+    ('decoder_utilization', 'gpu_hot_decoder_utilization_percent', 'gauge', 'Video decoder utilization'),
+    ('encoder_sessions', 'gpu_hot_encoder_sessions', 'gauge', 'Active encoder sessions'),
+    ('ecc_errors_corrected', 'gpu_hot_ecc_errors_corrected_total', 'counter', 'Corrected ECC errors'),
+    ('retired_pages', 'gpu_hot_retired_pages', 'gauge', 'Retired memory pages'),
+    ('graphics_processes_count', 'gpu_hot_graphics_processes', 'gauge', 'Graphics processes on the GPU'),
+    ('nvlink_active_count', 'gpu_hot_nvlink_active_links', 'gauge', 'Active NVLink links'),
+    ('collect_latency_ms', 'gpu_hot_collect_latency_milliseconds', 'gauge', 'Time to collect the GPU in the last tick'),
+    ('stale_seconds', 'gpu_hot_stale_seconds', 'gauge', 'Age of the last good reading of a timed-out or quarantined GPU'),
+]
+
+HOST_METRICS = [
+    ('cpu_percent', 'gpu_hot_host_cpu_percent', 'gauge', 'Host CPU utilization'),
+    ('memory_percent', 'gpu_hot_host_memory_percent', 'gauge', 'Host memory utilization'),
+]
+
+NODE_UP = ('gpu_hot_node_up', 'gauge', 'Whether the hub is receiving data from the node')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    """可导出的数值（NaN 视为缺失）"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value == value
+
+
+def _sample_value(value):
+    """样本值：数值原样返回；PCIe 代数/宽度等以字符串发布的数字（NVML 和 nvidia-smi）
+    转换为数值；其它（'N/A'、缺失）返回 None"""
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            return None
+        if value != value:
+            return None
+        return int(value) if value.is_integer() else value
+    return value if _number(value) else None
+
+
+def _render_source(gpus, system, static_info, node=None, online=True):
+    """渲染一个节点（或单节点模式）的样本行：{指标名: [行]}"""
+    samples = {}
+    node_label = f'node="{_escape(node)}"' if node is not None else ''
+
+    for gpu_id, gpu in gpus.items():
+        static = static_info.get(gpu_id, gpu)
+        labels = ','.join(filter(None, [
+            node_label,
+            f'gpu="{_escape(gpu_id)}"',
+            f'name="{_escape(static.get("name", ""))}"',
+            f'uuid="{_escape(static.get("uuid", ""))}"',
+        ]))
+        for field, metric, _, _ in GPU_METRICS:
+            value = _sample_value(gpu.get(field))
+            if value is not None:
+                samples.setdefault(metric, []).append(f'{metric}{{{labels}}} {value}')
+
+    host_labels = f'{{{node_label}}}' if node_label else ''
+    for field, metric, _, _ in HOST_METRICS:
+        value = system.get(field)
+        if _number(value):
+            samples.setdefault(metric, []).append(f'{metric}{host_labels} {value}')
+
+    if node is not None:
+        samples[NODE_UP[0]] = [f'{NODE_UP[0]}{host_labels} {1 if online else 0}']
+    return samples
+
+
+class PrometheusExporter:
+    """缓存最新快照的 Prometheus 暴露文本"""
+
+    def __init__(self):
+        self._frame = None
+        self._static_info = {}
+        self._node_samples = {}  # node_name -> (节点条目, 样本行)，hub 模式使用
+        self._body = None
+        self._gzipped = None
+
+    def update(self, frame, static_info=None):
+        """记录最新的帧（单节点数据帧或 hub 的集群帧），下次抓取时重新渲染"""
+        if frame is self._frame:
+            return
+        self._frame = frame
+        if static_info is not None:
+            self._static_info = static_info
+        self._body = None
+        self._gzipped = None
+
+    def render(self, compress=False):
+        """返回缓存的暴露文本（bytes），compress 为 True 时返回 gzip 压缩的版本"""
+        if self._body is None:
+            self._body = self._render().encode('utf-8')
+        if not compress:
+            return self._body
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self._body, compresslevel=5)
+        return self._gzipped
+
+    def _render(self):
+        frame = self._frame
+        if frame is None:
+            return ''
+
+        if frame.get('mode') == 'hub':
+            sources = []
+            node_samples = {}
+            for node_name, view in frame.get('nodes', {}).items():
+                cached = self._node_samples.get(node_name)
+                if cached is None or cached[0] is not view:
+                    cached = (view, _render_source(
+                        view['gpus'], view['system'], {}, node=node_name, online=view['status'] == 'online'
+                    ))
+                node_samples[node_name] = cached
+                sources.append(cached[1])
+            self._node_samples = node_samples
+        else:
+            sources = [_render_source(frame.get('gpus', {}), frame.get('system', {}), self._static_info)]
+
+        # 同一指标的样本必须连续出现，按指标合并所有来源的行
+        lines = []
+        for _, metric, kind, help_text in GPU_METRICS + HOST_METRICS + [(None, *NODE_UP)]:
+            metric_lines = [line for samples in sources for line in samples.get(metric, ())]
+            if metric_lines:
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} {kind}')
+                lines.extend(metric_lines)
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+def metrics_response(exporter, request):
+    """按 Accept-Encoding 返回缓存的 Prometheus 文本（可选 gzip）"""
+    if 'gzip' in request.headers.get('accept-encoding', ''):
+        return Response(exporter.render(compress=True), media_type=CONTENT_TYPE,
+                        headers={'Content-Encoding': 'gzip'})
+    return Response(exporter.render(), media_type=CONTENT_TYPE)
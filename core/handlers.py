@@ -1,62 +1,283 @@
 """异步 WebSocket 处理程序，用于实时监测"""
 
 # 导入 异步IO, 系统监测库, 日志记录和 JSON 库
+import time
 import asyncio
+import functools
 import psutil
 import logging
 import json
 
 from datetime import datetime
-from fastapi import WebSocket # 导入 WebSocket 模块
+from typing import Optional
+from fastapi import WebSocket, HTTPException, Request # 导入 WebSocket 模块
 from . import config # 导入配置模块
+from .broadcast import Broadcaster
+from .delta import RESYNC_MESSAGE
+from .exporter import PrometheusExporter, metrics_response
+from .polling import AdaptivePoller
 
 # 设置日志记录
 logger = logging.getLogger(__name__)
 
-# 全局 WebSocket 连接
-websocket_connections = set()
+# 全局 WebSocket 广播器
+broadcaster = Broadcaster()
+
+# Prometheus 导出器，缓存监测循环的最新快照
+exporter = PrometheusExporter()
+
+# 自适应轮询，按消费者和 GPU 活动决定监测循环的间隔
+poller = AdaptivePoller(broadcaster)
+
+
+def build_static_message(monitor):
+    """构建静态信息消息（仅在连接时及静态信息变化时发送）"""
+    return {
+        'type': 'static_info',
+        'node_name': config.NODE_NAME,
+        'gpus': monitor.get_static_info()
+    }
+
+
+def build_event_message(event):
+    """NVML 事件消息（XID、ECC、降频），不经过数据帧立即发送"""
+    return {
+        'type': 'gpu_event',
+        'node_name': config.NODE_NAME,
+        'event': event
+    }
+
 
 def register_handlers(app, monitor):
     """注册 FastAPI WebSocket 处理程序"""
     
+    def publish_event(event):
+        broadcaster.broadcast(build_event_message(event), droppable=False)
+        # 故障时立即恢复快速轮询，下一帧反映最新状态
+        poller.wake()
+    
+    def start_monitor_loop():
+        if not monitor.running:
+            monitor.running = True
+            asyncio.create_task(monitor_loop(monitor, broadcaster))
+    
+    @app.on_event("startup")
+    async def start_history():
+        # 启用服务端历史、磁盘存储、汇总或 /metrics 时立即开始采集，不必等待仪表盘客户端
+        if (monitor.history is not None or monitor.storage is not None
+                or monitor.rollups is not None or config.METRICS_EXPORTER):
+            start_monitor_loop()
+    
+    @app.on_event("startup")
+    async def start_events():
+        if monitor.events is not None and monitor.initialized:
+            monitor.events.publish = publish_event
+            monitor.events.start(asyncio.get_running_loop())
+    
     @app.websocket("/socket.io/")
     async def websocket_endpoint(websocket: WebSocket):
         await websocket.accept()
-        websocket_connections.add(websocket)
+        # 静态信息只在连接时发送一次，后续帧仅包含动态指标
+        await websocket.send_text(json.dumps(build_static_message(monitor)))
+        # 协议通过查询参数选择: ?protocol=json（默认）、delta 或 binary
+        broadcaster.add(websocket, websocket.query_params.get('protocol', 'json'))
         logger.debug('仪表盘客户端已连接')
         
-        if not monitor.running:
-            monitor.running = True
-            asyncio.create_task(monitor_loop(monitor, websocket_connections))
+        start_monitor_loop()
+        poller.wake()
         
         try:
             # 保持连接活跃
             while True:
-                await websocket.receive_text()
+                if await websocket.receive_text() == RESYNC_MESSAGE:
+                    broadcaster.request_keyframe(websocket)
         except Exception as e:
             logger.debug(f'仪表盘客户端已断开连接: {e}')
         finally:
-            websocket_connections.discard(websocket)
+            broadcaster.remove(websocket)
+    
+    @app.get("/api/clients")
+    async def api_clients():
+        """报告每个仪表盘客户端的发送队列和延迟"""
+        return {"clients": broadcaster.stats()}
+    
+    @app.get("/api/events")
+    async def api_events():
+        """最近的 NVML 事件和每个 GPU 注册的事件类型"""
+        if monitor.events is None:
+            raise HTTPException(status_code=404, detail="NVML events are disabled")
+        return {
+            "events": list(monitor.events.recent),
+            "counts": dict(monitor.events.counts),
+            "registered": {gpu_id: hex(mask) for gpu_id, mask in monitor.events.registered.items()}
+        }
+    
+    @app.get("/api/watchdog")
+    async def api_watchdog():
+        """每个 GPU 的采集延迟、超时次数和隔离状态"""
+        return monitor.watchdog.stats()
+    
+    @app.get("/api/capabilities")
+    async def api_capabilities():
+        """每个 GPU 不支持（热路径上跳过）的 NVML 调用"""
+        return {
+            'refresh_interval': monitor.collector.capabilities.refresh_interval,
+            'devices': monitor.collector.capabilities.describe(),
+        }
+    
+    @app.get("/api/polling")
+    async def api_polling():
+        """报告当前的轮询状态、有效间隔和消费者"""
+        return poller.stats()
+    
+    if config.METRICS_EXPORTER:
+        @app.get("/metrics")
+        async def metrics(request: Request):
+            """Prometheus 抓取端点：返回最新快照的缓存文本，不触发 NVML 调用"""
+            poller.scraped()
+            return metrics_response(exporter, request)
+    
+    @app.get("/api/history")
+    async def api_history(gpu: Optional[str] = None, start: Optional[float] = None,
+                          end: Optional[float] = None, seconds: Optional[float] = None,
+                          metrics: Optional[str] = None, max_points: Optional[int] = None,
+                          resolution: str = 'auto'):
+        """返回服务端保存的历史数据
+
+        时间范围为 [start, end]（Unix 秒），或最近 seconds 秒；gpu 和 metrics 为逗号分隔的列表。
+        resolution 为 raw、汇总分辨率（秒）或 auto：原始样本数超过 max_points 时
+        自动选择能覆盖该范围的最细汇总分辨率。
+        原始数据在内存中的历史覆盖不了该范围（或缺少请求的指标）时从磁盘存储读取
+        """
+        if monitor.history is None and monitor.storage is None and monitor.rollups is None:
+            raise HTTPException(status_code=404, detail="History is disabled")
+        
+        now = time.time()
+        if seconds is not None:
+            start = now - seconds
+        gpu_ids = gpu.split(',') if gpu else None
+        metric_names = metrics.split(',') if metrics else None
+        
+        rollup = None
+        if resolution == 'auto':
+            raw_points = None if start is None else ((end or now) - start) / config.UPDATE_INTERVAL
+            if monitor.rollups is not None and max_points and raw_points and raw_points > max_points:
+                rollup = monitor.rollups.select(start, end or now, max_points, now)
+            if rollup is None and monitor.history is None and monitor.storage is None:
+                rollup = monitor.rollups.resolutions[0]
+        elif resolution != 'raw':
+            resolutions = {str(r): r for r in (monitor.rollups.resolutions if monitor.rollups else [])}
+            if resolution not in resolutions:
+                raise HTTPException(status_code=400, detail=f"Unknown resolution: {resolution}")
+            rollup = resolutions[resolution]
+        elif monitor.history is None and monitor.storage is None:
+            raise HTTPException(status_code=404, detail="Raw history is disabled")
+        
+        if rollup is not None:
+            return {
+                "source": "rollup",
+                "resolution": rollup,
+                "metrics": monitor.rollups.metrics,
+                "gpus": monitor.rollups.query(
+                    rollup, gpu_ids=gpu_ids, start=start, end=end, metrics=metric_names, max_points=max_points
+                )
+            }
+        
+        source = monitor.history
+        if monitor.storage is not None and (
+            source is None
+            or not source.covers(start)
+            or any(name not in source.metrics for name in metric_names or [])
+        ):
+            source = monitor.storage
+        
+        query = functools.partial(
+            source.query,
+            gpu_ids=gpu_ids,
+            start=start,
+            end=end,
+            metrics=metric_names,
+            max_points=max_points
+        )
+        if source is monitor.storage:
+            # 冷分区的读取可能触发磁盘缺页，放到线程池中避免阻塞事件循环
+            gpus = await asyncio.get_running_loop().run_in_executor(None, query)
+        else:
+            gpus = query()
+        
+        return {
+            "source": "disk" if source is monitor.storage else "memory",
+            "resolution": "raw",
+            "metrics": source.metrics,
+            "gpus": gpus
+        }
+
+
+async def current_gpu_data(monitor):
+    """REST 接口的 GPU 数据
+
+    监测循环按基础间隔轮询时返回最近发布的 tick（额外的采集会推进缓冲样本和进程利用率
+    的读取位置，使下一个广播 tick 丢失这些样本）；暂停、后台或空闲退避时缓存可能已经
+    过时，采集一次
+    """
+    if monitor.running and poller.state == 'fast':
+        return monitor.gpu_data
+    return await monitor.get_gpu_data()
 
 
-async def monitor_loop(monitor, connections):
+def record(monitor, gpu_data, now):
+    """把一个 tick 追加到各记录器；某个记录器出错（例如磁盘已满）时只记录警告，照常广播
+
+    标记为 stale 的条目（超时或被隔离的 GPU 的最近有效值）只用于广播和 /metrics，
+    不作为新样本写入，记录中这些 GPU 在这段时间内为缺失
+    """
+    if any(gpu.get('stale') for gpu in gpu_data.values()):
+        gpu_data = {gpu_id: gpu for gpu_id, gpu in gpu_data.items() if not gpu.get('stale')}
+    for name in ('history', 'storage', 'rollups'):
+        recorder = getattr(monitor, name)
+        if recorder is None:
+            continue
+        try:
+            recorder.append(gpu_data, now)
+        except Exception as e:
+            logger.warning(f"{name} 追加失败: {e}")
+
+
+async def monitor_loop(monitor, broadcaster):
     """异步后台循环，收集并发送 GPU 数据"""
     # 根据是否有 GPU 使用 nvidia-smi 确定更新间隔
     uses_nvidia_smi = any(monitor.use_smi.values()) if hasattr(monitor, 'use_smi') else False
-    update_interval = config.NVIDIA_SMI_INTERVAL if uses_nvidia_smi else config.UPDATE_INTERVAL
+    # 流式读取 nvidia-smi 时不再为每次轮询启动子进程，可以使用与 NVML 相同的间隔
+    if uses_nvidia_smi and not config.NVIDIA_SMI_STREAM:
+        update_interval = config.NVIDIA_SMI_INTERVAL
+    else:
+        update_interval = config.UPDATE_INTERVAL
     
     if uses_nvidia_smi:
         logger.info(f"使用 nvidia-smi 轮询间隔: {update_interval}s")
     else:
         logger.info(f"使用 NVML 轮询间隔: {update_interval}s")
     
+    # 历史、磁盘存储和汇总在没有客户端时仍需要（较慢的）数据
+    poller.base_interval = update_interval
+    poller.recorders = sum(1 for recorder in (monitor.history, monitor.storage, monitor.rollups)
+                           if recorder is not None)
+    
+    static_version = monitor.static_version
+    static_info = monitor.get_static_info()
+    
     while monitor.running:
+        if not poller.should_collect():
+            # 没有任何消费者：不调用 NVML，等待客户端连接或抓取
+            await poller.sleep(poller.next_interval())
+            continue
+        
         try:
-            # 并发收集数据
-            gpu_data, processes = await asyncio.gather(
-                monitor.get_gpu_data(),
-                monitor.get_processes()
-            )
+            # 采集线程一次收集所有 GPU 和进程（NVML_COLLECTOR_THREAD=false 时并发提交到线程池）
+            gpu_data, processes = await monitor.collect()
+            
+            # 追加到服务端历史（预分配的环形缓冲区）、磁盘存储（内存映射文件的原地写入）和多分辨率汇总
+            record(monitor, gpu_data, time.time())
             
             system_info = {
                 'cpu_percent': psutil.cpu_percent(percpu=False),
@@ -72,20 +293,19 @@ async def monitor_loop(monitor, connections):
                 'system': system_info
             }
             
-            # 发送数据到所有已连接的客户端
-            if connections:
-                disconnected = set()
-                for websocket in connections:
-                    try:
-                        await websocket.send_text(json.dumps(data))
-                    except:
-                        disconnected.add(websocket)
-                
-                # 移除已断开连接的客户端
-                connections -= disconnected
+            # 静态信息变化时（新设备、驱动重新加载）先重新发送，且不可丢弃
+            if monitor.static_version != static_version:
+                static_version = monitor.static_version
+                static_info = monitor.get_static_info()
+                broadcaster.broadcast(build_static_message(monitor), droppable=False)
+            
+            # 编码一次，放入每个客户端的发送队列
+            broadcaster.broadcast(data)
+            exporter.update(data, static_info)
+            poller.observe(gpu_data)
             
         except Exception as e:
             logger.error(f"监测循环中的错误: {e}")
         
-        await asyncio.sleep(update_interval)
+        await poller.sleep(poller.next_interval())
 
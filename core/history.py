@@ -0,0 +1,105 @@
+"""服务端内存时间序列历史 - 每个 GPU 一个预分配的 NumPy 环形缓冲区"""
+
+import math
+import numpy as np
+
+from .config import HISTORY_DURATION, HISTORY_METRICS, UPDATE_INTERVAL
+
+
+class MetricHistory:
+    """每个 GPU 每个数值指标的固定大小环形缓冲区
+
+    缓冲区在第一次看到某个 GPU 时一次性分配，之后追加为 O(1) 的原地写入，
+    不会随时间增长内存
+    """
+
+    def __init__(self, duration=HISTORY_DURATION, interval=UPDATE_INTERVAL, metrics=HISTORY_METRICS):
+        self.capacity = max(1, int(math.ceil(duration / interval)))
+        self.metrics = list(metrics)
+        self._columns = {name: i for i, name in enumerate(self.metrics)}
+        self.values = {}  # gpu_id -> ndarray(capacity, len(metrics)) float32
+        self.timestamps = {}  # gpu_id -> ndarray(capacity) float64（Unix 时间）
+        self.heads = {}  # gpu_id -> 下一个写入位置
+        self.counts = {}  # gpu_id -> 有效样本数
+
+    def _allocate(self, gpu_id):
+        self.values[gpu_id] = np.full((self.capacity, len(self.metrics)), np.nan, dtype=np.float32)
+        self.timestamps[gpu_id] = np.zeros(self.capacity, dtype=np.float64)
+        self.heads[gpu_id] = 0
+        self.counts[gpu_id] = 0
+
+    def append(self, gpu_data, timestamp):
+        """追加一次采样：gpu_data 为 {gpu_id: {metric: value}}，缺失的指标记为 NaN"""
+        for gpu_id, gpu in gpu_data.items():
+            if gpu_id not in self.values:
+                self._allocate(gpu_id)
+
+            head = self.heads[gpu_id]
+            row = self.values[gpu_id][head]
+            for i, name in enumerate(self.metrics):
+                value = gpu.get(name)
+                row[i] = value if isinstance(value, (int, float)) else np.nan
+            self.timestamps[gpu_id][head] = timestamp
+
+            self.heads[gpu_id] = (head + 1) % self.capacity
+            if self.counts[gpu_id] < self.capacity:
+                self.counts[gpu_id] += 1
+
+    def _ordered(self, gpu_id):
+        """按时间顺序返回 (timestamps, values)，未写满时只返回有效部分"""
+        head, count = self.heads[gpu_id], self.counts[gpu_id]
+        if count < self.capacity:
+            return self.timestamps[gpu_id][:count], self.values[gpu_id][:count]
+        order = np.r_[head:self.capacity, 0:head]
+        return self.timestamps[gpu_id][order], self.values[gpu_id][order]
+
+    def query(self, gpu_ids=None, start=None, end=None, metrics=None, max_points=None):
+        """返回时间范围 [start, end] 内的历史数据
+
+        结果格式为 {gpu_id: {'timestamps': [...], metric: [...]}}，NaN 转为 None。
+        max_points 限制每个 GPU 返回的点数（等间隔抽样）
+        """
+        metrics = [m for m in (metrics or self.metrics) if m in self._columns]
+        columns = [self._columns[m] for m in metrics]
+        result = {}
+
+        for gpu_id in (gpu_ids or list(self.values)):
+            if gpu_id not in self.values:
+                continue
+            timestamps, values = self._ordered(gpu_id)
+
+            lo, hi = time_range(timestamps, start, end)
+            step = downsample_step(hi - lo, max_points)
+            result[gpu_id] = format_series(timestamps[lo:hi:step], values[lo:hi:step, columns], metrics)
+
+        return result
+
+    def covers(self, start):
+        """内存中的历史是否覆盖从 start 开始的时间范围"""
+        oldest = [
+            self.timestamps[gpu_id][0 if count < self.capacity else self.heads[gpu_id]]
+            for gpu_id, count in self.counts.items() if count
+        ]
+        return bool(oldest) and start is not None and start >= min(oldest)
+
+
+def time_range(timestamps, start, end):
+    """在有序时间戳中二分查找 [start, end] 对应的行范围"""
+    lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+    hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='right'))
+    return lo, hi
+
+
+def downsample_step(rows, max_points):
+    """等间隔抽样的步长，使返回的点数不超过 max_points"""
+    if max_points and rows > max_points:
+        return int(math.ceil(rows / max_points))
+    return 1
+
+
+def format_series(timestamps, values, metrics):
+    """转换为 {'timestamps': [...], metric: [...]}，NaN 转为 None"""
+    series = {'timestamps': timestamps.tolist()}
+    for i, name in enumerate(metrics):
+        series[name] = [None if v != v else round(v, 3) for v in values[:, i].tolist()]
+    return series
@@ -4,11 +4,16 @@ import asyncio
 import logging
 import json
 import websockets
+from collections import deque
 from datetime import datetime
 from . import config
+from .delta import DeltaDecoder, RESYNC_MESSAGE
+from .binary import BinaryDecoder
 
 logger = logging.getLogger(__name__)
 
+RECENT_EVENTS = 200  # 保留的最近 GPU 事件数（所有节点）
+
 
 class Hub:
     """聚合来自多个节点的数据"""
@@ -17,18 +22,30 @@ class Hub:
         self.node_urls = node_urls
         self.nodes = {}  # node_name -> {client, data, status, last_update}
         self.url_to_node = {}  # url -> node_name mapping
+        self.static_info = {}  # url -> {gpu_id: 静态信息}，节点连接时发送一次
         self.running = False
         self._connection_started = False
         
+        # 节点推送的 NVML 事件（XID、ECC、降频），由 on_event 立即转发给仪表盘客户端
+        self.recent_events = deque(maxlen=RECENT_EVENTS)
+        self.on_event = None
+        
+        # 增量聚合缓存：仅在节点消息到达时刷新对应节点
+        self._views = {}  # node_name -> 发送给客户端的节点条目
+        self._fragments = {}  # node_name -> 节点条目的 JSON 片段
+        self._stats = {'online_nodes': 0, 'total_gpus': 0}
+        self._cluster_data = None
+        self._cluster_json = None
+        
         # 初始化节点为离线状态
         for url in node_urls:
-            self.nodes[url] = {
+            self._set_node(url, {
                 'url': url,
                 'websocket': None,
                 'data': None,
                 'status': 'offline',
                 'last_update': None
-            }
+            })
             self.url_to_node[url] = url
     
     async def _connect_all_nodes(self):
@@ -61,27 +78,57 @@ class Hub:
         while self.running:
             try:
                 # 将 HTTP URL 转换为 WebSocket URL
-                ws_url = url.replace('http://', 'ws://').replace('https://', 'wss://') + '/socket.io/'
+                # 请求紧凑协议；旧版本节点会忽略该参数并发送完整的 JSON 帧
+                ws_url = url.replace('http://', 'ws://').replace('https://', 'wss://') + f'/socket.io/?protocol={config.HUB_NODE_PROTOCOL}'
                 
                 logger.info(f'Connecting to node WebSocket: {ws_url}')
                 
                 async with websockets.connect(ws_url) as websocket:
                     logger.info(f'Connected to node: {url}')
+                    decoder = DeltaDecoder()
+                    binary_decoder = BinaryDecoder()
                     
                     # 标记节点为在线
                     node_name = self.url_to_node.get(url, url)
-                    self.nodes[node_name] = {
+                    self._set_node(node_name, {
                         'url': url,
                         'websocket': websocket,
                         'data': None,
                         'status': 'online',
                         'last_update': datetime.now().isoformat()
-                    }
+                    })
                     
                     # 监听来自节点的数据
                     async for message in websocket:
                         try:
-                            data = json.loads(message)
+                            if isinstance(message, bytes):
+                                # 列式二进制帧：schema 总是先于数据帧到达
+                                data = binary_decoder.decode(message)
+                                if data is None:
+                                    continue
+                            else:
+                                data = json.loads(message)
+                                
+                                # 静态信息消息：缓存后合并到后续的动态帧中
+                                if data.get('type') == 'static_info':
+                                    self.static_info[url] = data.get('gpus', {})
+                                    continue
+                                
+                                if data.get('type') == 'binary_schema':
+                                    binary_decoder.set_schema(data)
+                                    continue
+                                
+                                if data.get('type') == 'gpu_event':
+                                    self._handle_event(url, data)
+                                    continue
+                                
+                                # 从关键帧/增量帧重建完整数据，序号不连续时请求重新同步
+                                data = decoder.decode(data)
+                                if data is None:
+                                    await websocket.send(RESYNC_MESSAGE)
+                                    continue
+                            
+                            data = self._merge_static_info(url, data)
                             
                             # 从数据中提取节点名称，或使用 URL 作为回退
                             node_name = data.get('node_name', url)
@@ -90,13 +137,13 @@ class Hub:
                             self.url_to_node[url] = node_name
                             
                             # 使用接收到的数据更新节点条目
-                            self.nodes[node_name] = {
+                            self._set_node(node_name, {
                                 'url': url,
                                 'websocket': websocket,
                                 'data': data,
                                 'status': 'online',
                                 'last_update': datetime.now().isoformat()
-                            }
+                            })
                             
                         except json.JSONDecodeError as e:
                             logger.error(f'Failed to parse message from {url}: {e}')
@@ -108,56 +155,109 @@ class Hub:
                 # 标记节点为离线
                 node_name = self.url_to_node.get(url, url)
                 if node_name in self.nodes:
-                    self.nodes[node_name]['status'] = 'offline'
+                    self._set_node(node_name, {**self.nodes[node_name], 'status': 'offline'})
                     logger.info(f'Marked node {node_name} as offline')
             except Exception as e:
                 logger.error(f'Failed to connect to node {url}: {e}')
                 # 标记节点为离线
                 node_name = self.url_to_node.get(url, url)
                 if node_name in self.nodes:
-                    self.nodes[node_name]['status'] = 'offline'
+                    self._set_node(node_name, {**self.nodes[node_name], 'status': 'offline'})
                     logger.info(f'Marked node {node_name} as offline')
             
             # 在重试连接之前等待一段时间
             if self.running:
                 await asyncio.sleep(5)
     
-    async def get_cluster_data(self):
-        """获取所有节点的聚合数据"""
-        nodes = {}
-        total_gpus = 0
-        online_nodes = 0
+    def _handle_event(self, url, message):
+        """记录节点推送的 GPU 事件并立即转发（不等待下一个集群帧）"""
+        message = {**message, 'node_name': message.get('node_name') or self.url_to_node.get(url, url)}
+        self.recent_events.append(message)
+        if self.on_event is not None:
+            self.on_event(message)
+    
+    def _merge_static_info(self, url, data):
+        """将节点的缓存静态信息合并到动态 GPU 数据中（返回新的 dict，不修改 data）"""
+        static_gpus = self.static_info.get(url)
+        if not static_gpus:
+            return data
         
-        for node_name, node_info in self.nodes.items():
-            if node_info['status'] == 'online' and node_info['data']:
-                nodes[node_name] = {
-                    'status': 'online',
-                    'gpus': node_info['data'].get('gpus', {}),
-                    'processes': node_info['data'].get('processes', []),
-                    'system': node_info['data'].get('system', {}),
-                    'last_update': node_info['last_update']
-                }
-                total_gpus += len(node_info['data'].get('gpus', {}))
-                online_nodes += 1
-            else:
-                nodes[node_name] = {
-                    'status': 'offline',
-                    'gpus': {},
-                    'processes': [],
-                    'system': {},
-                    'last_update': node_info.get('last_update')
-                }
+        gpus = {
+            gpu_id: {**static_gpus.get(gpu_id, {}), **gpu}
+            for gpu_id, gpu in data.get('gpus', {}).items()
+        }
+        return {**data, 'gpus': gpus}
+    
+    def _set_node(self, node_name, info):
+        """更新节点条目，并只让该节点的缓存视图和片段失效"""
+        if previous := self._views.get(node_name):
+            self._count(previous, -1)
         
-        return {
-            'mode': 'hub',
-            'nodes': nodes,
-            'cluster_stats': {
-                'total_nodes': len(self.nodes),
-                'online_nodes': online_nodes,
-                'total_gpus': total_gpus
+        self.nodes[node_name] = info
+        view = self._node_view(info)
+        self._views[node_name] = view
+        self._fragments.pop(node_name, None)
+        self._count(view, 1)
+        
+        self._cluster_data = None
+        self._cluster_json = None
+    
+    def _count(self, view, sign):
+        """增量维护 cluster_stats 计数器"""
+        if view['status'] == 'online':
+            self._stats['online_nodes'] += sign
+            self._stats['total_gpus'] += sign * len(view['gpus'])
+    
+    @staticmethod
+    def _node_view(info):
+        """构建发送给客户端的节点条目（之后不再修改，可被帧直接引用）"""
+        if info['status'] == 'online' and info['data']:
+            return {
+                'status': 'online',
+                'gpus': info['data'].get('gpus', {}),
+                'processes': info['data'].get('processes', []),
+                'system': info['data'].get('system', {}),
+                'last_update': info['last_update']
             }
+        return {
+            'status': 'offline',
+            'gpus': {},
+            'processes': [],
+            'system': {},
+            'last_update': info.get('last_update')
         }
     
+    def _cluster_stats(self):
+        return {'total_nodes': len(self.nodes), **self._stats}
+    
+    async def get_cluster_data(self):
+        """获取所有节点的聚合数据（节点无变化时返回缓存的帧）"""
+        if self._cluster_data is None:
+            self._cluster_data = {
+                'mode': 'hub',
+                'nodes': dict(self._views),
+                'cluster_stats': self._cluster_stats()
+            }
+        return self._cluster_data
+    
+    def get_cluster_json(self):
+        """序列化的集群帧，由每个节点缓存的 JSON 片段拼接而成
+
+        只有自上次拼接以来收到新消息的节点需要重新序列化
+        """
+        if self._cluster_json is None:
+            parts = []
+            for node_name, view in self._views.items():
+                fragment = self._fragments.get(node_name)
+                if fragment is None:
+                    fragment = self._fragments[node_name] = json.dumps(view)
+                parts.append(f'{json.dumps(node_name)}: {fragment}')
+            self._cluster_json = (
+                '{"mode": "hub", "nodes": {' + ', '.join(parts) + '}, '
+                f'"cluster_stats": {json.dumps(self._cluster_stats())}}}'
+            )
+        return self._cluster_json
+    
     async def shutdown(self):
         """断开所有节点的连接"""
         self.running = False
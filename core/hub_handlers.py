@@ -2,62 +2,108 @@
 
 import asyncio
 import logging
-import json
-from fastapi import WebSocket
+from fastapi import WebSocket, Request
+from . import config
+from .broadcast import Broadcaster
+from .delta import RESYNC_MESSAGE
+from .exporter import PrometheusExporter, metrics_response
 
 logger = logging.getLogger(__name__)
 
-# 全局 WebSocket 连接
-websocket_connections = set()
+# 全局 WebSocket 广播器（集群帧引用的节点条目不会被修改，无需复制）
+broadcaster = Broadcaster(copy_frames=False)
+
+# Prometheus 导出器，按节点缓存已渲染的样本行
+exporter = PrometheusExporter()
 
 def register_hub_handlers(app, hub):
     """注册 FastAPI WebSocket 处理程序，用于集群模式"""
     
-    @app.websocket("/socket.io/")
-    async def websocket_endpoint(websocket: WebSocket):
-        await websocket.accept()
-        websocket_connections.add(websocket)
-        logger.debug('仪表盘客户端已连接')
-        
+    def start_hub():
         if not hub.running:
             hub.running = True
-            asyncio.create_task(hub_loop(hub, websocket_connections))
+            asyncio.create_task(hub_loop(hub, broadcaster))
         
         # 启动节点连接（如果尚未启动）
         if not hub._connection_started:
             hub._connection_started = True
             asyncio.create_task(hub._connect_all_nodes())
+    
+    # 节点的 GPU 事件不进入集群帧，立即发送给所有客户端
+    hub.on_event = lambda message: broadcaster.broadcast(message, droppable=False)
+    
+    if hasattr(hub, 'start'):
+        # 分片模式：共享内存表在服务器启动时创建（而不是导入时），关闭时删除
+        @app.on_event("startup")
+        async def start_shards():
+            hub.start()
+        
+        @app.on_event("shutdown")
+        async def stop_shards():
+            await hub.shutdown()
+    
+    @app.on_event("startup")
+    async def start_exporter():
+        # 启用 /metrics 时立即连接节点，不必等待仪表盘客户端
+        if config.METRICS_EXPORTER:
+            start_hub()
+    
+    @app.websocket("/socket.io/")
+    async def websocket_endpoint(websocket: WebSocket):
+        await websocket.accept()
+        # 协议通过查询参数选择: ?protocol=json（默认）、delta 或 binary
+        broadcaster.add(websocket, websocket.query_params.get('protocol', 'json'))
+        logger.debug('仪表盘客户端已连接')
+        
+        start_hub()
         
         try:
             # 保持连接活跃
             while True:
-                await websocket.receive_text()
+                if await websocket.receive_text() == RESYNC_MESSAGE:
+                    broadcaster.request_keyframe(websocket)
         except Exception as e:
             logger.debug(f'仪表盘客户端已断开连接: {e}')
         finally:
-            websocket_connections.discard(websocket)
+            broadcaster.remove(websocket)
+    
+    @app.get("/api/clients")
+    async def api_clients():
+        """报告每个仪表盘客户端的发送队列和延迟"""
+        return {"clients": broadcaster.stats()}
+    
+    @app.get("/api/events")
+    async def api_events():
+        """所有节点最近推送的 NVML 事件"""
+        return {"events": list(hub.recent_events)}
+    
+    if hasattr(hub, 'stats'):
+        @app.get("/api/hub")
+        async def api_hub():
+            """分片模式下工作进程的数量、重启次数和共享内存槽位大小"""
+            return hub.stats()
+    
+    if config.METRICS_EXPORTER:
+        @app.get("/metrics")
+        async def metrics(request: Request):
+            """Prometheus 抓取端点：所有节点的 GPU，带 node 标签"""
+            exporter.update(await hub.get_cluster_data())
+            return metrics_response(exporter, request)
 
 
-async def hub_loop(hub, connections):
+async def hub_loop(hub, broadcaster):
     """异步后台循环，发送聚合的集群数据"""
     logger.info("集群监测循环已启动")
     
     while hub.running:
         try:
-            cluster_data = await hub.get_cluster_data()
+            if broadcaster:
+                # 使用缓存片段拼接的 JSON，放入每个客户端的发送队列；
+                # 只有 json 客户端时不需要字典形式（分片模式下不必解析节点条目）
+                text = hub.get_cluster_json()
+                cluster_data = await hub.get_cluster_data() if broadcaster.protocols() - {'json'} else None
+                broadcaster.broadcast(cluster_data, text=text)
             
-            # 发送数据到所有已连接的客户端
-            if connections:
-                disconnected = set()
-                for websocket in connections:
-                    try:
-                        await websocket.send_text(json.dumps(cluster_data))
-                    except:
-                        disconnected.add(websocket)
-                
-                # 移除已断开连接的客户端
-                connections -= disconnected
-                
         except Exception as e:
             logger.error(f"集群循环中的错误: {e}")
         
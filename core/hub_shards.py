@@ -0,0 +1,400 @@
+"""分片集群模式 - 多个工作进程接收节点数据，前端进程从共享内存表构建客户端帧
+
+单进程的 Hub 在一个事件循环中处理所有节点的 WebSocket、解码和序列化，节点很多时
+受限于一个 CPU 核。分片模式下 HUB_WORKERS 个工作进程（python -m core.hub_shards）
+各自负责 NODE_URLS 的一部分：连接节点、解码帧、合并静态信息，并把每个节点发送给
+客户端的条目序列化为 JSON 后写入共享内存表中该节点的槽位。前端进程每帧只读取
+槽位头部，拼接有变化的节点片段，不再解析节点数据（只有 delta/binary 客户端和
+/metrics 需要字典时，才解析自上次以来变化的节点）。
+
+槽位布局（小端序）：
+
+    seq u64, online u32, gpu_count u32, name_len u32, fragment_len u32,
+    节点名称（UTF-8）, 节点条目（JSON）
+
+写入方使用 seqlock：写入前 seq 变为奇数，写完后变为下一个偶数；读取方复制数据后
+再次确认 seq 未变化，否则重试（或在下一帧读取）。工作进程推送的 GPU 事件以 JSON
+行写到标准输出，由前端转发给客户端。
+
+共享内存表在服务器启动时创建，退出时删除：正常关闭（shutdown 钩子）、解释器退出
+（atexit）和 SIGTERM 都会删除它，不会遗留在 /dev/shm 中。
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import struct
+import signal
+import asyncio
+import logging
+import argparse
+from collections import deque
+from multiprocessing import shared_memory, resource_tracker
+
+from . import config
+from .config import HUB_WORKERS, HUB_SHARD_SLOT_SIZE
+from .hub import Hub, RECENT_EVENTS
+
+logger = logging.getLogger(__name__)
+
+SEQ = struct.Struct('<Q')
+LENGTHS = struct.Struct('<IIII')  # online, gpu_count, name_len, fragment_len
+HEADER_SIZE = SEQ.size + LENGTHS.size
+READ_RETRIES = 3
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ShardTable:
+    """共享内存中每个节点一个槽位，保存节点名称、状态和序列化的节点条目"""
+
+    def __init__(self, memory, slots, slot_size):
+        self.memory = memory
+        self.slots = slots
+        self.slot_size = slot_size
+
+    @classmethod
+    def create(cls, slots, slot_size=HUB_SHARD_SLOT_SIZE):
+        memory = shared_memory.SharedMemory(create=True, size=max(1, slots) * slot_size)
+        return cls(memory, slots, slot_size)
+
+    @classmethod
+    def attach(cls, name, slots, slot_size):
+        memory = shared_memory.SharedMemory(name=name)
+        # 只有创建方负责释放：否则工作进程退出时它的 resource_tracker 会删除共享内存
+        resource_tracker.unregister(memory._name, 'shared_memory')
+        return cls(memory, slots, slot_size)
+
+    @property
+    def name(self):
+        return self.memory.name
+
+    def write(self, index, name, online, gpu_count, fragment):
+        """写入一个节点的最新条目（每个槽位只有一个写入方）；放不下时返回 False"""
+        name = name.encode('utf-8')
+        if HEADER_SIZE + len(name) + len(fragment) > self.slot_size:
+            return False
+
+        buf = self.memory.buf
+        offset = index * self.slot_size
+        seq = SEQ.unpack_from(buf, offset)[0]
+        SEQ.pack_into(buf, offset, seq + 1)  # 奇数：正在写入
+        body = offset + HEADER_SIZE
+        buf[body:body + len(name)] = name
+        buf[body + len(name):body + len(name) + len(fragment)] = fragment
+        LENGTHS.pack_into(buf, offset + SEQ.size, int(online), gpu_count, len(name), len(fragment))
+        SEQ.pack_into(buf, offset, seq + 2)
+        return True
+
+    def read(self, index, seen=None):
+        """读取槽位，返回 (seq, name, online, gpu_count, fragment)
+
+        槽位自 seen 以来没有变化、从未写入或一直在写入时返回 None
+        """
+        buf = self.memory.buf
+        offset = index * self.slot_size
+        for _ in range(READ_RETRIES):
+            seq = SEQ.unpack_from(buf, offset)[0]
+            if seq == seen or seq == 0:
+                return None
+            if seq & 1:
+                time.sleep(0)
+                continue
+            online, gpu_count, name_len, length = LENGTHS.unpack_from(buf, offset + SEQ.size)
+            if HEADER_SIZE + name_len + length > self.slot_size:
+                continue
+            body = bytes(buf[offset + HEADER_SIZE:offset + HEADER_SIZE + name_len + length])
+            if SEQ.unpack_from(buf, offset)[0] == seq:
+                return seq, body[:name_len].decode('utf-8'), bool(online), gpu_count, body[name_len:].decode('utf-8')
+        return None
+
+    def close(self):
+        self.memory.close()
+
+    def unlink(self):
+        """删除共享内存的名称（已映射的视图在 close 之前仍然有效）"""
+        try:
+            self.memory.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class ShardHub(Hub):
+    """工作进程中的 Hub：复用节点连接和解码，节点条目写入共享内存表而不是本地聚合"""
+
+    def __init__(self, nodes, table):
+        # nodes 为 [(槽位, url)]；父类初始化时会为每个节点写入离线条目
+        self.table = table
+        self.slot_of = {url: index for index, url in nodes}
+        self._too_large = set()
+        super().__init__([url for _, url in nodes])
+        self.on_event = self._emit_event
+
+    def _set_node(self, node_name, info):
+        self.nodes[node_name] = info
+        view = self._node_view(info)
+        fragment = json.dumps(view).encode('utf-8')
+        index = self.slot_of[info['url']]
+        online = view['status'] == 'online'
+        if self.table.write(index, node_name, online, len(view['gpus']), fragment):
+            self._too_large.discard(index)
+        elif index not in self._too_large:
+            self._too_large.add(index)
+            logger.error(f"Node {node_name}: Frame of {len(fragment)} bytes does not fit in "
+                         f"HUB_SHARD_SLOT_SIZE ({self.table.slot_size}), dropping its updates")
+
+    @staticmethod
+    def _emit_event(message):
+        sys.stdout.write(json.dumps(message) + '\n')
+        sys.stdout.flush()
+
+
+class ShardedHub:
+    """前端进程：启动并监督工作进程，从共享内存表拼接集群帧
+
+    接口与 Hub 相同（running、get_cluster_data、get_cluster_json、recent_events、
+    on_event、shutdown），由 register_hub_handlers 直接使用。
+    """
+
+    def __init__(self, node_urls, workers=HUB_WORKERS, slot_size=HUB_SHARD_SLOT_SIZE, max_backoff=30.0):
+        self.node_urls = node_urls
+        self.workers = max(1, min(workers, len(node_urls)))
+        self.slot_size = slot_size
+        self.max_backoff = max_backoff
+        self.running = False
+        self._connection_started = False
+        self.table = None  # 服务器启动时创建（start）
+        self._unlinked = False
+        self.recent_events = deque(maxlen=RECENT_EVENTS)
+        self.on_event = None
+        self.restarts = 0
+
+        self._slots = [None] * len(node_urls)  # 槽位 -> (seq, name, online, gpu_count, fragment)
+        self._views = {}  # 槽位 -> (seq, 解析后的节点条目)，只在需要字典时填充
+        self._cluster_data = None
+        self._cluster_json = None
+        self._processes = {}  # 分片编号 -> asyncio 子进程
+        self._tasks = []
+
+    def start(self):
+        """创建共享内存表（服务器启动时调用），注册进程退出和 SIGTERM 时的清理"""
+        if self.table is not None:
+            return
+        self.table = ShardTable.create(len(self.node_urls), self.slot_size)
+        atexit.register(self._unlink)
+        try:
+            previous = signal.getsignal(signal.SIGTERM)
+            signal.signal(signal.SIGTERM, lambda signum, frame: self._on_sigterm(previous, signum, frame))
+        except ValueError:
+            # 不在主线程中：依赖 shutdown 和 atexit
+            pass
+
+    def _on_sigterm(self, previous, signum, frame):
+        """先删除共享内存，再交给原来的处理程序（uvicorn 的优雅退出或默认行为）"""
+        self._unlink()
+        if callable(previous):
+            previous(signum, frame)
+        else:
+            signal.signal(signum, signal.SIG_DFL if previous is None else previous)
+            signal.raise_signal(signum)
+
+    def _unlink(self):
+        if self.table is not None and not self._unlinked:
+            self._unlinked = True
+            self.table.unlink()
+
+    def _shard_nodes(self, shard):
+        return [(index, url) for index, url in enumerate(self.node_urls) if index % self.workers == shard]
+
+    async def _connect_all_nodes(self):
+        """为每个分片启动一个监督任务（工作进程退出时按指数退避重启）"""
+        self.start()
+        logger.info(f"Starting {self.workers} hub worker(s) for {len(self.node_urls)} node(s)")
+        self._tasks = [asyncio.create_task(self._supervise(shard)) for shard in range(self.workers)]
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _supervise(self, shard):
+        backoff = 1.0
+        while self.running:
+            started = time.monotonic()
+            try:
+                code = await self._run_worker(shard)
+                logger.warning(f"Hub worker {shard} exited (code {code})")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Hub worker {shard} error: {e}")
+            if not self.running:
+                return
+            if time.monotonic() - started > 60:
+                backoff = 1.0
+            self.restarts += 1
+            logger.warning(f"Restarting hub worker {shard} in {backoff:.0f}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def _run_worker(self, shard):
+        """运行一个工作进程直到它退出，转发它推送的 GPU 事件"""
+        command = [
+            sys.executable, '-m', 'core.hub_shards',
+            '--table', self.table.name,
+            '--slots', str(self.table.slots),
+            '--slot-size', str(self.table.slot_size),
+            '--protocol', config.HUB_NODE_PROTOCOL,
+        ]
+        for index, url in self._shard_nodes(shard):
+            command += ['--node', f'{index}={url}']
+
+        # 工作进程的日志写到 stderr（继承），stdout 只用于事件
+        process = self._processes[shard] = await asyncio.create_subprocess_exec(
+            *command, cwd=ROOT, stdout=asyncio.subprocess.PIPE, limit=2 ** 20
+        )
+        try:
+            while line := await process.stdout.readline():
+                try:
+                    self._handle_event(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.debug(f"Hub worker {shard}: unparsed output: {line[:200]!r}")
+        finally:
+            if process.returncode is None:
+                process.terminate()
+            code = await process.wait()
+            self._processes.pop(shard, None)
+            self._mark_offline(shard)
+        return code
+
+    def _mark_offline(self, shard):
+        """工作进程退出后它的节点不再更新，槽位改为离线条目（此时没有其他写入方）"""
+        if self.table is None:
+            return
+        for index, url in self._shard_nodes(shard):
+            slot = self.table.read(index)
+            name = slot[1] if slot is not None else url
+            view = Hub._node_view({'status': 'offline', 'last_update': None})
+            self.table.write(index, name, False, 0, json.dumps(view).encode('utf-8'))
+
+    def _handle_event(self, message):
+        self.recent_events.append(message)
+        if self.on_event is not None:
+            self.on_event(message)
+
+    def _refresh(self):
+        """读取有变化的槽位，返回是否有节点变化"""
+        if self.table is None:
+            return False
+        changed = False
+        for index in range(self.table.slots):
+            current = self._slots[index]
+            slot = self.table.read(index, current[0] if current else None)
+            if slot is not None:
+                self._slots[index] = slot
+                changed = True
+        if changed:
+            self._cluster_data = None
+            self._cluster_json = None
+        return changed
+
+    def _cluster_stats(self):
+        slots = [slot for slot in self._slots if slot is not None and slot[2]]
+        return {
+            'total_nodes': len(self.node_urls),
+            'online_nodes': len(slots),
+            'total_gpus': sum(slot[3] for slot in slots),
+        }
+
+    def get_cluster_json(self):
+        """由每个节点槽位中的 JSON 片段直接拼接的集群帧（不解析节点数据）"""
+        self._refresh()
+        if self._cluster_json is None:
+            parts = [
+                f'{json.dumps(slot[1])}: {slot[4]}' for slot in self._slots if slot is not None
+            ]
+            self._cluster_json = (
+                '{"mode": "hub", "nodes": {' + ', '.join(parts) + '}, '
+                f'"cluster_stats": {json.dumps(self._cluster_stats())}}}'
+            )
+        return self._cluster_json
+
+    async def get_cluster_data(self):
+        """集群帧的字典形式（delta/binary 客户端和 /metrics），只解析变化的节点"""
+        self._refresh()
+        if self._cluster_data is None:
+            nodes = {}
+            for index, slot in enumerate(self._slots):
+                if slot is None:
+                    continue
+                cached = self._views.get(index)
+                if cached is None or cached[0] != slot[0]:
+                    # 新的条目对象，未变化的节点保持同一个对象（增量编码按引用跳过）
+                    cached = self._views[index] = (slot[0], json.loads(slot[4]))
+                nodes[slot[1]] = cached[1]
+            self._cluster_data = {'mode': 'hub', 'nodes': nodes, 'cluster_stats': self._cluster_stats()}
+        return self._cluster_data
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'restarts': self.restarts,
+            'running': sorted(self._processes),
+            'slot_size': self.slot_size,
+        }
+
+    async def shutdown(self):
+        """停止工作进程并释放共享内存（可重复调用）"""
+        self.running = False
+        # 可能在另一个事件循环中调用（服务器退出后），只取消当前循环中的任务
+        loop = asyncio.get_running_loop()
+        for task in self._tasks:
+            if task.get_loop() is loop:
+                task.cancel()
+        for process in list(self._processes.values()):
+            if process.returncode is None:
+                try:
+                    os.kill(process.pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+        self._processes.clear()
+        if self.table is not None:
+            self._unlink()
+            self.table.close()
+            self.table = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GPU Hot hub worker (started by the sharded hub)')
+    parser.add_argument('--table', required=True, help='Shared memory table name')
+    parser.add_argument('--slots', type=int, required=True)
+    parser.add_argument('--slot-size', type=int, required=True)
+    parser.add_argument('--protocol', default=config.HUB_NODE_PROTOCOL, help='Node -> hub protocol')
+    parser.add_argument('--node', action='append', default=[], help='SLOT=URL, repeatable')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if config.DEBUG else logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    config.HUB_NODE_PROTOCOL = args.protocol
+    nodes = [(int(index), url) for index, url in (node.split('=', 1) for node in args.node)]
+
+    table = ShardTable.attach(args.table, args.slots, args.slot_size)
+    hub = ShardHub(nodes, table)
+    hub.running = True
+    # 前端退出时 SIGTERM 结束工作进程
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        asyncio.run(_serve(hub, os.getppid()))
+    finally:
+        table.close()
+
+
+async def _serve(hub, parent):
+    """连接本分片的节点，前端进程意外退出（没有发送 SIGTERM）时随之退出"""
+    connect = asyncio.create_task(hub._connect_all_nodes())
+    while not connect.done() and os.getppid() == parent:
+        await asyncio.sleep(1)
+    connect.cancel()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""NVML 能力表 - 记住每个设备不支持的调用，热路径上直接跳过
+
+消费级显卡不支持相当一部分 NVML 调用（风扇、ECC、NVLink、应用时钟等），
+safe_get 每个 tick 都会重新调用并捕获 NVMLError_NotSupported。能力表按设备记录
+返回"不支持"的 (函数名, 参数)（不含句柄），之后的调用不再进入 NVML。
+第一次采集（启动时的检测）即建立能力表，之后每隔 CAPABILITY_REFRESH_INTERVAL
+以及驱动重新加载、设备变化时重新探测。
+"""
+
+import time
+import pynvml
+
+from .utils import handle_lost
+from ..config import CAPABILITY_REFRESH_INTERVAL
+
+# 表示调用不会在本设备/驱动上成功的错误（不会自行恢复）
+UNSUPPORTED_ERRORS = {
+    pynvml.NVML_ERROR_NOT_SUPPORTED,
+    pynvml.NVML_ERROR_FUNCTION_NOT_FOUND,
+    pynvml.NVML_ERROR_NO_PERMISSION,
+}
+
+
+def _describe(key):
+    """(函数名, 参数) -> 'nvmlDeviceGetTemperature(1)'"""
+    name, args = key
+    return f"{name}({', '.join(map(str, args))})" if args else name
+
+
+class DeviceCapabilities:
+    """一个设备上不支持的 NVML 调用"""
+
+    def __init__(self):
+        self.unsupported = {}  # (函数名, 参数) -> 错误描述
+        self.skipped = 0       # 因不支持而跳过的调用次数
+        self.created = time.monotonic()
+
+    def supports(self, name, *args):
+        return (name, args) not in self.unsupported
+
+    def mark(self, name, *args, error=None):
+        """记录不支持的调用（函数名和句柄之后的参数）"""
+        self.unsupported[(name, args)] = str(error) if error is not None else 'unsupported'
+
+    def skip(self, name, *args):
+        """调用已知不支持时返回 True 并计数"""
+        if (name, args) in self.unsupported:
+            self.skipped += 1
+            return True
+        return False
+
+    def get(self, func, handle, *args, default=None):
+        """调用 func(handle, *args)，出错时返回 default（同 safe_get）；不支持的调用被记住并跳过
+
+        句柄失效（GPU 丢失、NVML 未初始化）的错误照常抛出，由监测器重新枚举设备
+        """
+        key = (func.__name__, args)
+        if key in self.unsupported:
+            self.skipped += 1
+            return default
+        try:
+            result = func(handle, *args)
+        except pynvml.NVMLError as e:
+            if handle_lost(e, args, handle):
+                raise
+            # 句柄仍然有效时，不带参数的调用返回 INVALID_ARGUMENT 同样表示不支持
+            if getattr(e, 'value', None) in UNSUPPORTED_ERRORS or (
+                    isinstance(e, pynvml.NVMLError_InvalidArgument) and not args):
+                self.unsupported[key] = str(e)
+            return default
+        except Exception:
+            return default
+        return result if result is not None else default
+
+    def describe(self):
+        return {
+            'unsupported': sorted(_describe(key) for key in self.unsupported),
+            'skipped_calls': self.skipped,
+            'age': round(time.monotonic() - self.created, 1),
+        }
+
+
+class CapabilityMap:
+    """gpu_id -> DeviceCapabilities，定期重建以发现驱动更新后新支持的调用"""
+
+    def __init__(self, refresh_interval=CAPABILITY_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.devices = {}
+
+    def device(self, gpu_id):
+        caps = self.devices.get(gpu_id)
+        if caps is None or time.monotonic() - caps.created > self.refresh_interval:
+            caps = self.devices[gpu_id] = DeviceCapabilities()
+        return caps
+
+    def forget(self, gpu_id=None):
+        """丢弃能力记录（驱动重新加载或设备变化），下次调用时重新探测"""
+        if gpu_id is None:
+            self.devices.clear()
+        else:
+            self.devices.pop(gpu_id, None)
+
+    def describe(self):
+        """每个设备不支持的调用和跳过的次数（/api/capabilities）"""
+        return {gpu_id: caps.describe() for gpu_id, caps in self.devices.items()}
@@ -1,38 +1,219 @@
 """使用 NVML 收集 GPU 指标"""
 
-import time
 import pynvml
-from datetime import datetime
-from .utils import safe_get, decode_bytes, to_mib, to_watts
+from .utils import safe_get, handle_lost, decode_bytes, to_mib, to_watts, field_value, nvml_value, throttle_labels
+from .capabilities import CapabilityMap
+from .sample import GpuSample
+from ..config import METRIC_GROUP_INTERVALS, UPDATE_INTERVAL, NVML_FIELD_VALUES, NVML_SAMPLES
+
+# nvmlDeviceGetFieldValues 返回这些错误时，说明驱动/设备不支持该字段（不会自行恢复）
+FIELD_UNSUPPORTED_ERRORS = {
+    pynvml.NVML_ERROR_NOT_SUPPORTED,
+    pynvml.NVML_ERROR_FUNCTION_NOT_FOUND,
+    pynvml.NVML_ERROR_INVALID_ARGUMENT,
+}
+
+# NVLink 字段的 scopeId 为 UINT_MAX 时返回所有链路的合计值
+NVLINK_ALL_LINKS = 0xFFFFFFFF
+
+
+def _field(name):
+    """字段 ID（旧版 pynvml 没有定义的字段为 None）"""
+    return getattr(pynvml, name, None)
 
 
 class MetricsCollector:
     """通过 NVML 收集所有可用的 GPU 指标"""
     
-    def __init__(self):
-        self.previous_samples = {}
-        self.last_sample_time = {}
+    # 可以通过一次 nvmlDeviceGetFieldValues 调用批量读取的指标，按轮询组划分
+    # (键, 字段 ID, scopeId, 换算)；驱动不支持的字段回退到原有的单独调用
+    FIELD_GROUPS = {
+        'power_thermal': [
+            ('power_draw', _field('NVML_FI_DEV_POWER_AVERAGE'), 0, to_watts),
+            ('power_limit', _field('NVML_FI_DEV_POWER_CURRENT_LIMIT'), 0, to_watts),
+            ('energy_consumption', _field('NVML_FI_DEV_TOTAL_ENERGY_CONSUMPTION'), 0, lambda mj: float(mj) / 1000.0),
+            ('temperature_memory', _field('NVML_FI_DEV_MEMORY_TEMP'), 0, float),
+        ],
+        'connectivity': [
+            ('pcie_replay_count', _field('NVML_FI_DEV_PCIE_REPLAY_COUNTER'), 0, int),
+            ('nvlink_tx_kib', _field('NVML_FI_DEV_NVLINK_THROUGHPUT_DATA_TX'), NVLINK_ALL_LINKS, int),
+            ('nvlink_rx_kib', _field('NVML_FI_DEV_NVLINK_THROUGHPUT_DATA_RX'), NVLINK_ALL_LINKS, int),
+        ],
+        'health_status': [
+            ('ecc_errors_corrected', _field('NVML_FI_DEV_ECC_SBE_VOL_TOTAL'), 0, int),
+            ('retired_pages', _field('NVML_FI_DEV_RETIRED_DBE'), 0, int),
+        ],
+    }
+    
+    # 缓冲采样模式读取的样本类型: (键, 采样类型, 换算)
+    SAMPLE_TYPES = [
+        ('utilization', pynvml.NVML_GPU_UTILIZATION_SAMPLES, float),
+        ('memory_utilization', pynvml.NVML_MEMORY_UTILIZATION_SAMPLES, float),
+        ('power_draw', pynvml.NVML_TOTAL_POWER_SAMPLES, to_watts),
+        ('clock_graphics', pynvml.NVML_PROCESSOR_CLK_SAMPLES, float),
+        ('clock_memory', pynvml.NVML_MEMORY_CLK_SAMPLES, float),
+    ]
+    
+    def __init__(self, group_intervals=None, field_values=NVML_FIELD_VALUES, samples=NVML_SAMPLES, capabilities=None):
+        # 变化率: gpu_id -> (上一次的 memory_used, 单调时间纳秒)
+        self.previous_memory = {}
+        # 分组轮询: gpu_id -> 组名 -> (上次刷新的单调时间（秒）, 指标值)
+        self.group_intervals = METRIC_GROUP_INTERVALS if group_intervals is None else group_intervals
+        self.group_cache = {}
+        # 静态信息缓存: gpu_id -> 只需探测一次的设备信息
+        self.static_info = {}
+        # 每次静态信息被（重新）探测时递增，用于通知客户端重新获取
+        self.static_version = 0
+        # 能力表: 每个设备不支持的 NVML 调用（包括批量字段和样本类型），热路径上直接跳过
+        self.capabilities = CapabilityMap() if capabilities is None else capabilities
+        self.field_values = field_values
+        # 缓冲采样: gpu_id -> {键: 最后一个样本的时间戳（微秒）}
+        self.samples = samples
+        self.sample_timestamps = {}
     
     def collect_all(self, handle, gpu_id):
-        """收集单个 GPU 的所有可用指标"""
-        data = {
-            'index': gpu_id,
-            'timestamp': datetime.now().isoformat()
-        }
-        current_time = time.time()
+        """收集单个 GPU 的所有动态指标（静态信息见 get_static_info），返回 GpuSample"""
+        sample = GpuSample(gpu_id)
+        current_time = sample.monotonic_ns / 1e9
+        caps = self.capabilities.device(gpu_id)
+        
+        # 确保静态信息已缓存（每个设备只探测一次）
+        self.get_static_info(handle, gpu_id)
+        
+        groups = [
+            ('performance', lambda d: self._add_performance(handle, caps, d)),
+            ('memory', lambda d: self._add_memory(handle, caps, d, gpu_id, sample.monotonic_ns)),
+            ('power_thermal', lambda d: self._add_power_thermal(handle, caps, d)),
+            ('clocks', lambda d: self._add_clocks(handle, caps, d)),
+            ('connectivity', lambda d: self._add_connectivity(handle, caps, d)),
+            ('media_engines', lambda d: self._add_media_engines(handle, caps, d)),
+            ('health_status', lambda d: self._add_health_status(handle, caps, d)),
+            ('advanced', lambda d: self._add_advanced(handle, caps, d)),
+        ]
+        
+        for group, collect in groups:
+            sample.add(self._collect_group(gpu_id, group, current_time, collect))
+        
+        if self.samples:
+            values = {}
+            self._add_samples(handle, caps, values, gpu_id, sample.time_ns // 1000)
+            sample.add(values)
         
+        return sample
+    
+    def _collect_group(self, gpu_id, group, current_time, collect):
+        """按组的轮询间隔收集指标，未到期时沿用上次的值"""
+        cache = self.group_cache.setdefault(gpu_id, {})
+        interval = self.group_intervals.get(group, UPDATE_INTERVAL)
+        
+        cached = cache.get(group)
+        if cached is not None and interval > UPDATE_INTERVAL and current_time - cached[0] < interval:
+            return cached[1]
+        
+        values = {}
+        collect(values)
+        cache[group] = (current_time, values)
+        return values
+    
+    def _read_fields(self, handle, caps, group):
+        """用一次 nvmlDeviceGetFieldValues 调用读取该组的字段，返回 {键: 值}
+
+        调用失败或字段暂时不可用时结果中不包含该键，由调用方回退到单独的 NVML 调用；
+        驱动明确不支持的字段记录在能力表中，之后不再请求
+        """
+        if not self.field_values or not hasattr(pynvml, 'nvmlDeviceGetFieldValues'):
+            return {}
+        if caps.skip('nvmlDeviceGetFieldValues'):
+            return {}
+        
+        batch = [
+            (key, field_id, scope, convert) for key, field_id, scope, convert in self.FIELD_GROUPS[group]
+            if field_id is not None and caps.supports('nvmlDeviceGetFieldValues', field_id)
+        ]
+        if not batch:
+            return {}
+        
+        try:
+            values = pynvml.nvmlDeviceGetFieldValues(handle, [(field_id, scope) for _, field_id, scope, _ in batch])
+        except pynvml.NVMLError as e:
+            if handle_lost(e, batch):
+                raise
+            if getattr(e, 'value', None) in FIELD_UNSUPPORTED_ERRORS:
+                caps.mark('nvmlDeviceGetFieldValues', error=e)
+            return {}
+        
+        result = {}
+        for (key, field_id, _, convert), value in zip(batch, values):
+            if value.nvmlReturn == pynvml.NVML_SUCCESS:
+                result[key] = convert(field_value(value))
+            elif value.nvmlReturn in FIELD_UNSUPPORTED_ERRORS:
+                caps.mark('nvmlDeviceGetFieldValues', field_id, error=pynvml.NVMLError(value.nvmlReturn))
+        return result
+    
+    def _add_samples(self, handle, caps, data, gpu_id, now_us):
+        """读取上次以来驱动缓冲的所有样本（只取更新的时间戳），输出 min/max/avg"""
+        timestamps = self.sample_timestamps.setdefault(gpu_id, {})
+        # 第一次读取时只取最近一个轮询间隔内的样本（驱动的时间戳为挂钟微秒）
+        start = now_us - int(UPDATE_INTERVAL * 1e6)
+        
+        for key, sampling_type, convert in self.SAMPLE_TYPES:
+            if caps.skip('nvmlDeviceGetSamples', sampling_type):
+                continue
+            try:
+                value_type, samples = pynvml.nvmlDeviceGetSamples(handle, sampling_type, timestamps.get(key, start))
+            except pynvml.NVMLError as e:
+                if handle_lost(e, (sampling_type,)):
+                    raise
+                # NOT_FOUND 表示没有新的样本
+                if getattr(e, 'value', None) in FIELD_UNSUPPORTED_ERRORS:
+                    caps.mark('nvmlDeviceGetSamples', sampling_type, error=e)
+                continue
+            if not samples:
+                continue
+            
+            values = [convert(nvml_value(sample.sampleValue, value_type)) for sample in samples]
+            timestamps[key] = max(sample.timeStamp for sample in samples)
+            data[f'{key}_min'] = min(values)
+            data[f'{key}_max'] = max(values)
+            data[f'{key}_avg'] = round(sum(values) / len(values), 2)
+    
+    def get_static_info(self, handle, gpu_id):
+        """获取单个 GPU 的静态信息，首次调用时探测并缓存"""
+        if gpu_id not in self.static_info:
+            self.static_info[gpu_id] = self._probe_static_info(handle)
+            self.static_version += 1
+        return self.static_info[gpu_id]
+    
+    def clear_static_info(self, gpu_id=None):
+        """清除静态信息缓存（例如驱动重新加载后），下次收集时重新探测"""
+        if gpu_id is None:
+            self.static_info.clear()
+        else:
+            self.static_info.pop(gpu_id, None)
+        self.capabilities.forget(gpu_id)
+    
+    def forget_device(self, gpu_id):
+        """丢弃某个 gpu_id 的所有缓存（设备被移除或索引指向了其他设备）"""
+        self.static_info.pop(gpu_id, None)
+        self.group_cache.pop(gpu_id, None)
+        self.previous_memory.pop(gpu_id, None)
+        self.sample_timestamps.pop(gpu_id, None)
+        self.capabilities.forget(gpu_id)
+    
+    def _probe_static_info(self, handle):
+        """探测设备生命周期内不会变化的信息"""
+        data = {}
         self._add_basic_info(handle, data)
-        self._add_performance(handle, data)
-        self._add_memory(handle, data, gpu_id, current_time)
-        self._add_power_thermal(handle, data)
-        self._add_clocks(handle, data)
-        self._add_connectivity(handle, data)
-        self._add_media_engines(handle, data)
-        self._add_health_status(handle, data)
-        self._add_advanced(handle, data)
-        
-        self.previous_samples[gpu_id] = data.copy()
-        self.last_sample_time[gpu_id] = current_time
+        self._add_static_clocks(handle, data)
+        self._add_static_connectivity(handle, data)
+        
+        if constraints := safe_get(pynvml.nvmlDeviceGetPowerManagementLimitConstraints, handle):
+            if isinstance(constraints, tuple) and len(constraints) >= 2:
+                data['power_limit_min'] = to_watts(constraints[0])
+                data['power_limit_max'] = to_watts(constraints[1])
+        
+        if multi := safe_get(pynvml.nvmlDeviceGetMultiGpuBoard, handle):
+            data['multi_gpu_board'] = bool(multi)
         
         return data
     
@@ -109,128 +290,127 @@ class MetricsCollector:
         
         return 'Unknown'
     
-    def _add_performance(self, handle, data):
+    def _add_performance(self, handle, caps, data):
         """先进性能指标"""
         # 利用率
-        if util := safe_get(pynvml.nvmlDeviceGetUtilizationRates, handle):
+        if util := caps.get(pynvml.nvmlDeviceGetUtilizationRates, handle):
             data['utilization'] = float(util.gpu)
             data['memory_utilization'] = float(util.memory)
         
         # Performance state
-        if pstate := safe_get(pynvml.nvmlDeviceGetPerformanceState, handle):
+        if pstate := caps.get(pynvml.nvmlDeviceGetPerformanceState, handle):
             data['performance_state'] = f'P{pstate}'
         
         # 计算模式
-        if mode := safe_get(pynvml.nvmlDeviceGetComputeMode, handle):
+        if mode := caps.get(pynvml.nvmlDeviceGetComputeMode, handle):
             modes = {0: 'Default', 1: 'Exclusive Thread', 
                     2: 'Prohibited', 3: 'Exclusive Process'}
             data['compute_mode'] = modes.get(mode, 'Unknown')
     
-    def _add_memory(self, handle, data, gpu_id, current_time):
+    def _add_memory(self, handle, caps, data, gpu_id, now_ns):
         """内存指标"""
-        if mem := safe_get(pynvml.nvmlDeviceGetMemoryInfo, handle):
+        if mem := caps.get(pynvml.nvmlDeviceGetMemoryInfo, handle):
             data['memory_used'] = to_mib(mem.used)
             data['memory_total'] = to_mib(mem.total)
             data['memory_free'] = to_mib(mem.free)
             
-            # 计算变化率
-            if gpu_id in self.previous_samples:
-                prev = self.previous_samples[gpu_id]
-                if 'memory_used' in prev:
-                    dt = current_time - self.last_sample_time.get(gpu_id, current_time)
-                    if dt > 0:
-                        delta = data['memory_used'] - prev['memory_used']
-                        data['memory_change_rate'] = float(delta / dt)
+            # 计算变化率（只保留上一次的读数和时间）
+            if previous := self.previous_memory.get(gpu_id):
+                used, previous_ns = previous
+                if now_ns > previous_ns:
+                    data['memory_change_rate'] = float((data['memory_used'] - used) * 1e9 / (now_ns - previous_ns))
+            
+            # 在内存组实际刷新时记录时间，以便按实际采样间隔计算变化率
+            self.previous_memory[gpu_id] = (data['memory_used'], now_ns)
         
         # BAR1 内存
-        if bar1 := safe_get(pynvml.nvmlDeviceGetBAR1MemoryInfo, handle):
+        if bar1 := caps.get(pynvml.nvmlDeviceGetBAR1MemoryInfo, handle):
             data['bar1_memory_used'] = to_mib(bar1.bar1Used)
             data['bar1_memory_total'] = to_mib(bar1.bar1Total)
     
-    def _add_power_thermal(self, handle, data):
+    def _add_power_thermal(self, handle, caps, data):
         """功率和温度指标"""
-        self._add_temperature(handle, data)
-        self._add_power(handle, data)
-        self._add_fan_speeds(handle, data)
-        self._add_throttling(handle, data)
+        fields = self._read_fields(handle, caps, 'power_thermal')
+        self._add_temperature(handle, caps, data, fields)
+        self._add_power(handle, caps, data, fields)
+        self._add_fan_speeds(handle, caps, data)
+        self._add_throttling(handle, caps, data)
     
-    def _add_temperature(self, handle, data):
+    def _add_temperature(self, handle, caps, data, fields):
         """温度指标"""
-        if temp := safe_get(pynvml.nvmlDeviceGetTemperature, handle, pynvml.NVML_TEMPERATURE_GPU):
+        if temp := caps.get(pynvml.nvmlDeviceGetTemperature, handle, pynvml.NVML_TEMPERATURE_GPU):
             data['temperature'] = float(temp)
         
-        if temp_mem := safe_get(pynvml.nvmlDeviceGetTemperature, handle, 1):
-            if temp_mem > 0:
-                data['temperature_memory'] = float(temp_mem)
+        temp_mem = fields.get('temperature_memory')
+        if temp_mem is None:
+            temp_mem = caps.get(pynvml.nvmlDeviceGetTemperature, handle, 1)
+        if temp_mem and temp_mem > 0:
+            data['temperature_memory'] = float(temp_mem)
     
-    def _add_power(self, handle, data):
-        """功率指标"""
-        if power := safe_get(pynvml.nvmlDeviceGetPowerUsage, handle):
+    def _add_power(self, handle, caps, data, fields):
+        """功率指标（优先使用批量读取的字段）"""
+        if 'power_draw' in fields:
+            data['power_draw'] = fields['power_draw']
+        elif power := caps.get(pynvml.nvmlDeviceGetPowerUsage, handle):
             data['power_draw'] = to_watts(power)
         
-        if limit := safe_get(pynvml.nvmlDeviceGetPowerManagementLimit, handle):
+        if 'power_limit' in fields:
+            data['power_limit'] = fields['power_limit']
+        elif limit := caps.get(pynvml.nvmlDeviceGetPowerManagementLimit, handle):
             data['power_limit'] = to_watts(limit)
         
-        if constraints := safe_get(pynvml.nvmlDeviceGetPowerManagementLimitConstraints, handle):
-            if isinstance(constraints, tuple) and len(constraints) >= 2:
-                data['power_limit_min'] = to_watts(constraints[0])
-                data['power_limit_max'] = to_watts(constraints[1])
-        
-        if energy := safe_get(pynvml.nvmlDeviceGetTotalEnergyConsumption, handle):
+        if 'energy_consumption' in fields:
+            data['energy_consumption'] = fields['energy_consumption']
+            data['energy_consumption_wh'] = fields['energy_consumption'] / 3600.0
+        elif energy := caps.get(pynvml.nvmlDeviceGetTotalEnergyConsumption, handle):
             data['energy_consumption'] = float(energy) / 1000.0
             data['energy_consumption_wh'] = float(energy) / 3600000.0
     
-    def _add_fan_speeds(self, handle, data):
+    def _add_fan_speeds(self, handle, caps, data):
         """风扇速度指标"""
-        if fan := safe_get(pynvml.nvmlDeviceGetFanSpeed, handle):
+        if fan := caps.get(pynvml.nvmlDeviceGetFanSpeed, handle):
             data['fan_speed'] = float(fan)
         
         if hasattr(pynvml, 'nvmlDeviceGetNumFans') and hasattr(pynvml, 'nvmlDeviceGetFanSpeed_v2'):
-            if num_fans := safe_get(pynvml.nvmlDeviceGetNumFans, handle):
+            if num_fans := caps.get(pynvml.nvmlDeviceGetNumFans, handle):
                 fans = []
                 for i in range(num_fans):
-                    if speed := safe_get(pynvml.nvmlDeviceGetFanSpeed_v2, handle, i):
+                    if speed := caps.get(pynvml.nvmlDeviceGetFanSpeed_v2, handle, i):
                         fans.append(float(speed))
                 if fans:
                     data['fan_speeds'] = fans
     
-    def _add_throttling(self, handle, data):
+    def _add_throttling(self, handle, caps, data):
         """时钟节流指标"""
-        if throttle := safe_get(pynvml.nvmlDeviceGetCurrentClocksThrottleReasons, handle):
-            throttle_map = [
-                (pynvml.nvmlClocksThrottleReasonGpuIdle, 'GPU 空闲'),
-                (pynvml.nvmlClocksThrottleReasonApplicationsClocksSetting, '应用时钟设置'),
-                (pynvml.nvmlClocksThrottleReasonSwPowerCap, '软件功率限制'),
-                (pynvml.nvmlClocksThrottleReasonHwSlowdown, '硬件降速'),
-                (pynvml.nvmlClocksThrottleReasonSwThermalSlowdown, '软件热降速'),
-                (pynvml.nvmlClocksThrottleReasonHwThermalSlowdown, '硬件热降速'),
-                (pynvml.nvmlClocksThrottleReasonHwPowerBrakeSlowdown, '功率刹车降速'),
-            ]
-            reasons = [label for flag, label in throttle_map if throttle & flag]
+        if throttle := caps.get(pynvml.nvmlDeviceGetCurrentClocksThrottleReasons, handle):
+            reasons = throttle_labels(throttle)
             data['throttle_reasons'] = ', '.join(reasons) if reasons else '无'
     
-    def _add_clocks(self, handle, data):
+    CLOCK_TYPES = [
+        ('clock_graphics', pynvml.NVML_CLOCK_GRAPHICS),
+        ('clock_sm', pynvml.NVML_CLOCK_SM),
+        ('clock_memory', pynvml.NVML_CLOCK_MEM),
+        ('clock_video', pynvml.NVML_CLOCK_VIDEO),
+    ]
+    
+    def _add_clocks(self, handle, caps, data):
         """时钟速度指标"""
-        clock_types = [
-            ('clock_graphics', pynvml.NVML_CLOCK_GRAPHICS),
-            ('clock_sm', pynvml.NVML_CLOCK_SM),
-            ('clock_memory', pynvml.NVML_CLOCK_MEM),
-            ('clock_video', pynvml.NVML_CLOCK_VIDEO),
-        ]
-        
-        for key, clock_type in clock_types:
+        for key, clock_type in self.CLOCK_TYPES:
             # 当前时钟
-            if clock := safe_get(pynvml.nvmlDeviceGetClockInfo, handle, clock_type):
+            if clock := caps.get(pynvml.nvmlDeviceGetClockInfo, handle, clock_type):
                 data[key] = float(clock)
             
+            # 应用时钟（用户/驱动设置的目标时钟）
+            if app_clock := caps.get(pynvml.nvmlDeviceGetApplicationsClock, handle, clock_type):
+                data[f'{key}_app'] = float(app_clock)
+    
+    def _add_static_clocks(self, handle, data):
+        """静态时钟信息（最大/默认时钟，支持的内存时钟）"""
+        for key, clock_type in self.CLOCK_TYPES:
             # 最大时钟
             if max_clock := safe_get(pynvml.nvmlDeviceGetMaxClockInfo, handle, clock_type):
                 data[f'{key}_max'] = float(max_clock)
             
-            # 应用时钟（用户/驱动设置的目标时钟）
-            if app_clock := safe_get(pynvml.nvmlDeviceGetApplicationsClock, handle, clock_type):
-                data[f'{key}_app'] = float(app_clock)
-            
             # 默认应用时钟
             if default_clock := safe_get(pynvml.nvmlDeviceGetDefaultApplicationsClock, handle, clock_type):
                 data[f'{key}_default'] = float(default_clock)
@@ -243,122 +423,123 @@ class MetricsCollector:
         except:
             pass
     
-    def _add_connectivity(self, handle, data):
+    def _add_connectivity(self, handle, caps, data):
         """PCIe 连接指标"""
+        # PCIe 重放计数和 NVLink 数据量计数（KiB）只有批量字段可用
+        data.update(self._read_fields(handle, caps, 'connectivity'))
         
         pcie_metrics = [
             ('pcie_gen', pynvml.nvmlDeviceGetCurrPcieLinkGeneration),
-            ('pcie_gen_max', pynvml.nvmlDeviceGetMaxPcieLinkGeneration),
             ('pcie_width', pynvml.nvmlDeviceGetCurrPcieLinkWidth),
-            ('pcie_width_max', pynvml.nvmlDeviceGetMaxPcieLinkWidth),
         ]
         
         for key, func in pcie_metrics:
-            if value := safe_get(func, handle):
+            if value := caps.get(func, handle):
                 data[key] = str(value)
         
         # PCIe 吞吐量
-        if tx := safe_get(pynvml.nvmlDeviceGetPcieThroughput, handle,
+        if tx := caps.get(pynvml.nvmlDeviceGetPcieThroughput, handle,
                          pynvml.NVML_PCIE_UTIL_TX_BYTES):
             data['pcie_tx_throughput'] = float(tx)
         
-        if rx := safe_get(pynvml.nvmlDeviceGetPcieThroughput, handle,
+        if rx := caps.get(pynvml.nvmlDeviceGetPcieThroughput, handle,
                          pynvml.NVML_PCIE_UTIL_RX_BYTES):
             data['pcie_rx_throughput'] = float(rx)
+    
+    def _add_static_connectivity(self, handle, data):
+        """静态 PCIe 信息（最大链路能力，总线 ID）"""
+        pcie_metrics = [
+            ('pcie_gen_max', pynvml.nvmlDeviceGetMaxPcieLinkGeneration),
+            ('pcie_width_max', pynvml.nvmlDeviceGetMaxPcieLinkWidth),
+        ]
+        
+        for key, func in pcie_metrics:
+            if value := safe_get(func, handle):
+                data[key] = str(value)
         
         # PCI 信息
         if pci := safe_get(pynvml.nvmlDeviceGetPciInfo, handle):
             data['pci_bus_id'] = decode_bytes(pci.busId)
     
-    def _add_media_engines(self, handle, data):
+    def _add_media_engines(self, handle, caps, data):
         """编码器/解码器指标"""
         # 编码器
-        if enc := safe_get(pynvml.nvmlDeviceGetEncoderUtilization, handle):
+        if enc := caps.get(pynvml.nvmlDeviceGetEncoderUtilization, handle):
             if isinstance(enc, tuple) and len(enc) >= 2:
                 data['encoder_utilization'] = float(enc[0])
         
-        try:
-            if sessions := pynvml.nvmlDeviceGetEncoderSessions(handle):
-                data['encoder_sessions'] = len(sessions)
-                if fps := [s.averageFps for s in sessions if hasattr(s, 'averageFps')]:
-                    data['encoder_fps'] = float(sum(fps) / len(fps))
-        except:
-            pass
+        if sessions := caps.get(pynvml.nvmlDeviceGetEncoderSessions, handle):
+            data['encoder_sessions'] = len(sessions)
+            if fps := [s.averageFps for s in sessions if hasattr(s, 'averageFps')]:
+                data['encoder_fps'] = float(sum(fps) / len(fps))
         
         # 解码器
-        if dec := safe_get(pynvml.nvmlDeviceGetDecoderUtilization, handle):
+        if dec := caps.get(pynvml.nvmlDeviceGetDecoderUtilization, handle):
             if isinstance(dec, tuple) and len(dec) >= 2:
                 data['decoder_utilization'] = float(dec[0])
         
-        try:
-            if sessions := pynvml.nvmlDeviceGetDecoderSessions(handle):
-                data['decoder_sessions'] = len(sessions)
-        except:
-            pass
+        if sessions := caps.get(pynvml.nvmlDeviceGetDecoderSessions, handle):
+            data['decoder_sessions'] = len(sessions)
     
-    def _add_health_status(self, handle, data):
+    def _add_health_status(self, handle, caps, data):
         """ECC 和健康指标"""
-        try:
-            if ecc := pynvml.nvmlDeviceGetEccMode(handle):
-                if ecc[0]:
-                    data['ecc_enabled'] = True
-                    
-                    # ECC errors
-                    if err := safe_get(pynvml.nvmlDeviceGetTotalEccErrors, handle,
-                                      pynvml.NVML_MEMORY_ERROR_TYPE_CORRECTED,
-                                      pynvml.NVML_VOLATILE_ECC):
-                        data['ecc_errors_corrected'] = int(err)
-        except:
-            pass
+        fields = self._read_fields(handle, caps, 'health_status')
+        if (ecc := caps.get(pynvml.nvmlDeviceGetEccMode, handle)) and ecc[0]:
+            data['ecc_enabled'] = True
+            
+            # ECC errors
+            if 'ecc_errors_corrected' in fields:
+                data['ecc_errors_corrected'] = fields['ecc_errors_corrected']
+            elif err := caps.get(pynvml.nvmlDeviceGetTotalEccErrors, handle,
+                                pynvml.NVML_MEMORY_ERROR_TYPE_CORRECTED,
+                                pynvml.NVML_VOLATILE_ECC):
+                data['ecc_errors_corrected'] = int(err)
         
         # Retired pages
-        try:
-            if pages := pynvml.nvmlDeviceGetRetiredPages(handle,
-                        pynvml.NVML_PAGE_RETIREMENT_CAUSE_DOUBLE_BIT_ECC_ERROR):
-                data['retired_pages'] = len(pages)
-        except:
-            pass
+        if 'retired_pages' in fields:
+            data['retired_pages'] = fields['retired_pages']
+            return
+        if pages := caps.get(pynvml.nvmlDeviceGetRetiredPages, handle,
+                             pynvml.NVML_PAGE_RETIREMENT_CAUSE_DOUBLE_BIT_ECC_ERROR):
+            data['retired_pages'] = len(pages)
     
-    def _add_advanced(self, handle, data):
+    def _add_advanced(self, handle, caps, data):
         """高级指标"""
-        if mode := safe_get(pynvml.nvmlDeviceGetPersistenceMode, handle):
+        if mode := caps.get(pynvml.nvmlDeviceGetPersistenceMode, handle):
             data['persistence_mode'] = 'Enabled' if mode else 'Disabled'
         
-        if display := safe_get(pynvml.nvmlDeviceGetDisplayActive, handle):
+        if display := caps.get(pynvml.nvmlDeviceGetDisplayActive, handle):
             data['display_active'] = bool(display)
         
-        if multi := safe_get(pynvml.nvmlDeviceGetMultiGpuBoard, handle):
-            data['multi_gpu_board'] = bool(multi)
-        
-        if procs := safe_get(pynvml.nvmlDeviceGetGraphicsRunningProcesses, handle, default=[]):
+        if procs := caps.get(pynvml.nvmlDeviceGetGraphicsRunningProcesses, handle, default=[]):
             data['graphics_processes_count'] = len(procs)
         
-        self._add_mig_mode(handle, data)
-        self._add_nvlink(handle, data)
+        self._add_mig_mode(handle, caps, data)
+        self._add_nvlink(handle, caps, data)
     
-    def _add_mig_mode(self, handle, data):
+    def _add_mig_mode(self, handle, caps, data):
         """MIG 模式指标"""
         if hasattr(pynvml, 'nvmlDeviceGetMigMode'):
-            if mig := safe_get(pynvml.nvmlDeviceGetMigMode, handle):
+            if mig := caps.get(pynvml.nvmlDeviceGetMigMode, handle):
                 if isinstance(mig, tuple) and len(mig) >= 2:
                     data['mig_mode_current'] = 'Enabled' if mig[0] else 'Disabled'
                     data['mig_mode_pending'] = 'Enabled' if mig[1] else 'Disabled'
     
-    def _add_nvlink(self, handle, data):
+    def _add_nvlink(self, handle, caps, data):
         """NVLink 指标"""
         if hasattr(pynvml, 'nvmlDeviceGetNvLinkState'):
             nvlinks = []
             active_count = 0
             
             for link_id in range(6):
-                if state := safe_get(pynvml.nvmlDeviceGetNvLinkState, handle, link_id):
+                if state := caps.get(pynvml.nvmlDeviceGetNvLinkState, handle, link_id):
                     link_data = {'id': link_id, 'active': bool(state)}
                     
                     if hasattr(pynvml, 'nvmlDeviceGetNvLinkCapability'):
                         if hasattr(pynvml, 'NVML_NVLINK_CAP_P2P_SUPPORTED'):
-                            if caps := safe_get(pynvml.nvmlDeviceGetNvLinkCapability, handle, 
-                                              link_id, pynvml.NVML_NVLINK_CAP_P2P_SUPPORTED):
-                                link_data['p2p_supported'] = bool(caps)
+                            if p2p := caps.get(pynvml.nvmlDeviceGetNvLinkCapability, handle,
+                                             link_id, pynvml.NVML_NVLINK_CAP_P2P_SUPPORTED):
+                                link_data['p2p_supported'] = bool(p2p)
                     
                     nvlinks.append(link_data)
                     if state:
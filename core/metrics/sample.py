@@ -0,0 +1,40 @@
+"""GPU 样本 - 采集器内部的紧凑表示，发布时才转换为字典
+
+每个 tick 的各指标组结果（分组缓存中的字典，未到期的组直接复用同一个对象）
+只被引用，不合并、不复制；时间戳是整数纳秒，ISO 字符串只在 to_dict 中生成一次。
+"""
+
+import time
+from datetime import datetime
+
+
+class GpuSample:
+    """单个 GPU 一个 tick 的指标：分组结果的引用和单调/挂钟纳秒时间戳"""
+
+    __slots__ = ('gpu_id', 'time_ns', 'monotonic_ns', 'groups')
+
+    def __init__(self, gpu_id):
+        self.gpu_id = gpu_id
+        self.time_ns = time.time_ns()            # 挂钟时间（发布的 timestamp、驱动样本的起点）
+        self.monotonic_ns = time.monotonic_ns()  # 单调时间（轮询间隔和变化率）
+        self.groups = []                         # 各组的 {键: 值}，按收集顺序，后面的覆盖前面的
+
+    def add(self, values):
+        if values:
+            self.groups.append(values)
+
+    def get(self, key, default=None):
+        for values in reversed(self.groups):
+            if key in values:
+                return values[key]
+        return default
+
+    def to_dict(self):
+        """转换为发布的格式（每个 GPU 每个 tick 一次）"""
+        data = {
+            'index': self.gpu_id,
+            'timestamp': datetime.fromtimestamp(self.time_ns / 1e9).isoformat(),
+        }
+        for values in self.groups:
+            data.update(values)
+        return data
@@ -3,6 +3,33 @@
 import pynvml
 
 
+# 表示句柄已失效、需要重新枚举设备的 NVML 错误
+HANDLE_LOST_ERRORS = (
+    pynvml.NVMLError_GpuIsLost,
+    pynvml.NVMLError_InvalidArgument,
+    pynvml.NVMLError_Uninitialized,
+)
+
+
+def handle_lost(error, args=(), handle=None):
+    """NVML 错误是否表示句柄失效
+
+    带参数的调用返回 INVALID_ARGUMENT 时，无效的可能是参数（传感器、时钟类型等）而不是句柄；
+    不带参数的调用有些驱动也用 INVALID_ARGUMENT 表示不支持，用 nvmlDeviceGetUUID 确认句柄
+    """
+    if isinstance(error, pynvml.NVMLError_InvalidArgument):
+        if args:
+            return False
+        if handle is None:
+            return True
+        try:
+            pynvml.nvmlDeviceGetUUID(handle)
+        except pynvml.NVMLError:
+            return True
+        return False
+    return isinstance(error, HANDLE_LOST_ERRORS)
+
+
 def safe_get(func, *args, default=None):
     """安全调用 NVML 函数，如果不支持则返回默认值"""
     try:
@@ -26,3 +53,33 @@ def to_watts(milliwatts):
     """将毫瓦转换为瓦特"""
     return float(milliwatts / 1000.0)
 
+
+# nvmlValueType_t -> nvmlValue_t 联合体中的成员
+NVML_VALUE_MEMBERS = {0: 'dVal', 1: 'uiVal', 2: 'ulVal', 3: 'ullVal', 4: 'sllVal', 5: 'siVal', 6: 'usVal'}
+
+
+def nvml_value(value, value_type):
+    """读取 nvmlValue_t 联合体中 value_type 对应的成员"""
+    return getattr(value, NVML_VALUE_MEMBERS.get(value_type, 'ullVal'))
+
+
+def field_value(field):
+    """读取 nvmlDeviceGetFieldValues 返回的单个字段的数值"""
+    return nvml_value(field.value, field.valueType)
+
+
+# 时钟降频原因位 -> 显示名称
+THROTTLE_REASONS = [
+    (pynvml.nvmlClocksThrottleReasonGpuIdle, 'GPU 空闲'),
+    (pynvml.nvmlClocksThrottleReasonApplicationsClocksSetting, '应用时钟设置'),
+    (pynvml.nvmlClocksThrottleReasonSwPowerCap, '软件功率限制'),
+    (pynvml.nvmlClocksThrottleReasonHwSlowdown, '硬件降速'),
+    (pynvml.nvmlClocksThrottleReasonSwThermalSlowdown, '软件热降速'),
+    (pynvml.nvmlClocksThrottleReasonHwThermalSlowdown, '硬件热降速'),
+    (pynvml.nvmlClocksThrottleReasonHwPowerBrakeSlowdown, '功率刹车降速'),
+]
+
+
+def throttle_labels(mask):
+    """降频原因位掩码对应的名称列表"""
+    return [label for flag, label in THROTTLE_REASONS if mask & flag]
@@ -1,14 +1,24 @@
 """异步 GPU 监测，使用 NVML"""
 
 
+import time
 import asyncio
 import pynvml
 import psutil
 import logging
 
 from .metrics import MetricsCollector
-from .nvidia_smi_fallback import parse_nvidia_smi
-from .config import NVIDIA_SMI
+from .devices import DeviceRegistry, HANDLE_LOST_ERRORS
+from .nvidia_smi_fallback import parse_nvidia_smi, NvidiaSmiStream
+from .metrics.utils import decode_bytes
+from .history import MetricHistory
+from .storage import MetricStore
+from .rollup import RollupEngine
+from .events import NvmlEventWatcher
+from .worker import NvmlWorker
+from .watchdog import DeviceWatchdog
+from .processes import ProcessCache, ProcessUtilization, IDLE_PROCESS, UNKNOWN_PROCESS
+from .config import NVIDIA_SMI, NVIDIA_SMI_STREAM, NVML_EVENTS, NVML_COLLECTOR_THREAD, STATIC_INFO_CHECK_INTERVAL, HISTORY, STORAGE_PATH, ROLLUPS
 
 logger = logging.getLogger(__name__)
 
@@ -20,15 +30,31 @@ class GPUMonitor:
         self.running = False
         self.gpu_data = {}
         self.collector = MetricsCollector()
+        self.devices = DeviceRegistry()
+        self.history = MetricHistory() if HISTORY else None
+        self.storage = MetricStore(STORAGE_PATH) if STORAGE_PATH else None
+        self.rollups = RollupEngine() if ROLLUPS else None
+        self.processes = ProcessCache()
+        self.process_utilization = ProcessUtilization()
         self.use_smi = {}  # 跟踪哪些 GPU 使用 nvidia-smi（在启动时决定）
+        self.smi_stream = NvidiaSmiStream() if NVIDIA_SMI_STREAM else None
+        self.events = NvmlEventWatcher(self.devices) if NVML_EVENTS else None
+        self.worker = NvmlWorker() if NVML_COLLECTOR_THREAD else None
+        self.watchdog = DeviceWatchdog()
+        self._inflight = None      # 采集线程中最近一个 tick 的状态（慢的调用可能仍在进行）
+        self._device_tasks = {}    # 线程池路径中超过截止时间仍在进行的采集: gpu_id -> (future, 开始时间)
+        self.last_processes = []
+        self.driver_version = None
+        self._last_static_check = time.monotonic()
 
         try:
             pynvml.nvmlInit()
             self.initialized = True
-            version = pynvml.nvmlSystemGetDriverVersion()
-            if isinstance(version, bytes):
-                version = version.decode('utf-8')
-            logger.info(f"NVML initialized - Driver: {version}")
+            self.driver_version = decode_bytes(pynvml.nvmlSystemGetDriverVersion())
+            logger.info(f"NVML initialized - Driver: {self.driver_version}")
+
+            # 一次性解析设备句柄和 UUID
+            self.devices.refresh(force=True)
 
             # 检测哪些 GPU 需要 nvidia-smi（启动时调用一次）
             self._detect_smi_gpus()
@@ -40,30 +66,28 @@ class GPUMonitor:
     def _detect_smi_gpus(self):
         """检测哪些 GPU 需要 nvidia-smi（启动时调用一次）"""
         try:
-            device_count = pynvml.nvmlDeviceGetCount()
-            logger.info(f"Detected {device_count} GPU(s)")
+            logger.info(f"Detected {len(self.devices)} GPU(s)")
 
             if NVIDIA_SMI:
                 logger.warning("NVIDIA_SMI=True - Forcing nvidia-smi for all GPUs")
-                for i in range(device_count):
-                    self.use_smi[str(i)] = True
+                for gpu_id, _ in self.devices.items():
+                    self.use_smi[gpu_id] = True
                 return
 
             # 自动检测每个 GPU
-            for i in range(device_count):
-                gpu_id = str(i)
+            for gpu_id, device in self.devices.items():
+                i = device['index']
                 try:
-                    handle = pynvml.nvmlDeviceGetHandleByIndex(i)
-                    data = self.collector.collect_all(handle, gpu_id)
-                    gpu_name = data.get('name', 'Unknown')
+                    sample = self.collector.collect_all(device['handle'], gpu_id)
+                    gpu_name = self.collector.static_info.get(gpu_id, {}).get('name', 'Unknown')
 
-                    if 'utilization' not in data or data.get('utilization') is None:
+                    if sample.get('utilization') is None:
                         self.use_smi[gpu_id] = True
                         logger.warning(f"GPU {i} ({gpu_name}): Utilization metric not available via NVML")
                         logger.warning(f"GPU {i} ({gpu_name}): Switching to nvidia-smi mode")
                     else:
                         self.use_smi[gpu_id] = False
-                        logger.info(f"GPU {i} ({gpu_name}): Using NVML (utilization: {data.get('utilization')}%)")
+                        logger.info(f"GPU {i} ({gpu_name}): Using NVML (utilization: {sample.get('utilization')}%)")
 
                 except Exception as e:
                     self.use_smi[gpu_id] = True
@@ -81,6 +105,178 @@ class GPUMonitor:
         except Exception as e:
             logger.error(f"Failed to detect GPUs: {e}")
 
+    @property
+    def static_version(self):
+        """静态信息版本号，变化时需要重新向客户端发送静态信息"""
+        return self.collector.static_version
+
+    def get_static_info(self):
+        """返回所有 NVML GPU 的缓存静态信息（gpu_id -> dict）"""
+        return {gpu_id: dict(info) for gpu_id, info in self.collector.static_info.items()}
+
+    def _check_driver_reload(self):
+        """低频检查驱动版本，驱动重新加载后使静态信息缓存失效"""
+        now = time.monotonic()
+        if now - self._last_static_check < STATIC_INFO_CHECK_INTERVAL:
+            return
+        self._last_static_check = now
+
+        try:
+            version = decode_bytes(pynvml.nvmlSystemGetDriverVersion())
+        except pynvml.NVMLError as e:
+            logger.debug(f"Driver version check failed: {e}")
+            return
+
+        if version != self.driver_version:
+            logger.info(f"Driver changed ({self.driver_version} -> {version}), re-probing static GPU info")
+            self.driver_version = version
+            self.collector.clear_static_info()
+            self.process_utilization.forget()
+            self.devices.invalidate()
+
+    async def collect(self):
+        """采集一个 tick，返回 (gpu_data, processes)
+
+        启用采集线程时，所有 NVML 调用（设备检查、每个 GPU 的指标、进程列表）在
+        采集线程中一次完成，只回到事件循环一次；否则每个 GPU 和进程列表分别提交到
+        默认线程池（进程列表在 GPU 之后采集，进程数写入本 tick 的数据）。
+        返回的数据发布后不再修改。
+        """
+        if self.worker is None:
+            gpu_data = await self.get_gpu_data()
+            processes = await self.get_processes(gpu_data)
+            return gpu_data, processes
+
+        if not self.initialized:
+            logger.error("Cannot get GPU data - NVML not initialized")
+            return {}, []
+
+        try:
+            gpu_data, processes = await self._collect_guarded(processes=True)
+        except Exception as e:
+            logger.error(f"Failed to get GPU data: {e}")
+            return {}, []
+        if processes is None:
+            # 这个 tick 在进程列表之前被放弃，沿用上一次的进程列表
+            processes = self.last_processes
+        self.gpu_data = gpu_data
+        self.last_processes = processes
+        return gpu_data, processes
+
+    async def _collect_guarded(self, processes):
+        """在采集线程中采集，由看门狗检查每个设备的截止时间
+
+        某个设备超过截止时间时不再等待这个 tick 的剩余部分：已采集的 GPU 照常返回，
+        其余 GPU 使用标记为 stale 的最近有效值；慢的调用在采集线程中继续，返回时由
+        看门狗记一次超时（连续多次后隔离）。上一个 tick 的调用仍未返回时这个 tick 只发布
+        stale 值，超过卡住截止时间后隔离该设备并替换采集线程。返回 (gpu_data, processes)，
+        没有采集进程列表时 processes 为 None
+        """
+        previous = self._inflight
+        if previous is not None and previous['running']:
+            stuck = self.watchdog.hanging()
+            if stuck is None:
+                return self._with_stale({}), None
+            self._abandon_worker(stuck)
+
+        tick = self._inflight = {'gpus': {}, 'cancelled': False, 'running': True}
+        task = asyncio.ensure_future(self.worker.run(self._collect_sync, self._smi_snapshot(), tick, processes))
+        stuck = await self.watchdog.wait(task)
+        if stuck is None:
+            gpu_data, process_list = task.result()
+        else:
+            # 采集线程在慢的调用返回后跳过剩余的 GPU 和进程列表
+            tick['cancelled'] = True
+            task.cancel()
+            gpu_data, process_list = dict(tick['gpus']), None
+        return self._with_stale(gpu_data), process_list
+
+    def _abandon_worker(self, stuck):
+        """采集线程卡在 NVML 调用中：隔离对应的设备，后续的 tick 使用新的采集线程"""
+        if stuck in self.devices.devices:
+            self.watchdog.hung(stuck)
+        else:
+            logger.error(f"NVML collection stuck in {stuck}, replacing collector thread")
+        # 旧线程在调用返回后处理完当前请求即退出
+        stuck_worker, self.worker = self.worker, NvmlWorker()
+        stuck_worker.stop(timeout=0)
+
+    def _with_stale(self, gpu_data):
+        """为本次没有数据的 NVML GPU（超时或被隔离）补上最近的有效值"""
+        if len(gpu_data) == len(self.devices):
+            return gpu_data
+        result = {}
+        for gpu_id, _ in self.devices.items():
+            data = gpu_data.get(gpu_id)
+            if data is None and not self.use_smi.get(gpu_id, False):
+                data = self.watchdog.stale(gpu_id)
+            if data is not None:
+                result[gpu_id] = data
+        return result
+
+    def _collect_sync(self, smi_data, tick, processes=True):
+        """在采集线程中收集所有 GPU 和进程（一次遍历），结果逐个写入 tick['gpus']"""
+        try:
+            gpu_data = self._collect_gpus_sync(smi_data, tick)
+            if not processes or tick['cancelled']:
+                return gpu_data, None
+            return gpu_data, self._get_processes_sync(gpu_data, tick)
+        finally:
+            tick['running'] = False
+
+    def _collect_gpus_sync(self, smi_data, tick):
+        """在采集线程中依次收集所有未隔离的 GPU"""
+        self.watchdog.begin('devices')
+        self._prepare_tick()
+        self.watchdog.end()
+        if not smi_data and any(self.use_smi.values()):
+            try:
+                smi_data = parse_nvidia_smi()
+            except Exception as e:
+                logger.error(f"nvidia-smi failed: {e}")
+
+        gpu_data = tick['gpus']
+        for gpu_id, _ in self.devices.items():
+            if tick['cancelled']:
+                break
+            if self.use_smi.get(gpu_id, False):
+                self._add_smi_gpu(gpu_data, gpu_id, smi_data)
+            elif self.watchdog.active(gpu_id):
+                if data := self._collect_device(gpu_id):
+                    gpu_data[gpu_id] = data
+
+        if not gpu_data and not tick['cancelled']:
+            logger.error("No GPU data collected from any source")
+        return gpu_data
+
+    def _prepare_tick(self):
+        """每个 tick 开始时检查驱动重新加载、热插拔和隔离设备的探测结果，设备变化时丢弃对应的缓存"""
+        self._check_driver_reload()
+        handles = {gpu_id: device['handle'] for gpu_id, device in self.devices.items()}
+        if self.watchdog.check_probes(handles):
+            # 恢复的设备可能经过了重置，重新确认句柄
+            self.devices.invalidate()
+        changed = self.devices.refresh(skip=self.watchdog.quarantined(), on_device=self.watchdog.begin)
+        self.watchdog.end()
+        for gpu_id in changed:
+            self.collector.forget_device(gpu_id)
+            self.process_utilization.forget(gpu_id)
+            self.watchdog.forget(gpu_id)
+
+    def _smi_snapshot(self):
+        """常驻的 nvidia-smi 进程的最新数据（没有 GPU 使用 nvidia-smi 或尚无数据时为 None）"""
+        if self.smi_stream is None or not any(self.use_smi.values()):
+            return None
+        self.smi_stream.start()
+        return self.smi_stream.snapshot()
+
+    @staticmethod
+    def _add_smi_gpu(gpu_data, gpu_id, smi_data):
+        if smi_data and gpu_id in smi_data:
+            gpu_data[gpu_id] = smi_data[gpu_id]
+        else:
+            logger.warning(f"GPU {gpu_id}: No data from nvidia-smi")
+
     async def get_gpu_data(self):
         """异步收集所有检测到的 GPU 的指标"""
         if not self.initialized:
@@ -88,12 +284,18 @@ class GPUMonitor:
             return {}
 
         try:
-            device_count = pynvml.nvmlDeviceGetCount()
+            if self.worker is not None:
+                # NVML 只在采集线程中访问
+                self.gpu_data, _ = await self._collect_guarded(processes=False)
+                return self.gpu_data
+
+            self._prepare_tick()
             gpu_data = {}
 
             # 如果有任何 GPU 需要 nvidia-smi，则获取一次 nvidia-smi 数据
-            smi_data = None
-            if any(self.use_smi.values()):
+            smi_data = self._smi_snapshot()
+            if not smi_data and any(self.use_smi.values()):
+                # 流式读取尚未产生数据（刚启动或正在重启）时运行一次 nvidia-smi
                 try:
                     # 在线程池中运行 nvidia-smi 以避免阻塞
                     smi_data = await asyncio.get_event_loop().run_in_executor(
@@ -103,34 +305,36 @@ class GPUMonitor:
                     logger.error(f"nvidia-smi failed: {e}")
 
             # 并发收集 GPU 数据
-            tasks = []
-            for i in range(device_count):
-                gpu_id = str(i)
+            self._check_device_tasks()
+            tasks = {}
+            for gpu_id, _ in self.devices.items():
                 if self.use_smi.get(gpu_id, False):
                     # 使用 nvidia-smi 数据
-                    if smi_data and gpu_id in smi_data:
-                        gpu_data[gpu_id] = smi_data[gpu_id]
-                    else:
-                        logger.warning(f"GPU {i}: No data from nvidia-smi")
-                else:
-                    # 使用 NVML - 在线程池中运行以避免阻塞
+                    self._add_smi_gpu(gpu_data, gpu_id, smi_data)
+                elif self.watchdog.active(gpu_id) and gpu_id not in self._device_tasks:
+                    # 使用 NVML - 在线程池中运行以避免阻塞（上一次采集仍未返回的 GPU 使用 stale 值）
                     task = asyncio.get_event_loop().run_in_executor(
-                        None, self._collect_single_gpu, i
+                        None, self._collect_device, gpu_id
                     )
-                    tasks.append((gpu_id, task))
+                    tasks[task] = gpu_id
 
-            # 等待所有 NVML 任务完成
+            # 等待所有 NVML 任务完成，超过截止时间的设备这个 tick 使用 stale 值，
+            # 调用返回时由看门狗记一次超时
             if tasks:
-                results = await asyncio.gather(*[task for _, task in tasks], return_exceptions=True)
-                for (gpu_id, _), result in zip(tasks, results):
-                    if isinstance(result, Exception):
-                        logger.error(f"GPU {gpu_id}: Error - {result}")
-                    else:
-                        gpu_data[gpu_id] = result
+                started = time.monotonic()
+                done, pending = await asyncio.wait(tasks, timeout=self.watchdog.timeout)
+                for task in pending:
+                    self._device_tasks[tasks[task]] = (task, started)
+                for task in done:
+                    if task.exception() is not None:
+                        logger.error(f"GPU {tasks[task]}: Error - {task.exception()}")
+                    elif task.result():
+                        gpu_data[tasks[task]] = task.result()
 
             if not gpu_data:
                 logger.error("No GPU data collected from any source")
 
+            gpu_data = self._with_stale(gpu_data)
             self.gpu_data = gpu_data
             return gpu_data
 
@@ -138,68 +342,158 @@ class GPUMonitor:
             logger.error(f"Failed to get GPU data: {e}")
             return {}
 
-    def _collect_single_gpu(self, gpu_index):
-        """收集单个 GPU 的数据（在线程池中运行）"""
+    def _check_device_tasks(self):
+        """线程池路径：清理已返回的慢速采集，超过卡住截止时间仍未返回的设备被隔离"""
+        now = time.monotonic()
+        for gpu_id, (task, started) in list(self._device_tasks.items()):
+            if task.done():
+                if not task.cancelled() and task.exception() is not None:
+                    logger.error(f"GPU {gpu_id}: Error - {task.exception()}")
+                del self._device_tasks[gpu_id]
+            elif now - started > self.watchdog.hang_timeout:
+                # 卡住的线程池线程被放弃
+                self.watchdog.hung(gpu_id)
+                del self._device_tasks[gpu_id]
+
+    def _collect_device(self, gpu_id):
+        """收集单个 GPU 并记录采集延迟（看门狗据此检测卡住和过慢的设备）"""
+        self.watchdog.begin(gpu_id)
+        started = time.perf_counter()
+        data = self._collect_single_gpu(gpu_id)
+        duration = time.perf_counter() - started
+        if data:
+            data['collect_latency_ms'] = round(duration * 1000, 2)
+        self.watchdog.end(gpu_id, duration, data)
+        return data
+
+    def _collect_single_gpu(self, gpu_id):
+        """收集单个 GPU 的数据（在线程池中运行），句柄失效或出错时返回空字典（不发布）"""
         try:
-            handle = pynvml.nvmlDeviceGetHandleByIndex(gpu_index)
-            return self.collector.collect_all(handle, str(gpu_index))
+            handle = self.devices.handle(gpu_id)
+            if handle is None:
+                return {}
+            # 采集器内部使用紧凑的 GpuSample，发布时才转换为字典（每个 GPU 每个 tick 一次）
+            return self.collector.collect_all(handle, gpu_id).to_dict()
+        except HANDLE_LOST_ERRORS as e:
+            # 下一个 tick 重新枚举设备；丢失的 GPU 不再以 stale 数据发布
+            logger.error(f"GPU {gpu_id}: Device handle lost - {e}")
+            self.devices.invalidate()
+            self.watchdog.forget(gpu_id)
+            return {}
         except Exception as e:
-            logger.error(f"GPU {gpu_index}: Error - {e}")
+            logger.error(f"GPU {gpu_id}: Error - {e}")
             return {}
 
-    async def get_processes(self):
-        """异步获取 GPU 进程信息"""
+    async def get_processes(self, gpu_data):
+        """异步获取 GPU 进程信息，进程数写入 gpu_data（本 tick 尚未发布的数据）"""
         if not self.initialized:
             return []
 
         try:
-            # 在线程池中运行进程收集
-            return await asyncio.get_event_loop().run_in_executor(
-                None, self._get_processes_sync
+            if self.worker is not None:
+                return await self.worker.run(self._get_processes_sync, gpu_data, {'cancelled': False})
+            # 在线程池中运行进程收集，某个设备卡住时沿用上一次的进程列表
+            tick = {'cancelled': False}
+            future = asyncio.get_event_loop().run_in_executor(
+                None, self._get_processes_sync, gpu_data, tick
             )
+            done, _ = await asyncio.wait({future}, timeout=self.watchdog.timeout * max(1, len(self.devices)))
+            if not done:
+                tick['cancelled'] = True
+                logger.warning("Process collection timed out, reusing the previous process list")
+                return self.last_processes
+            self.last_processes = future.result()
+            return self.last_processes
         except Exception as e:
             logger.error(f"Error getting processes: {e}")
             return []
 
-    def _get_processes_sync(self):
-        """同步进程收集（在线程池中运行）"""
+    def _get_processes_sync(self, gpu_data, tick):
+        """同步进程收集（在线程池或采集线程中运行），进程数写入 gpu_data
+
+        跳过被隔离的设备；tick 被放弃（某个设备卡住）后不再访问 NVML 和修改 gpu_data。
+
+        每个进程带有 GPU 上的 SM/显存/编码器/解码器利用率（驱动不支持时为 None），
+        以及主机上的 CPU% 和 RSS（每个 PID 读取一次）
+        """
         try:
-            device_count = pynvml.nvmlDeviceGetCount()
-            all_processes = []
+            gpu_processes = []  # (gpu_id, uuid, {pid: 进程信息}, 利用率)
             gpu_process_counts = {}
 
-            for i in range(device_count):
+            for gpu_id, device in self.devices.items():
+                if tick['cancelled']:
+                    return None
+                if not self.watchdog.active(gpu_id):
+                    continue
+                handle = device['handle']
+                caps = self.collector.capabilities.device(gpu_id)
+                self.watchdog.begin(gpu_id)
                 try:
-                    handle = pynvml.nvmlDeviceGetHandleByIndex(i)
-                    uuid = pynvml.nvmlDeviceGetUUID(handle)
-                    if isinstance(uuid, bytes):
-                        uuid = uuid.decode('utf-8')
-
-                    gpu_id = str(i)
-                    gpu_process_counts[gpu_id] = {'compute': 0, 'graphics': 0}
-
+                    compute = pynvml.nvmlDeviceGetComputeRunningProcesses(handle)
+                    graphics = caps.get(pynvml.nvmlDeviceGetGraphicsRunningProcesses, handle, default=[])
                     try:
-                        procs = pynvml.nvmlDeviceGetComputeRunningProcesses(handle)
-                        gpu_process_counts[gpu_id]['compute'] = len(procs)
-
-                        for proc in procs:
-                            all_processes.append({
-                                'pid': str(proc.pid),
-                                'name': self._get_process_name(proc.pid),
-                                'gpu_uuid': uuid,
-                                'gpu_id': gpu_id,
-                                'memory': float(proc.usedGpuMemory / (1024 ** 2))
-                            })
-                    except pynvml.NVMLError:
-                        pass
-
+                        utilization = self.process_utilization.sample(handle, gpu_id, caps)
+                    except pynvml.NVMLError as e:
+                        logger.debug(f"GPU {gpu_id}: Process utilization failed - {e}")
+                        utilization = None
+                except HANDLE_LOST_ERRORS:
+                    self.devices.invalidate()
+                    continue
                 except pynvml.NVMLError:
                     continue
+                finally:
+                    self.watchdog.end()
+                gpu_process_counts[gpu_id] = {'compute': len(compute), 'graphics': len(graphics)}
+
+                # 同时使用计算和图形的进程只列出一次（C+G）
+                procs = {}
+                for kind, running in (('C', compute), ('G', graphics)):
+                    for proc in running:
+                        if proc.pid in procs:
+                            procs[proc.pid]['type'] = 'C+G'
+                        else:
+                            memory = proc.usedGpuMemory
+                            procs[proc.pid] = {
+                                'type': kind,
+                                'memory': float(memory / (1024 ** 2)) if memory is not None else None,
+                            }
+                gpu_processes.append((gpu_id, device['uuid'], procs, utilization))
+
+            # 元数据来自缓存；CPU% 和 RSS 对所有 GPU 上的进程批量读取一次
+            seen = {pid for _, _, procs, _ in gpu_processes for pid in procs}
+            info = {pid: self.processes.get(pid) for pid in seen}
+            usage = self.processes.usage(seen)
+            # 离开 GPU 进程列表的 PID 不再缓存
+            self.processes.retain(seen)
 
+            all_processes = []
+            for gpu_id, uuid, procs, utilization in gpu_processes:
+                for pid, proc in procs.items():
+                    cpu_percent, rss = usage.get(pid, (None, None))
+                    process = {
+                        'pid': str(pid),
+                        'name': info[pid]['name'],
+                        'cmdline': info[pid]['cmdline'],
+                        'user': info[pid]['user'],
+                        'container_id': info[pid]['container_id'],
+                        'gpu_uuid': uuid,
+                        'gpu_id': gpu_id,
+                        'type': proc['type'],
+                        'memory': proc['memory'],
+                        'cpu_percent': cpu_percent,
+                        'rss': rss,
+                    }
+                    # 没有最近样本的进程在 GPU 上空闲
+                    sampled = utilization.get(pid, IDLE_PROCESS) if utilization is not None else UNKNOWN_PROCESS
+                    process.update(sampled)
+                    all_processes.append(process)
+
+            if tick['cancelled']:
+                return None
             for gpu_id, counts in gpu_process_counts.items():
-                if gpu_id in self.gpu_data:
-                    self.gpu_data[gpu_id]['compute_processes_count'] = counts['compute']
-                    self.gpu_data[gpu_id]['graphics_processes_count'] = counts['graphics']
+                if gpu_id in gpu_data:
+                    gpu_data[gpu_id]['compute_processes_count'] = counts['compute']
+                    gpu_data[gpu_id]['graphics_processes_count'] = counts['graphics']
 
             return all_processes
 
@@ -207,61 +501,16 @@ class GPUMonitor:
             logger.error(f"Error getting processes: {e}")
             return []
 
-    def _get_process_name(self, pid):
-        """从 PID 提取可读的进程名称，改进逻辑"""
-        try:
-            p = psutil.Process(pid)
-
-            # 首先尝试获取进程名称
-            try:
-                process_name = p.name()
-                if process_name and process_name not in ['python', 'python3', 'sh', 'bash']:
-                    return process_name
-            except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess):
-                pass
-
-            # 尝试获取命令行以更好地提取名称
-            try:
-                cmdline = p.cmdline()
-                if cmdline:
-                    # 查找实际的可执行文件或脚本名称
-                    for i, arg in enumerate(cmdline):
-                        if not arg or arg.startswith('-'):
-                            continue
-
-                        # 跳过常见的解释器和 shell
-                        if arg in ['python', 'python3', 'node', 'java', 'sh', 'bash', 'zsh']:
-                            continue
-
-                        # 从路径中提取文件名
-                        filename = arg.split('/')[-1].split('\\')[-1]
-
-                        # 如果仍然是通用名称，则跳过
-                        if filename in ['python', 'python3', 'node', 'java', 'sh', 'bash']:
-                            continue
-
-                        # 找到有意义的名称
-                        if filename:
-                            return filename
-
-                    # 如果以上都不行，回退到第一个参数
-                    if cmdline[0]:
-                        return cmdline[0].split('/')[-1].split('\\')[-1]
-
-            except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess):
-                pass
-
-            # 最终回退到 PID
-            return f'PID:{pid}'
-
-        except (psutil.NoSuchProcess, psutil.ZombieProcess):
-            return f'PID:{pid}'
-        except Exception as e:
-            logger.debug(f"Error getting process name for PID {pid}: {e}")
-            return f'PID:{pid}'
-
     async def shutdown(self):
         """异步关闭"""
+        if self.smi_stream is not None:
+            await self.smi_stream.stop()
+        if self.events is not None:
+            self.events.stop()
+        if self.worker is not None:
+            self.worker.stop()
+        if self.storage is not None:
+            self.storage.close()
         if self.initialized:
             try:
                 pynvml.nvmlShutdown()
@@ -1,83 +1,181 @@
 """
-简单的 nvidia-smi 回退解析器
-基于原始的工作实现
+nvidia-smi 回退数据源（NVML 不可用时使用）
+字段表（SmiSchema）生成 --query-gpu 参数，并编译为逐列展开的 CSV 解析函数；
+NvidiaSmiStream 以 -lms 常驻运行一个 nvidia-smi 进程逐行读取，退出时按退避间隔重启
 """
 
+import os
+import time
+import signal
+import asyncio
 import subprocess
 import logging
 from datetime import datetime
 
+from .config import NVIDIA_SMI_STREAM_INTERVAL
+
 logger = logging.getLogger(__name__)
 
+# nvidia-smi 无法提供某个值时的输出
+NA_VALUES = frozenset(['N/A', '[N/A]', '', '[Not Supported]', '[Unknown Error]'])
+
+
+class SmiSchema:
+    """声明式的 nvidia-smi 字段表：生成 --query-gpu 参数和逐行解析函数
+
+    fields 为 [(查询字段, 输出键, 类型, 默认值)]，值为 N/A 或无法转换时使用默认值；
+    constants 为查询中没有、但客户端需要的键的固定值；derived 为 {输出键: 函数(gpu)}，
+    由已解析的值计算。增加字段只需要增加一行。
+    """
+
+    def __init__(self, fields, constants=None, derived=None):
+        self.fields = list(fields)
+        self.query = ','.join(name for name, _, _, _ in self.fields)
+        self.constants = dict(constants or {})
+        self.derived = dict(derived or {})
+        self._parse_parts = self._compile()
+
+    def _compile(self):
+        """按字段表生成逐列展开的解析函数，省去每个字段的循环和元组解包"""
+        namespace = {'NA_VALUES': NA_VALUES}
+        lines = ['def parse(parts):', '    gpu = {}']
+        for i, (_, key, convert, default) in enumerate(self.fields):
+            namespace[f'convert_{i}'] = convert
+            namespace[f'default_{i}'] = default
+            lines.append(f'    value = parts[{i}].strip()')
+            if convert is str:
+                lines.append(f'    gpu[{key!r}] = default_{i} if value in NA_VALUES else value')
+            else:
+                lines.append('    try:')
+                lines.append(f'        gpu[{key!r}] = default_{i} if value in NA_VALUES else convert_{i}(value)')
+                lines.append('    except ValueError:')
+                lines.append(f'        gpu[{key!r}] = default_{i}')
+        lines.append('    return gpu')
+        exec(compile('\n'.join(lines), f'<nvidia-smi schema {self.query}>', 'exec'), namespace)
+        return namespace['parse']
+
+    def parse_line(self, line, timestamp=None):
+        """解析一行 CSV 输出（noheader,nounits），列数不足时返回 None"""
+        parts = line.split(',')
+        if len(parts) < len(self.fields):
+            return None
+
+        gpu = self._parse_parts(parts)
+        for key, derive in self.derived.items():
+            gpu[key] = derive(gpu)
+        gpu.update(self.constants)
+        gpu['timestamp'] = timestamp or datetime.now().isoformat()
+        return gpu
+
+    def parse(self, output):
+        """解析完整的输出，返回 {index: gpu}"""
+        timestamp = datetime.now().isoformat()
+        gpu_data = {}
+        for line in output.splitlines():
+            if line.strip() and (gpu := self.parse_line(line, timestamp)) is not None:
+                gpu_data[gpu['index']] = gpu
+        return gpu_data
+
+
+# 两种查询都没有的键
+_CONSTANTS = {
+    'temperature_memory': 0,
+    'power_default_limit': 0,
+    'clock_video': 0,
+    'decoder_sessions': 0,
+    'decoder_fps': 0,
+    'decoder_latency': 0,
+    'throttle_reasons': 'None',
+    '_fallback_mode': True,
+}
+
+# 完整查询（较旧的驱动可能不支持其中某些字段）
+FULL_SCHEMA = SmiSchema([
+    ('index', 'index', str, ''),
+    ('name', 'name', str, ''),
+    ('uuid', 'uuid', str, 'N/A'),
+    ('driver_version', 'driver_version', str, 'N/A'),
+    ('vbios_version', 'vbios_version', str, 'N/A'),
+    ('temperature.gpu', 'temperature', float, 0),
+    ('utilization.gpu', 'utilization', float, 0),
+    ('utilization.memory', 'memory_utilization', float, 0),
+    ('memory.used', 'memory_used', float, 0),
+    ('memory.total', 'memory_total', float, 0),
+    ('memory.free', 'memory_free', float, 0),
+    ('power.draw', 'power_draw', float, 0),
+    ('power.limit', 'power_limit', float, 0),
+    ('fan.speed', 'fan_speed', float, 0),
+    ('clocks.gr', 'clock_graphics', float, 0),
+    ('clocks.sm', 'clock_sm', float, 0),
+    ('clocks.mem', 'clock_memory', float, 0),
+    ('clocks.max.gr', 'clock_max_graphics', float, 0),
+    ('clocks.max.sm', 'clock_max_sm', float, 0),
+    ('clocks.max.mem', 'clock_max_memory', float, 0),
+    ('pcie.link.gen.current', 'pcie_gen', str, 'N/A'),
+    ('pcie.link.gen.max', 'pcie_gen_max', str, 'N/A'),
+    ('pcie.link.width.current', 'pcie_width', str, 'N/A'),
+    ('pcie.link.width.max', 'pcie_width_max', str, 'N/A'),
+    ('encoder.stats.sessionCount', 'encoder_sessions', int, 0),
+    ('encoder.stats.averageFps', 'encoder_fps', float, 0),
+    ('encoder.stats.averageLatency', 'encoder_latency', float, 0),
+    ('pstate', 'performance_state', str, 'N/A'),
+    ('compute_mode', 'compute_mode', str, 'N/A'),
+], _CONSTANTS)
+
+# 最小且广泛支持的查询
+BASIC_SCHEMA = SmiSchema([
+    ('index', 'index', str, ''),
+    ('name', 'name', str, ''),
+    ('temperature.gpu', 'temperature', float, 0),
+    ('utilization.gpu', 'utilization', float, 0),
+    ('utilization.memory', 'memory_utilization', float, 0),
+    ('memory.used', 'memory_used', float, 0),
+    ('memory.total', 'memory_total', float, 0),
+    ('power.draw', 'power_draw', float, 0),
+    ('power.limit', 'power_limit', float, 0),
+    ('fan.speed', 'fan_speed', float, 0),
+    ('clocks.gr', 'clock_graphics', float, 0),
+    ('clocks.sm', 'clock_sm', float, 0),
+    ('clocks.mem', 'clock_memory', float, 0),
+    ('pstate', 'performance_state', str, 'N/A'),
+], {
+    **_CONSTANTS,
+    'uuid': 'N/A',
+    'driver_version': 'N/A',
+    'vbios_version': 'N/A',
+    'clock_max_graphics': 0,
+    'clock_max_sm': 0,
+    'clock_max_memory': 0,
+    'pcie_gen': 'N/A',
+    'pcie_gen_max': 'N/A',
+    'pcie_width': 'N/A',
+    'pcie_width_max': 'N/A',
+    'encoder_sessions': 0,
+    'encoder_fps': 0,
+    'encoder_latency': 0,
+    'compute_mode': 'N/A',
+}, {
+    # 与最初的基础查询一致，不查询 memory.free
+    'memory_free': lambda gpu: gpu['memory_total'] - gpu['memory_used'] if gpu['memory_total'] else 0,
+})
+
+
+def _run_query(schema):
+    return subprocess.run([
+        'nvidia-smi', f'--query-gpu={schema.query}', '--format=csv,noheader,nounits'
+    ], capture_output=True, text=True, timeout=10)
+
 
 def parse_nvidia_smi():
     """解析 nvidia-smi 输出并提取全面的 GPU 信息"""
     try:
-        result = subprocess.run([
-            'nvidia-smi', 
-            '--query-gpu=index,name,uuid,driver_version,vbios_version,'
-            'temperature.gpu,utilization.gpu,utilization.memory,'
-            'memory.used,memory.total,memory.free,power.draw,power.limit,'
-            'fan.speed,clocks.gr,clocks.sm,clocks.mem,'
-            'clocks.max.gr,clocks.max.sm,clocks.max.mem,'
-            'pcie.link.gen.current,pcie.link.gen.max,pcie.link.width.current,pcie.link.width.max,'
-            'encoder.stats.sessionCount,encoder.stats.averageFps,encoder.stats.averageLatency,'
-            'pstate,compute_mode',
-            '--format=csv,noheader,nounits'
-        ], capture_output=True, text=True, timeout=10)
+        result = _run_query(FULL_SCHEMA)
         
         if result.returncode != 0:
             logger.warning(f"nvidia-smi comprehensive query failed (code {result.returncode}), trying basic query")
             return parse_nvidia_smi_fallback()
             
-        lines = result.stdout.strip().split('\n')
-        gpu_data = {}
-        
-        for line in lines:
-            if line.strip():
-                parts = [p.strip() for p in line.split(',')]
-                if len(parts) >= 27:
-                    gpu_id = parts[0]
-                    gpu_data[gpu_id] = {
-                        'index': parts[0],
-                        'name': parts[1],
-                        'uuid': parts[2] if parts[2] not in ['N/A', '[N/A]', ''] else 'N/A',
-                        'driver_version': parts[3] if parts[3] not in ['N/A', '[N/A]', ''] else 'N/A',
-                        'vbios_version': parts[4] if parts[4] not in ['N/A', '[N/A]', ''] else 'N/A',
-                        'temperature': float(parts[5]) if parts[5] not in ['N/A', '[N/A]', ''] else 0,
-                        'temperature_memory': 0,
-                        'utilization': float(parts[6]) if parts[6] not in ['N/A', '[N/A]', ''] else 0,
-                        'memory_utilization': float(parts[7]) if parts[7] not in ['N/A', '[N/A]', ''] else 0,
-                        'memory_used': float(parts[8]) if parts[8] not in ['N/A', '[N/A]', ''] else 0,
-                        'memory_total': float(parts[9]) if parts[9] not in ['N/A', '[N/A]', ''] else 0,
-                        'memory_free': float(parts[10]) if parts[10] not in ['N/A', '[N/A]', ''] else 0,
-                        'power_draw': float(parts[11]) if parts[11] not in ['N/A', '[N/A]', ''] else 0,
-                        'power_limit': float(parts[12]) if parts[12] not in ['N/A', '[N/A]', ''] else 0,
-                        'power_default_limit': 0,
-                        'fan_speed': float(parts[13]) if parts[13] not in ['N/A', '[N/A]', ''] else 0,
-                        'clock_graphics': float(parts[14]) if parts[14] not in ['N/A', '[N/A]', ''] else 0,
-                        'clock_sm': float(parts[15]) if parts[15] not in ['N/A', '[N/A]', ''] else 0,
-                        'clock_memory': float(parts[16]) if parts[16] not in ['N/A', '[N/A]', ''] else 0,
-                        'clock_video': 0,
-                        'clock_max_graphics': float(parts[17]) if parts[17] not in ['N/A', '[N/A]', ''] else 0,
-                        'clock_max_sm': float(parts[18]) if parts[18] not in ['N/A', '[N/A]', ''] else 0,
-                        'clock_max_memory': float(parts[19]) if parts[19] not in ['N/A', '[N/A]', ''] else 0,
-                        'pcie_gen': parts[20] if parts[20] not in ['N/A', '[N/A]', ''] else 'N/A',
-                        'pcie_gen_max': parts[21] if parts[21] not in ['N/A', '[N/A]', ''] else 'N/A',
-                        'pcie_width': parts[22] if parts[22] not in ['N/A', '[N/A]', ''] else 'N/A',
-                        'pcie_width_max': parts[23] if parts[23] not in ['N/A', '[N/A]', ''] else 'N/A',
-                        'encoder_sessions': int(parts[24]) if parts[24] not in ['N/A', '[N/A]', ''] else 0,
-                        'encoder_fps': float(parts[25]) if parts[25] not in ['N/A', '[N/A]', ''] else 0,
-                        'encoder_latency': float(parts[26]) if parts[26] not in ['N/A', '[N/A]', ''] else 0,
-                        'decoder_sessions': 0,
-                        'decoder_fps': 0,
-                        'decoder_latency': 0,
-                        'performance_state': parts[27] if len(parts) > 27 and parts[27] not in ['N/A', '[N/A]', ''] else 'N/A',
-                        'compute_mode': parts[28] if len(parts) > 28 and parts[28] not in ['N/A', '[N/A]', ''] else 'N/A',
-                        'throttle_reasons': 'None',
-                        'timestamp': datetime.now().isoformat(),
-                        '_fallback_mode': True
-                    }
+        gpu_data = FULL_SCHEMA.parse(result.stdout)
         
         if gpu_data:
             logger.debug(f"nvidia-smi returned data for {len(gpu_data)} GPU(s)")
@@ -95,66 +193,13 @@ def parse_nvidia_smi_fallback():
     """回退解析器，使用最小且广泛支持的字段"""
     try:
         logger.info("Using basic nvidia-smi query (minimal fields)")
-        result = subprocess.run([
-            'nvidia-smi', 
-            '--query-gpu=index,name,temperature.gpu,utilization.gpu,utilization.memory,'
-            'memory.used,memory.total,power.draw,power.limit,fan.speed,'
-            'clocks.gr,clocks.sm,clocks.mem,pstate',
-            '--format=csv,noheader,nounits'
-        ], capture_output=True, text=True, timeout=10)
+        result = _run_query(BASIC_SCHEMA)
         
         if result.returncode != 0:
             logger.error(f"Basic nvidia-smi query also failed (code {result.returncode})")
             return {}
         
-        lines = result.stdout.strip().split('\n')
-        gpu_data = {}
-        
-        for line in lines:
-            if line.strip():
-                parts = [p.strip() for p in line.split(',')]
-                if len(parts) >= 14:
-                    gpu_id = parts[0]
-                    gpu_data[gpu_id] = {
-                        'index': parts[0],
-                        'name': parts[1],
-                        'uuid': 'N/A',
-                        'driver_version': 'N/A',
-                        'vbios_version': 'N/A',
-                        'temperature': float(parts[2]) if parts[2] not in ['N/A', '[N/A]', ''] else 0,
-                        'temperature_memory': 0,
-                        'utilization': float(parts[3]) if parts[3] not in ['N/A', '[N/A]', ''] else 0,
-                        'memory_utilization': float(parts[4]) if parts[4] not in ['N/A', '[N/A]', ''] else 0,
-                        'memory_used': float(parts[5]) if parts[5] not in ['N/A', '[N/A]', ''] else 0,
-                        'memory_total': float(parts[6]) if parts[6] not in ['N/A', '[N/A]', ''] else 0,
-                        'memory_free': float(parts[6]) - float(parts[5]) if parts[6] not in ['N/A', '[N/A]', ''] and parts[5] not in ['N/A', '[N/A]', ''] else 0,
-                        'power_draw': float(parts[7]) if parts[7] not in ['N/A', '[N/A]', ''] else 0,
-                        'power_limit': float(parts[8]) if parts[8] not in ['N/A', '[N/A]', ''] else 0,
-                        'power_default_limit': 0,
-                        'fan_speed': float(parts[9]) if parts[9] not in ['N/A', '[N/A]', ''] else 0,
-                        'clock_graphics': float(parts[10]) if parts[10] not in ['N/A', '[N/A]', ''] else 0,
-                        'clock_sm': float(parts[11]) if parts[11] not in ['N/A', '[N/A]', ''] else 0,
-                        'clock_memory': float(parts[12]) if parts[12] not in ['N/A', '[N/A]', ''] else 0,
-                        'clock_video': 0,
-                        'clock_max_graphics': 0,
-                        'clock_max_sm': 0,
-                        'clock_max_memory': 0,
-                        'pcie_gen': 'N/A',
-                        'pcie_gen_max': 'N/A',
-                        'pcie_width': 'N/A',
-                        'pcie_width_max': 'N/A',
-                        'encoder_sessions': 0,
-                        'encoder_fps': 0,
-                        'encoder_latency': 0,
-                        'decoder_sessions': 0,
-                        'decoder_fps': 0,
-                        'decoder_latency': 0,
-                        'performance_state': parts[13] if parts[13] not in ['N/A', '[N/A]', ''] else 'N/A',
-                        'compute_mode': 'N/A',
-                        'throttle_reasons': 'None',
-                        'timestamp': datetime.now().isoformat(),
-                        '_fallback_mode': True
-                    }
+        gpu_data = BASIC_SCHEMA.parse(result.stdout)
         
         if gpu_data:
             logger.info(f"Basic nvidia-smi query successful - Found {len(gpu_data)} GPU(s)")
@@ -164,3 +209,118 @@ def parse_nvidia_smi_fallback():
         logger.error(f"Basic nvidia-smi query failed: {e}")
         return {}
 
+
+class NvidiaSmiStream:
+    """常驻的 nvidia-smi -lms 进程，逐行读取输出，保存每个 GPU 的最新一行
+
+    每次轮询启动一个 nvidia-smi 需要 fork 并初始化驱动，开销很大；流式读取只启动
+    一个进程，轮询直接读取最新的快照。进程退出时由监督任务按指数退避重启；
+    完整查询在产生任何数据之前失败时（旧驱动不支持某些字段），改用基础查询。
+    """
+
+    def __init__(self, interval=NVIDIA_SMI_STREAM_INTERVAL, max_backoff=30.0):
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.latest = {}      # gpu_id -> (接收时间, 数据)
+        self.restarts = 0
+        self.basic = False    # 是否已改用基础查询
+        self._process = None
+        self._task = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """在当前事件循环中启动监督任务（重复调用无效）"""
+        if not self.running:
+            self._task = asyncio.create_task(self._supervise())
+
+    async def stop(self):
+        """停止监督任务和 nvidia-smi 进程（可以在另一个事件循环中调用，例如服务器退出后）"""
+        task, self._task = self._task, None
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._terminate()
+
+    def snapshot(self):
+        """返回每个 GPU 最近一行数据；超过若干个间隔没有更新的 GPU 不返回"""
+        cutoff = time.monotonic() - max(5 * self.interval, 5.0)
+        return {gpu_id: data for gpu_id, (received, data) in self.latest.items() if received >= cutoff}
+
+    def _command(self):
+        schema = BASIC_SCHEMA if self.basic else FULL_SCHEMA
+        return [
+            'nvidia-smi', f'--query-gpu={schema.query}', '--format=csv,noheader,nounits',
+            '-lms', str(max(1, int(self.interval * 1000)))
+        ]
+
+    async def _supervise(self):
+        backoff = 1.0
+        while True:
+            try:
+                produced = await self._run()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"nvidia-smi stream error: {e}")
+                produced = False
+
+            if produced:
+                backoff = 1.0
+            elif not self.basic:
+                logger.warning("nvidia-smi comprehensive stream failed, switching to basic query")
+                self.basic = True
+                continue
+
+            self.restarts += 1
+            logger.warning(f"nvidia-smi stream exited, restarting in {backoff:.0f}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    async def _run(self):
+        """运行一个 nvidia-smi 进程直到它退出，返回是否解析到了数据"""
+        parse = (BASIC_SCHEMA if self.basic else FULL_SCHEMA).parse_line
+        # stderr 合并到 stdout，避免错误输出填满管道；无法解析的行记录到日志
+        self._process = await asyncio.create_subprocess_exec(
+            *self._command(), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+        )
+        produced = False
+        try:
+            while line := await self._process.stdout.readline():
+                line = line.decode('utf-8', errors='replace').strip()
+                if not line:
+                    continue
+                gpu = parse(line)
+                if gpu is None:
+                    logger.debug(f"nvidia-smi stream: unparsed line: {line}")
+                    continue
+                self.latest[gpu['index']] = (time.monotonic(), gpu)
+                produced = True
+        finally:
+            code = await self._wait_or_terminate()
+            logger.info(f"nvidia-smi stream process exited (code {code})")
+        return produced
+
+    async def _wait_or_terminate(self):
+        process, self._process = self._process, None
+        if process.returncode is None:
+            process.terminate()
+        try:
+            return await asyncio.wait_for(process.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            process.kill()
+            return await process.wait()
+
+    def _terminate(self):
+        """直接向进程发送信号（所属的事件循环可能已经关闭）"""
+        if self._process is not None and self._process.returncode is None:
+            try:
+                os.kill(self._process.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        self._process = None
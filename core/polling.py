@@ -0,0 +1,148 @@
+"""自适应轮询 - 没有消费者时暂停或放慢，GPU 空闲且读数稳定时逐步退避
+
+消费者分为三类：仪表盘 WebSocket 客户端（包括 hub）、最近抓取过 /metrics 的
+Prometheus、以及持续记录的历史/磁盘存储/汇总。有客户端时按基础间隔轮询；
+只有记录或导出时按 POLL_BACKGROUND_INTERVAL 轮询；完全没有消费者时暂停，
+直到有新的客户端连接或抓取。所有 GPU 空闲且利用率和功率相对退避开始时的
+读数没有明显变化时，间隔逐次加倍直到 POLL_IDLE_MAX_INTERVAL，读数一变化
+立即恢复基础间隔。
+"""
+
+import time
+import asyncio
+import logging
+
+from .config import (
+    ADAPTIVE_POLLING, UPDATE_INTERVAL, POLL_BACKGROUND_INTERVAL, POLL_IDLE_MAX_INTERVAL,
+    POLL_IDLE_UTILIZATION, POLL_UTILIZATION_CHANGE, POLL_POWER_CHANGE, EXPORTER_SCRAPE_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+# 暂停时仍然定期醒来重新检查消费者（秒）
+PAUSED_RECHECK = 60.0
+
+
+class AdaptivePoller:
+    """决定监测循环的下一次轮询间隔，并报告当前的有效轮询频率"""
+
+    def __init__(self, broadcaster, base_interval=UPDATE_INTERVAL, enabled=ADAPTIVE_POLLING):
+        self.broadcaster = broadcaster
+        self.base_interval = base_interval
+        self.enabled = enabled
+        self.recorders = 0          # 持续记录的消费者数量（历史、磁盘存储、汇总）
+        self.last_scrape = None     # 最近一次 /metrics 抓取（monotonic）
+        self.state = 'fast'
+        self.interval = base_interval
+        self._idle_streak = 0
+        self._anchor = None         # 退避开始时每个 GPU 的 (利用率, 功率)
+        self._wake = asyncio.Event()
+
+    def consumers(self):
+        scraped = (self.last_scrape is not None
+                   and time.monotonic() - self.last_scrape < EXPORTER_SCRAPE_TIMEOUT)
+        return {
+            'clients': len(self.broadcaster),
+            'exporter': 1 if scraped else 0,
+            'recorders': self.recorders,
+        }
+
+    def wake(self):
+        """有新的消费者（客户端连接或抓取）：立即轮询并恢复基础间隔"""
+        self._idle_streak = 0
+        self._anchor = None
+        self._wake.set()
+
+    def scraped(self):
+        """记录一次 /metrics 抓取，暂停中时唤醒"""
+        paused = self.state == 'paused' or self.last_scrape is None
+        self.last_scrape = time.monotonic()
+        if paused:
+            self.wake()
+
+    def should_collect(self):
+        """没有任何消费者时跳过这次轮询"""
+        return not self.enabled or self._next_state() != 'paused'
+
+    def observe(self, gpu_data):
+        """根据最新读数更新空闲计数：全部空闲且相对锚点稳定时加一，否则清零"""
+        readings = {
+            gpu_id: (gpu.get('utilization'), gpu.get('power_draw'))
+            for gpu_id, gpu in gpu_data.items()
+        }
+        if not readings or not all(self._idle(utilization) for utilization, _ in readings.values()):
+            self._idle_streak = 0
+            self._anchor = None
+            return
+
+        if self._anchor is None or not self._stable(readings):
+            self._anchor = readings
+            self._idle_streak = 0
+            return
+        self._idle_streak += 1
+
+    def next_interval(self):
+        """计算下一次轮询前的等待时间，状态变化时记录日志"""
+        state = self._next_state() if self.enabled else 'fast'
+        backoff = max(self.base_interval, min(self.base_interval * 2 ** self._idle_streak, POLL_IDLE_MAX_INTERVAL))
+        if state == 'paused':
+            interval = None
+        elif state == 'background':
+            interval = max(backoff, POLL_BACKGROUND_INTERVAL)
+        else:
+            interval = backoff
+
+        if state != self.state:
+            logger.info(f"Polling state {self.state} -> {state} ({self._describe(interval)})")
+        self.state = state
+        self.interval = interval
+        return interval
+
+    async def sleep(self, interval):
+        """等待 interval 秒（暂停时为 None），有新的消费者时提前返回"""
+        self._wake.clear()
+        try:
+            await asyncio.wait_for(self._wake.wait(), PAUSED_RECHECK if interval is None else interval)
+        except asyncio.TimeoutError:
+            pass
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'state': self.state,
+            'interval': self.interval,
+            'rate_hz': round(1.0 / self.interval, 3) if self.interval else 0.0,
+            'base_interval': self.base_interval,
+            'idle_streak': self._idle_streak,
+            'consumers': self.consumers(),
+        }
+
+    def _next_state(self):
+        consumers = self.consumers()
+        if consumers['clients']:
+            return 'idle' if self._idle_streak else 'fast'
+        if consumers['exporter'] or consumers['recorders']:
+            return 'background'
+        return 'paused'
+
+    @staticmethod
+    def _idle(utilization):
+        return isinstance(utilization, (int, float)) and utilization <= POLL_IDLE_UTILIZATION
+
+    def _stable(self, readings):
+        """每个 GPU 的利用率和功率相对锚点的变化都在阈值内"""
+        if readings.keys() != self._anchor.keys():
+            return False
+        for gpu_id, (utilization, power) in readings.items():
+            anchor_utilization, anchor_power = self._anchor[gpu_id]
+            if abs(utilization - anchor_utilization) > POLL_UTILIZATION_CHANGE:
+                return False
+            if (power is None) != (anchor_power is None):
+                return False
+            if power is not None and abs(power - anchor_power) > POLL_POWER_CHANGE:
+                return False
+        return True
+
+    @staticmethod
+    def _describe(interval):
+        return 'paused' if interval is None else f'{interval:g}s'
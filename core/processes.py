@@ -0,0 +1,222 @@
+"""GPU 进程信息 - 进程元数据缓存、按进程的 GPU 利用率和主机资源
+
+GPU 进程列表每个 tick 都会刷新，但进程的元数据在其生命周期内不会变化。
+元数据按 (pid, create_time) 缓存名称、命令行、用户和容器 ID：每个 PID 只在
+第一次出现时读取一次 /proc，PID 离开 GPU 进程列表时淘汰，PID 被复用
+（create_time 变化）时重新解析。每个 tick 只读取 CPU 时间和 RSS。
+"""
+
+import re
+import time
+import logging
+import psutil
+import pynvml
+
+from .config import PROCESS_REVALIDATE_INTERVAL, PROCESS_UTILIZATION_HOLD
+from .metrics.capabilities import UNSUPPORTED_ERRORS
+
+logger = logging.getLogger(__name__)
+
+# 不能代表进程用途的通用名称，遇到时从命令行中提取脚本名
+GENERIC_NAMES = {'python', 'python3', 'node', 'java', 'sh', 'bash', 'zsh'}
+
+# cgroup 路径中的容器 ID（docker、containerd、cri-o、podman 都使用 64 位十六进制 ID）
+CONTAINER_ID = re.compile(r'(?<![0-9a-f])([0-9a-f]{64})(?![0-9a-f])')
+
+# 按进程的 GPU 利用率：没有最近样本的进程，以及不支持按进程采样的 GPU
+IDLE_PROCESS = {'sm_utilization': 0, 'memory_utilization': 0, 'encoder_utilization': 0, 'decoder_utilization': 0}
+UNKNOWN_PROCESS = dict.fromkeys(IDLE_PROCESS)
+
+CMDLINE_MAX_LENGTH = 512  # 随进程列表发送的命令行最大长度
+
+
+def _basename(path):
+    return path.split('/')[-1].split('\\')[-1]
+
+
+def process_name(name, cmdline, pid):
+    """从进程名称和命令行提取可读的名称（python train.py -> train.py）"""
+    if name and name not in GENERIC_NAMES:
+        return name
+
+    for arg in cmdline:
+        # 跳过选项、常见的解释器和 shell
+        if not arg or arg.startswith('-') or arg in GENERIC_NAMES:
+            continue
+        filename = _basename(arg)
+        if filename and filename not in GENERIC_NAMES:
+            return filename
+
+    # 如果以上都不行，回退到第一个参数，最终回退到 PID
+    if cmdline and cmdline[0]:
+        return _basename(cmdline[0])
+    return name or f'PID:{pid}'
+
+
+def _read(method, pid):
+    """读取一个进程属性，无权限或进程已退出时返回 None"""
+    try:
+        return method()
+    except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess):
+        return None
+    except Exception as e:
+        logger.debug(f"Error reading {method.__name__} of PID {pid}: {e}")
+        return None
+
+
+def container_id(pid):
+    """从 /proc/<pid>/cgroup 读取容器 ID，不在容器中时返回 None"""
+    try:
+        with open(f'/proc/{pid}/cgroup') as f:
+            match = CONTAINER_ID.search(f.read())
+    except OSError:
+        return None
+    return match.group(1) if match else None
+
+
+class ProcessCache:
+    """PID -> 进程元数据，元数据只在 PID 首次出现或被复用时从 /proc 解析"""
+
+    def __init__(self, revalidate_interval=PROCESS_REVALIDATE_INTERVAL):
+        self.revalidate_interval = revalidate_interval
+        # pid -> {'create_time', 'name', 'cmdline', 'user', 'container_id', 'process', 'checked'}
+        self.entries = {}
+        self.lookups = 0   # 从 /proc 解析元数据的次数
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, pid):
+        """返回 pid 的元数据 {'name', 'cmdline', 'user', 'container_id'}
+
+        缓存命中时不访问 /proc；每隔 revalidate_interval 读取一次 create_time，
+        确认 PID 没有在两次 tick 之间被其他进程复用
+        """
+        now = time.monotonic()
+        entry = self.entries.get(pid)
+        if entry is not None and now - entry['checked'] < self.revalidate_interval:
+            return entry
+
+        try:
+            process = psutil.Process(pid)
+            create_time = process.create_time()
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            # 进程不可见（例如在其他 PID 命名空间中），同样缓存，避免每个 tick 重试
+            process, create_time = None, None
+        except Exception as e:
+            logger.debug(f"Error reading process {pid}: {e}")
+            process, create_time = None, None
+
+        if entry is None or entry['create_time'] != create_time:
+            entry = self._resolve(pid, process, create_time)
+            self.entries[pid] = entry
+        entry['checked'] = now
+        return entry
+
+    def usage(self, pids):
+        """每个 PID 读取一次主机 CPU% 和 RSS（MiB），返回 {pid: (cpu_percent, rss)}
+
+        一个 PID 可能出现在多个 GPU 上，调用方先去重；必须在 get() 之后调用。
+        cpu_percent 是相对上一次调用的值，第一次为 0
+        """
+        result = {}
+        for pid in pids:
+            entry = self.entries.get(pid)
+            process = entry and entry['process']
+            if process is None:
+                continue
+            try:
+                with process.oneshot():
+                    result[pid] = (process.cpu_percent(), process.memory_info().rss / (1024 ** 2))
+            except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess):
+                continue
+        return result
+
+    def retain(self, pids):
+        """淘汰不在当前 GPU 进程列表中的 PID"""
+        for pid in self.entries.keys() - set(pids):
+            del self.entries[pid]
+
+    def clear(self):
+        self.entries.clear()
+
+    def _resolve(self, pid, process, create_time):
+        """从 /proc 读取进程的名称、命令行、用户和容器 ID"""
+        self.lookups += 1
+        name, cmdline, user = None, None, None
+
+        if process is not None:
+            with process.oneshot():
+                name = _read(process.name, pid)
+                cmdline = _read(process.cmdline, pid)
+                user = _read(process.username, pid)
+        cmdline = cmdline or []
+
+        return {
+            'create_time': create_time,
+            'name': process_name(name, cmdline, pid),
+            'cmdline': ' '.join(cmdline)[:CMDLINE_MAX_LENGTH],
+            'user': user,
+            'container_id': container_id(pid) if process is not None else None,
+            'process': process,  # 保留 psutil.Process，cpu_percent 需要上一次的 CPU 时间
+            'checked': 0.0,
+        }
+
+
+class ProcessUtilization:
+    """每个 GPU 上各进程的 SM/显存/编码器/解码器利用率
+
+    nvmlDeviceGetProcessUtilization 只返回给定时间戳之后的样本，每个 GPU 记住
+    最后一个样本的时间戳，每次调用只取新的样本。驱动的采样周期可能长于轮询间隔，
+    因此进程最近的样本在 hold 秒内继续有效，之后视为空闲（0%）。
+    不支持按进程采样的 GPU 记录在该设备的能力表中。
+    """
+
+    def __init__(self, hold=PROCESS_UTILIZATION_HOLD):
+        self.hold_us = int(hold * 1e6)
+        self.last_seen = {}    # gpu_id -> 最后一个样本的时间戳（微秒）
+        self.samples = {}      # gpu_id -> {pid: (时间戳, {指标: 值})}
+
+    def sample(self, handle, gpu_id, caps):
+        """读取新的样本，返回 {pid: {'sm_utilization', ...}}；不支持时返回 None"""
+        if caps.skip('nvmlDeviceGetProcessUtilization'):
+            return None
+
+        now_us = int(time.time() * 1e6)
+        since = self.last_seen.get(gpu_id, now_us - self.hold_us)
+        try:
+            new_samples = pynvml.nvmlDeviceGetProcessUtilization(handle, since)
+        except pynvml.NVMLError as e:
+            value = getattr(e, 'value', None)
+            if value in UNSUPPORTED_ERRORS:
+                caps.mark('nvmlDeviceGetProcessUtilization', error=e)
+                return None
+            if value != pynvml.NVML_ERROR_NOT_FOUND:  # NOT_FOUND: 没有新的样本
+                raise
+            new_samples = []
+
+        latest = self.samples.setdefault(gpu_id, {})
+        for sample in new_samples:
+            current = latest.get(sample.pid)
+            if current is None or sample.timeStamp > current[0]:
+                latest[sample.pid] = (sample.timeStamp, {
+                    'sm_utilization': sample.smUtil,
+                    'memory_utilization': sample.memUtil,
+                    'encoder_utilization': sample.encUtil,
+                    'decoder_utilization': sample.decUtil,
+                })
+            self.last_seen[gpu_id] = max(self.last_seen.get(gpu_id, 0), sample.timeStamp)
+
+        # 丢弃超过 hold 的样本（进程空闲或已退出）
+        for pid in [pid for pid, (stamp, _) in latest.items() if now_us - stamp > self.hold_us]:
+            del latest[pid]
+        return {pid: values for pid, (_, values) in latest.items()}
+
+    def forget(self, gpu_id=None):
+        """丢弃某个 GPU（或所有 GPU）的样本"""
+        if gpu_id is None:
+            self.last_seen.clear()
+            self.samples.clear()
+        else:
+            self.last_seen.pop(gpu_id, None)
+            self.samples.pop(gpu_id, None)
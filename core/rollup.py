@@ -0,0 +1,276 @@
+"""多分辨率汇总（rollup）- 长时间范围图表不再扫描原始的 0.5s 样本
+
+每个分辨率（1s/10s/1m/1h）维护一个按时间对齐的桶环形缓冲区，每个桶保存
+每个 GPU 各指标的 min/max/sum/count 和 p95。每个样本对每一层是 O(1) 的
+向量化更新（所有 GPU 一起）；p95 由当前桶的流式分位数草图（对数分桶直方图，相对误差约
+(ROLLUP_SKETCH_GAMMA - 1) / 2）在桶结束时计算一次。
+"""
+
+import math
+import numpy as np
+
+from .config import HISTORY_METRICS, ROLLUP_TIERS, ROLLUP_QUANTILE, ROLLUP_SKETCH_GAMMA
+from .history import time_range, downsample_step, format_series
+
+# 草图覆盖的绝对值范围，超出范围的值归入两端的桶
+SKETCH_MIN = 1e-2
+SKETCH_MAX = 1e7
+
+STATS = ('min', 'max', 'p95')
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) else math.nan
+
+
+class QuantileSketch:
+    """对数分桶的分位数草图：每个指标一行计数，正负值对称，接近 0 的值单独一桶"""
+
+    def __init__(self, metric_count, gamma=ROLLUP_SKETCH_GAMMA):
+        self.log_gamma = math.log(gamma)
+        self.half = int(math.ceil(math.log(SKETCH_MAX / SKETCH_MIN) / self.log_gamma))
+        self.width = 2 * self.half + 1
+        self.counts = np.zeros((metric_count, self.width), dtype=np.int32)
+        # 当前桶写入过的扁平下标，避免扫描整个矩阵；累计超过矩阵大小后改为扫描
+        self._touched = []
+        self._touched_size = 0
+        # 每个桶的代表值（桶区间的中点，相对误差最小）
+        k = np.arange(1, self.half + 1)
+        magnitude = SKETCH_MIN * 2 * gamma ** k / (gamma + 1)
+        self.values = np.concatenate([-magnitude[::-1], [0.0], magnitude])
+
+    def keys(self, values):
+        """值对应的桶下标（values 不含 NaN）"""
+        magnitude = np.abs(values)
+        with np.errstate(divide='ignore'):
+            k = np.ceil(np.log(magnitude / SKETCH_MIN) / self.log_gamma)
+        k = np.where(magnitude < SKETCH_MIN, 0, np.clip(k, 1, self.half)).astype(np.intp)
+        return self.half + np.where(values < 0, -k, k)
+
+    def add(self, rows, keys):
+        # 每行（指标）每个样本最多出现一次，可以直接用花式索引累加
+        flat = rows * self.width + keys
+        self.counts.ravel()[flat] += 1
+        if self._touched is not None:
+            self._touched.append(flat)
+            self._touched_size += len(flat)
+            if self._touched_size > self.counts.size:
+                self._touched = None
+
+    def _nonzero(self):
+        """按行优先顺序返回非零计数的 (rows, keys)"""
+        if self._touched is None:
+            return np.nonzero(self.counts)
+        if not self._touched:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        return np.divmod(np.unique(np.concatenate(self._touched)), self.width)
+
+    def quantile(self, q):
+        """每个指标的 q 分位数，没有样本的指标为 NaN
+
+        一个桶内的样本通常只落在少数几个桶中，只处理非零的计数
+        """
+        result = np.full(self.counts.shape[0], np.nan)
+        rows, keys = self._nonzero()
+        if not len(rows):
+            return result
+
+        counts = self.counts[rows, keys]
+        cumulative = np.cumsum(counts)
+        # 每行在 rows 中的起止位置（np.nonzero 按行优先排序）
+        row_ids, first = np.unique(rows, return_index=True)
+        last = np.r_[first[1:], len(rows)] - 1
+        before = np.where(first > 0, cumulative[first - 1], 0)
+        totals = cumulative[last] - before
+        rank = np.maximum(np.ceil(q * totals), 1)
+
+        within = cumulative - np.repeat(before, last - first + 1)
+        reached = within >= np.repeat(rank, last - first + 1)
+        # 每行第一个达到 rank 的位置
+        hits = np.flatnonzero(reached)
+        hit_rows, hit_first = np.unique(rows[hits], return_index=True)
+        result[hit_rows] = self.values[keys[hits[hit_first]]]
+        return result
+
+    def clear(self):
+        if self._touched is None:
+            self.counts.fill(0)
+        elif self._touched:
+            self.counts.ravel()[np.concatenate(self._touched)] = 0
+        self._touched = []
+        self._touched_size = 0
+
+
+class _Tier:
+    """一个分辨率的桶环形缓冲区，数组形状为 (桶, GPU, 指标)，每个样本对所有 GPU 一次向量化更新"""
+
+    def __init__(self, resolution, capacity, metric_count):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.metric_count = metric_count
+        self.starts = np.zeros(capacity, dtype=np.float64)
+        self.mins = np.full((capacity, 0, metric_count), np.inf, dtype=np.float32)
+        self.maxs = np.full((capacity, 0, metric_count), -np.inf, dtype=np.float32)
+        self.sums = np.zeros((capacity, 0, metric_count), dtype=np.float64)
+        self.counts = np.zeros((capacity, 0, metric_count), dtype=np.int32)
+        self.quantiles = np.full((capacity, 0, metric_count), np.nan, dtype=np.float32)
+        self.sketch = QuantileSketch(0)
+        self.head = -1  # 当前（未结束）桶的位置
+        self.count = 0
+        self.current = None  # 当前桶的起始时间
+
+    def add_gpu(self):
+        """为新的 GPU 增加一列（很少发生，直接重新分配）"""
+        def grow(array, fill):
+            column = np.full((self.capacity, 1, self.metric_count), fill, dtype=array.dtype)
+            return np.concatenate([array, column], axis=1)
+
+        self.mins = grow(self.mins, np.inf)
+        self.maxs = grow(self.maxs, -np.inf)
+        self.sums = grow(self.sums, 0)
+        self.counts = grow(self.counts, 0)
+        self.quantiles = grow(self.quantiles, np.nan)
+        sketch = self.sketch
+        self.sketch = QuantileSketch(sketch.counts.shape[0] + self.metric_count)
+        self.sketch.counts[:sketch.counts.shape[0]] = sketch.counts
+        self.sketch._touched = None  # 已有计数的位置未知，当前桶改为扫描
+
+    def add(self, timestamp, values, zeroed, valid, cells, keys):
+        start = timestamp - timestamp % self.resolution
+        if self.current is None or start > self.current:
+            self._advance(start)
+
+        head = self.head
+        np.fmin(self.mins[head], values, out=self.mins[head])
+        np.fmax(self.maxs[head], values, out=self.maxs[head])
+        self.sums[head] += zeroed
+        self.counts[head] += valid
+        self.sketch.add(cells, keys)
+
+    def current_quantile(self):
+        """当前桶每个 (GPU, 指标) 的分位数"""
+        quantile = self.sketch.quantile(ROLLUP_QUANTILE).reshape(self.mins.shape[1:])
+        return np.clip(quantile, self.mins[self.head], self.maxs[self.head])
+
+    def _advance(self, start):
+        """结束当前桶（计算分位数并清空草图），开始新的桶"""
+        if self.current is not None:
+            self.quantiles[self.head] = self.current_quantile()
+            self.sketch.clear()
+
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.current = start
+
+        head = self.head
+        self.starts[head] = start
+        self.mins[head] = np.inf
+        self.maxs[head] = -np.inf
+        self.sums[head] = 0
+        self.counts[head] = 0
+        self.quantiles[head] = np.nan
+
+    def ordered(self):
+        """按时间顺序返回桶的下标（当前桶在最后）"""
+        if self.count < self.capacity:
+            return np.arange(self.count)
+        return np.r_[self.head + 1:self.capacity, 0:self.head + 1]
+
+
+class RollupEngine:
+    """各分辨率的汇总，接口与 MetricHistory.query 相同，额外返回 min/max/p95"""
+
+    def __init__(self, tiers=ROLLUP_TIERS, metrics=HISTORY_METRICS):
+        self.metrics = list(metrics)
+        self._columns = {name: i for i, name in enumerate(self.metrics)}
+        # 从细到粗：{分辨率秒数: _Tier}，保留时长决定桶数
+        self.tiers = {
+            resolution: _Tier(resolution, max(1, int(math.ceil(retention / resolution))), len(self.metrics))
+            for resolution, retention in sorted(tiers.items())
+        }
+        self.retention = dict(tiers)
+        self.gpu_ids = []  # GPU 在数组第二维中的位置
+        self._slots = {}
+        self._sketch = QuantileSketch(len(self.metrics))  # 只用于计算桶下标
+
+    @property
+    def resolutions(self):
+        return list(self.tiers)
+
+    def append(self, gpu_data, timestamp):
+        """把一次采样汇总进每个分辨率的当前桶（缺失的 GPU 和指标按 NaN 跳过）"""
+        for gpu_id in gpu_data:
+            if gpu_id not in self._slots:
+                self._slots[gpu_id] = len(self.gpu_ids)
+                self.gpu_ids.append(gpu_id)
+                for tier in self.tiers.values():
+                    tier.add_gpu()
+
+        values = np.full((len(self.gpu_ids), len(self.metrics)), np.nan, dtype=np.float64)
+        for gpu_id, gpu in gpu_data.items():
+            row = [gpu.get(name) for name in self.metrics]
+            try:
+                values[self._slots[gpu_id]] = row  # None 转换为 NaN
+            except (TypeError, ValueError):
+                values[self._slots[gpu_id]] = [_number(value) for value in row]
+
+        valid = values == values
+        cells = np.flatnonzero(valid)
+        keys = self._sketch.keys(values.ravel()[cells])
+        zeroed = np.where(valid, values, 0.0)
+        for tier in self.tiers.values():
+            tier.add(timestamp, values, zeroed, valid, cells, keys)
+
+    def select(self, start, end, max_points, now):
+        """选择覆盖 start 且点数不超过 max_points 的最细分辨率，都不满足时返回 None"""
+        for resolution, retention in sorted(self.retention.items()):
+            if start >= now - retention and (end - start) / resolution <= max_points:
+                return resolution
+        return None
+
+    def query(self, resolution, gpu_ids=None, start=None, end=None, metrics=None, max_points=None):
+        """返回与 [start, end] 重叠的桶：timestamps 为桶起始时间，metric 为平均值，
+        另有 metric_min、metric_max 和 metric_p95
+
+        桶数超过 max_points 时每 step 个相邻的桶合并为一个点（min 取最小、max 取最大、
+        平均值按 sum/count 合并、p95 取各桶 p95 的最大值作为上界），不丢弃任何桶
+        """
+        tier = self.tiers[resolution]
+        metrics = [m for m in (metrics or self.metrics) if m in self._columns]
+        columns = [self._columns[m] for m in metrics]
+        names = metrics + [f'{m}_{stat}' for stat in STATS for m in metrics]
+        if not tier.count:
+            return {}
+
+        order = tier.ordered()
+        starts = tier.starts[order]
+        lo, hi = time_range(starts, None if start is None else start - resolution, end)
+        selected = order[lo:hi]
+        # 每组的第一个桶在 selected 中的位置
+        groups = np.arange(0, len(selected), downsample_step(hi - lo, max_points))
+        current = tier.current_quantile() if len(selected) and selected[-1] == tier.head else None
+
+        result = {}
+        for gpu_id in (gpu_ids or self.gpu_ids):
+            slot = self._slots.get(gpu_id)
+            if slot is None or not len(selected):
+                continue
+
+            quantiles = tier.quantiles[selected, slot][:, columns]
+            if current is not None:
+                # 当前桶尚未结束，分位数即时计算
+                quantiles[-1] = current[slot, columns]
+            counts = np.add.reduceat(tier.counts[selected, slot][:, columns], groups, axis=0)
+            sums = np.add.reduceat(tier.sums[selected, slot][:, columns], groups, axis=0)
+            empty = counts == 0
+            with np.errstate(invalid='ignore', divide='ignore'):
+                averages = sums / counts
+            values = np.concatenate([
+                averages,
+                np.where(empty, np.nan, np.minimum.reduceat(tier.mins[selected, slot][:, columns], groups, axis=0)),
+                np.where(empty, np.nan, np.maximum.reduceat(tier.maxs[selected, slot][:, columns], groups, axis=0)),
+                np.fmax.reduceat(quantiles, groups, axis=0),
+            ], axis=1)
+            result[gpu_id] = format_series(starts[lo:hi][groups], values, names)
+
+        return result
@@ -0,0 +1,319 @@
+"""磁盘指标存储 - 内存映射、按时间分区、只追加的列文件
+
+目录结构：
+
+    STORAGE_PATH/
+        <start_ms>/                 每个分区一个目录（按起始时间命名）
+            meta.json               起始时间、容量、字段列表
+            timestamps.f64          每行的 Unix 时间（float64）
+            gpu-<id>.f32            每个 GPU 一个文件：容量 x 字段数（float32）
+
+每次采样在每个文件中写入一行固定宽度的记录，写入只是对 mmap 的原地赋值，
+由操作系统负责回写。分区写满或超过 STORAGE_PARTITION_SECONDS 时轮转，
+超过保留时长或总大小上限的旧分区会被删除。内存中的时间索引
+（每个分区的起止时间）用于定位分区，分区内部再对时间戳二分查找。
+
+轮转在监测循环中只切换到预先创建好的分区；旧分区的回写（msync）、过期分区的
+删除和下一个分区的创建都在单独的写入线程中进行，慢速磁盘不会阻塞采样 tick。
+"""
+
+import os
+import json
+import math
+import time
+import shutil
+import logging
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import (
+    STORAGE_METRICS, STORAGE_PARTITION_SECONDS, STORAGE_RETENTION_SECONDS,
+    STORAGE_MAX_BYTES, UPDATE_INTERVAL,
+)
+from .history import time_range, downsample_step, format_series
+
+logger = logging.getLogger(__name__)
+
+META_FILE = 'meta.json'
+TIMESTAMPS_FILE = 'timestamps.f64'
+
+
+def _gpu_file(gpu_id):
+    return f'gpu-{gpu_id}.f32'
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) else math.nan
+
+
+class _Partition:
+    """一个时间分区：时间戳文件加每个 GPU 一个值文件"""
+
+    def __init__(self, path, start, capacity, metrics, writable=False):
+        self.path = path
+        self.start = start
+        self.capacity = capacity
+        self.metrics = metrics
+        self.columns = {name: i for i, name in enumerate(metrics)}
+        self.writable = writable
+        self._gpus = {}  # gpu_id -> memmap(capacity, len(metrics))
+        self._rows = {}  # gpu_id -> 同一映射的 ndarray 视图（避免 memmap 子类的索引开销）
+
+        mode = 'w+' if writable else 'r'
+        self.timestamps = np.memmap(os.path.join(path, TIMESTAMPS_FILE), dtype=np.float64,
+                                    mode=mode, shape=(capacity,))
+        # 时间戳最后写入，因此已写入的行数等于非零时间戳的数量（进程崩溃后同样成立）
+        self.count = 0 if writable else int(np.count_nonzero(self.timestamps))
+
+    @classmethod
+    def create(cls, root, start, capacity, metrics, gpu_ids=()):
+        """创建可写分区，并预先创建 gpu_ids 的值文件"""
+        name = int(start * 1000)
+        while os.path.exists(os.path.join(root, str(name))):
+            name += 1
+        path = os.path.join(root, str(name))
+        os.makedirs(path)
+        partition = cls(path, start, capacity, metrics, writable=True)
+        partition.write_meta()
+        for gpu_id in gpu_ids:
+            partition.gpu(gpu_id)
+        return partition
+
+    @classmethod
+    def open(cls, path):
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        partition = cls(path, meta['start'], meta['capacity'], meta['metrics'])
+        # 预先创建的分区在启用后才写入实际的起始时间，进程在此之前退出时以第一行为准
+        if partition.count:
+            partition.start = min(partition.start, float(partition.timestamps[0]))
+        return partition
+
+    def write_meta(self):
+        with open(os.path.join(self.path, META_FILE), 'w') as f:
+            json.dump({'start': self.start, 'capacity': self.capacity, 'metrics': self.metrics}, f)
+
+    @property
+    def end(self):
+        return float(self.timestamps[self.count - 1]) if self.count else self.start
+
+    @property
+    def gpu_ids(self):
+        if not self.writable:
+            for name in os.listdir(self.path):
+                if name.startswith('gpu-') and name.endswith('.f32'):
+                    self._gpus.setdefault(name[4:-4], None)
+        return list(self._gpus)
+
+    def gpu(self, gpu_id):
+        """GPU 的值文件（只读分区中不存在时返回 None）"""
+        values = self._gpus.get(gpu_id)
+        if values is not None:
+            return values
+
+        filename = os.path.join(self.path, _gpu_file(gpu_id))
+        shape = (self.capacity, len(self.metrics))
+        if self.writable:
+            values = np.memmap(filename, dtype=np.float32, mode='w+', shape=shape)
+            # 分区中途出现的 GPU：之前的行标记为缺失
+            values[:self.count] = np.nan
+        elif os.path.exists(filename):
+            values = np.memmap(filename, dtype=np.float32, mode='r', shape=shape)
+        else:
+            return None
+        self._gpus[gpu_id] = values
+        return values
+
+    def append(self, gpu_data, timestamp, metrics):
+        row = self.count
+        for gpu_id, gpu in gpu_data.items():
+            rows = self._rows.get(gpu_id)
+            if rows is None:
+                rows = self._rows[gpu_id] = self.gpu(gpu_id).view(np.ndarray)
+            record = [gpu.get(name, math.nan) for name in metrics]
+            try:
+                rows[row] = record
+            except (TypeError, ValueError):
+                rows[row] = [_number(value) for value in record]
+        for gpu_id, rows in self._rows.items():
+            if gpu_id not in gpu_data:
+                rows[row] = np.nan
+        self.timestamps[row] = timestamp
+        self.count += 1
+
+    def size(self):
+        """已写入数据的字节数"""
+        return self.count * (8 + 4 * len(self.metrics) * len(self.gpu_ids))
+
+    def close(self):
+        if self.writable:
+            self.timestamps.flush()
+            for values in self._gpus.values():
+                values.flush()
+            self.writable = False
+
+
+class MetricStore:
+    """只追加的磁盘指标存储，接口与 MetricHistory 相同"""
+
+    def __init__(self, path, metrics=STORAGE_METRICS, interval=UPDATE_INTERVAL,
+                 partition_seconds=STORAGE_PARTITION_SECONDS, retention=STORAGE_RETENTION_SECONDS,
+                 max_bytes=STORAGE_MAX_BYTES):
+        self.path = path
+        self.metrics = list(metrics)
+        self.partition_seconds = partition_seconds
+        self.retention = retention
+        self.max_bytes = max_bytes
+        # 预留一倍余量，实际采样比 interval 快时按大小轮转
+        self.capacity = max(1, int(math.ceil(partition_seconds / interval))) * 2
+        self.partitions = []  # 时间索引：按起始时间排序的分区
+        self._active = None
+        # 轮转在事件循环中追加分区，过期删除在写入线程中进行
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='metric-store')
+
+        os.makedirs(path, exist_ok=True)
+        self._load()
+        # 预先创建的下一个分区（Future），轮转时直接启用
+        self._next = self._writer.submit(self._create, time.time(), ())
+
+    def _load(self):
+        """打开已有分区（只读），每次启动都写入新的分区"""
+        for name in sorted(os.listdir(self.path), key=lambda n: int(n) if n.isdigit() else -1):
+            partition_path = os.path.join(self.path, name)
+            if not os.path.exists(os.path.join(partition_path, META_FILE)):
+                continue
+            try:
+                self.partitions.append(_Partition.open(partition_path))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f'Skipping unreadable storage partition {partition_path}: {e}')
+        logger.info(f'Metric storage at {self.path}: {len(self.partitions)} existing partitions')
+
+    def append(self, gpu_data, timestamp):
+        """追加一次采样：gpu_data 为 {gpu_id: {metric: value}}，缺失的指标记为 NaN"""
+        active = self._active
+        if (active is None or active.count >= active.capacity
+                or timestamp - active.start >= self.partition_seconds):
+            active = self._rotate(timestamp)
+        active.append(gpu_data, timestamp, self.metrics)
+
+    def _rotate(self, timestamp):
+        """启用预先创建的分区；关闭旧分区、删除过期分区和创建下一个分区交给写入线程"""
+        previous = self._active
+        if previous is not None and previous.count < previous.capacity and not self._next.done():
+            # 下一个分区尚未创建好（磁盘缓慢）：当前分区还有空间，继续写入
+            return previous
+
+        try:
+            partition = self._next.result()
+        except Exception as e:
+            # 例如磁盘已满：重新提交创建；当前分区还有空间时继续写入
+            logger.error(f'Failed to create storage partition: {e}')
+            self._next = self._writer.submit(self._create, timestamp, ())
+            if previous is not None and previous.count < previous.capacity:
+                return previous
+            raise
+        partition.start = timestamp
+        with self._lock:
+            self.partitions.append(partition)
+        self._active = partition
+        self._next = self._writer.submit(self._maintain, previous, partition, timestamp)
+        return partition
+
+    def _create(self, start, gpu_ids):
+        return _Partition.create(self.path, start, self.capacity, self.metrics, gpu_ids)
+
+    def _maintain(self, previous, active, now):
+        """写入线程：回写旧分区，记录新分区的起始时间，删除过期分区，创建下一个分区"""
+        if previous is not None:
+            previous.close()
+        active.write_meta()
+        self._expire(now)
+        return self._create(now + self.partition_seconds, active.gpu_ids)
+
+    def _expire(self, now):
+        """删除超过保留时长或总大小上限的最旧分区（当前分区除外）"""
+        with self._lock:
+            partitions = list(self.partitions)
+        total = sum(partition.size() for partition in partitions)
+        expired = []
+        for oldest in partitions[:-1]:
+            too_old = self.retention and oldest.end < now - self.retention
+            oversized = self.max_bytes and total > self.max_bytes
+            if not (too_old or oversized):
+                break
+            total -= oldest.size()
+            expired.append(oldest)
+        if not expired:
+            return
+
+        with self._lock:
+            self.partitions = [partition for partition in self.partitions if partition not in expired]
+        for partition in expired:
+            shutil.rmtree(partition.path, ignore_errors=True)
+            logger.info(f'Removed storage partition {partition.path}')
+
+    def read(self, gpu_id, start=None, end=None):
+        """按时间顺序逐个分区返回 (partition, timestamps, values)
+
+        timestamps 和 values 是内存映射文件的切片（零拷贝），只包含 [start, end] 内的行
+        """
+        # 复制列表：查询在线程池中执行，轮转可能同时修改分区列表
+        for partition in list(self.partitions):
+            if not partition.count:
+                continue
+            if (end is not None and partition.start > end) or (start is not None and partition.end < start):
+                continue
+            values = partition.gpu(gpu_id)
+            if values is None:
+                continue
+            timestamps = partition.timestamps[:partition.count]
+            lo, hi = time_range(timestamps, start, end)
+            if hi > lo:
+                yield partition, timestamps[lo:hi], values[lo:hi]
+
+    @property
+    def gpu_ids(self):
+        ids = {}
+        for partition in list(self.partitions):
+            ids.update(dict.fromkeys(partition.gpu_ids))
+        return list(ids)
+
+    def query(self, gpu_ids=None, start=None, end=None, metrics=None, max_points=None):
+        """与 MetricHistory.query 的返回格式相同，数据跨越多个分区"""
+        metrics = [m for m in (metrics or self.metrics) if m in self.metrics]
+        result = {}
+
+        for gpu_id in (gpu_ids or self.gpu_ids):
+            chunks = list(self.read(gpu_id, start, end))
+            if not chunks:
+                continue
+            step = downsample_step(sum(len(timestamps) for _, timestamps, _ in chunks), max_points)
+
+            series = {'timestamps': [], **{name: [] for name in metrics}}
+            offset = 0  # 保持跨分区的抽样间隔一致
+            for partition, timestamps, values in chunks:
+                # 分区的字段列表可能来自旧配置，缺失的字段补 NaN
+                columns = [partition.columns.get(name) for name in metrics]
+                rows = values[offset::step]
+                selected = np.full((len(rows), len(metrics)), np.nan, dtype=np.float32)
+                for i, column in enumerate(columns):
+                    if column is not None:
+                        selected[:, i] = rows[:, column]
+                chunk = format_series(timestamps[offset::step], selected, metrics)
+                for key, items in chunk.items():
+                    series[key].extend(items)
+                offset = (offset - len(timestamps)) % step
+            result[gpu_id] = series
+
+        return result
+
+    def close(self):
+        # 等待进行中的轮转；没有启用的预先创建的分区被删除
+        self._writer.shutdown(wait=True)
+        if self._next.exception() is None:
+            shutil.rmtree(self._next.result().path, ignore_errors=True)
+        if self._active is not None:
+            self._active.close()
+            self._active = None
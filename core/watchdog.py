@@ -0,0 +1,229 @@
+"""设备看门狗 - 单个 GPU 的 NVML 调用卡住时不拖住整个 tick
+
+掉卡（fallen off the bus）的 GPU 上 NVML 调用可能长时间不返回。采集线程在开始
+处理每个设备时记录进度，事件循环等待结果时按设备检查截止时间：某个设备超过
+GPU_COLLECT_TIMEOUT 仍未返回时不再等待这个 tick 的剩余部分，已采集的 GPU 照常发布，
+其余 GPU 使用最近一次的有效值并标记为 stale；调用返回时记一次超时，连续
+GPU_TIMEOUT_STRIKES 次超时的设备被隔离。偶尔一次慢的 tick 不会隔离正常的 GPU。
+调用超过 GPU_HANG_TIMEOUT 仍未返回的设备视为卡住，立即隔离。隔离的设备不再参与
+采集，在单独的线程中按指数退避重新探测，探测成功后恢复。
+"""
+
+import time
+import asyncio
+import logging
+import threading
+
+import pynvml
+
+from .config import (
+    GPU_COLLECT_TIMEOUT, GPU_TIMEOUT_STRIKES, GPU_HANG_TIMEOUT, GPU_REPROBE_MIN_INTERVAL,
+    GPU_REPROBE_MAX_INTERVAL,
+)
+
+logger = logging.getLogger(__name__)
+
+LATENCY_SMOOTHING = 0.1  # 采集延迟的指数移动平均系数
+
+
+class DeviceWatchdog:
+    """记录每个设备的采集延迟，检测卡住的设备，管理隔离和重新探测"""
+
+    def __init__(self, timeout=GPU_COLLECT_TIMEOUT, strikes=GPU_TIMEOUT_STRIKES, hang_timeout=GPU_HANG_TIMEOUT,
+                 reprobe_min=GPU_REPROBE_MIN_INTERVAL, reprobe_max=GPU_REPROBE_MAX_INTERVAL):
+        self.timeout = timeout
+        self.strikes = strikes
+        self.hang_timeout = max(hang_timeout, timeout)
+        self.reprobe_min = reprobe_min
+        self.reprobe_max = reprobe_max
+        self.current = None     # (设备或阶段, 开始时间, 线程)，采集线程正在处理的对象
+        self.devices = {}       # gpu_id -> 延迟统计、超时次数、隔离状态
+        self.last_good = {}     # gpu_id -> (最近一次有效数据, 时间戳)
+        self._probes = {}       # gpu_id -> {'thread', 'started', 'ok', 'counted'}
+        self._lock = threading.Lock()
+
+    # --- 采集线程中调用 ---
+
+    def begin(self, key):
+        """开始处理一个设备（gpu_id）或阶段（例如 'devices'）"""
+        self.current = (key, time.monotonic(), threading.get_ident())
+
+    def end(self, gpu_id=None, duration=None, data=None):
+        """设备处理完成：记录延迟，超时累计 strike，数据有效时作为最近的有效值"""
+        current = self.current
+        # 被放弃的采集线程稍后返回时，不清除新线程的进度
+        if current is not None and current[2] == threading.get_ident():
+            self.current = None
+        if gpu_id is None or duration is None:
+            return
+
+        with self._lock:
+            state = self._state(gpu_id)
+            state['last_ms'] = round(duration * 1000, 3)
+            state['avg_ms'] = round(state['last_ms'] if state['avg_ms'] is None else
+                                    state['avg_ms'] + LATENCY_SMOOTHING * (state['last_ms'] - state['avg_ms']), 3)
+            state['max_ms'] = max(state['max_ms'], state['last_ms'])
+            state['samples'] += 1
+
+            if state['quarantined']:
+                # 被放弃的采集线程中卡住的调用终于返回：只记录延迟
+                return
+            if duration > self.timeout:
+                state['timeouts'] += 1
+                state['strikes'] += 1
+                logger.warning(f"GPU {gpu_id}: Collection took {duration:.2f}s "
+                               f"(strike {state['strikes']}/{self.strikes})")
+                if state['strikes'] >= self.strikes:
+                    self._quarantine(gpu_id, state, 'repeated timeouts')
+            else:
+                state['strikes'] = 0
+
+        if data:
+            self.last_good[gpu_id] = (data, time.time())
+
+    # --- 事件循环中调用 ---
+
+    async def wait(self, future):
+        """等待采集完成；某个设备或阶段超过截止时间仍未返回时返回它的 key（调用仍在进行），否则返回 None"""
+        while True:
+            done, _ = await asyncio.wait({future}, timeout=self.timeout / 2)
+            if done:
+                return None
+            current = self.current
+            if current is not None and time.monotonic() - current[1] > self.timeout:
+                return current[0]
+
+    def hanging(self):
+        """采集线程当前的调用超过卡住截止时间时返回它的 key，否则返回 None"""
+        current = self.current
+        if current is not None and time.monotonic() - current[1] > self.hang_timeout:
+            return current[0]
+        return None
+
+    def hung(self, gpu_id):
+        """设备调用超过卡住截止时间没有返回：立即隔离"""
+        with self._lock:
+            state = self._state(gpu_id)
+            state['timeouts'] += 1
+            self._quarantine(gpu_id, state, f'no response within {self.hang_timeout:g}s')
+
+    def quarantined(self):
+        """被隔离的 gpu_id 集合"""
+        with self._lock:
+            return {gpu_id for gpu_id, state in self.devices.items() if state['quarantined']}
+
+    def active(self, gpu_id):
+        """设备是否参与采集（未被隔离）"""
+        state = self.devices.get(gpu_id)
+        return state is None or not state['quarantined']
+
+    def stale(self, gpu_id):
+        """返回标记为 stale 的最近有效数据，从未采集成功时返回 None"""
+        last = self.last_good.get(gpu_id)
+        if last is None:
+            return None
+        data, timestamp = last
+        stale = {key: value for key, value in data.items() if key != 'collect_latency_ms'}
+        stale['stale'] = True
+        stale['stale_seconds'] = round(time.time() - timestamp, 1)
+        return stale
+
+    def check_probes(self, handles):
+        """处理探测结果，并为到期的隔离设备启动新的探测
+
+        handles 为 gpu_id -> 句柄；返回恢复正常的 gpu_id 列表
+        """
+        recovered = []
+        now = time.monotonic()
+        with self._lock:
+            for gpu_id, probe in list(self._probes.items()):
+                state = self._state(gpu_id)
+                alive = probe['thread'].is_alive()
+                if alive and now - probe['started'] <= self.timeout:
+                    continue
+                if not alive and probe['ok']:
+                    del self._probes[gpu_id]
+                    state.update(quarantined=False, strikes=0, failures=0, next_probe=None)
+                    logger.info(f"GPU {gpu_id}: Responding again, leaving quarantine")
+                    recovered.append(gpu_id)
+                    continue
+                if not probe['counted']:
+                    probe['counted'] = True
+                    self._backoff(gpu_id, state, now)
+                if not alive:
+                    del self._probes[gpu_id]
+
+            for gpu_id, state in self.devices.items():
+                # 上一次探测仍卡住时不启动新的探测线程
+                if (state['quarantined'] and gpu_id not in self._probes and gpu_id in handles
+                        and now >= state['next_probe']):
+                    self._start_probe(gpu_id, handles[gpu_id], now)
+        return recovered
+
+    def forget(self, gpu_id=None):
+        """设备被移除或重新枚举时丢弃它的状态"""
+        with self._lock:
+            if gpu_id is None:
+                self.devices.clear()
+                self.last_good.clear()
+            else:
+                self.devices.pop(gpu_id, None)
+                self.last_good.pop(gpu_id, None)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'timeout': self.timeout,
+                'hang_timeout': self.hang_timeout,
+                'devices': {
+                    gpu_id: {
+                        **{key: value for key, value in state.items() if key != 'next_probe'},
+                        'next_probe_in': (round(max(0.0, state['next_probe'] - now), 1)
+                                          if state['quarantined'] else None),
+                    }
+                    for gpu_id, state in self.devices.items()
+                },
+            }
+
+    # --- 内部 ---
+
+    def _state(self, gpu_id):
+        state = self.devices.get(gpu_id)
+        if state is None:
+            state = self.devices[gpu_id] = {
+                'last_ms': None, 'avg_ms': None, 'max_ms': 0.0, 'samples': 0,
+                'timeouts': 0, 'strikes': 0, 'quarantined': False, 'failures': 0, 'next_probe': None,
+            }
+        return state
+
+    def _quarantine(self, gpu_id, state, reason):
+        if state['quarantined']:
+            return
+        state['quarantined'] = True
+        state['failures'] = 0
+        state['next_probe'] = time.monotonic() + self.reprobe_min
+        logger.error(f"GPU {gpu_id}: Quarantined ({reason}), re-probing in {self.reprobe_min:g}s")
+
+    def _backoff(self, gpu_id, state, now):
+        """探测失败或超时：下一次探测的间隔加倍，直到 reprobe_max"""
+        state['failures'] += 1
+        delay = min(self.reprobe_min * 2 ** state['failures'], self.reprobe_max)
+        state['next_probe'] = now + delay
+        logger.warning(f"GPU {gpu_id}: Re-probe failed, next attempt in {delay:g}s")
+
+    def _start_probe(self, gpu_id, handle, now):
+        probe = {'started': now, 'ok': False, 'counted': False}
+
+        def run():
+            try:
+                pynvml.nvmlDeviceGetMemoryInfo(handle)
+                # 超过截止时间才返回的探测同样算作失败
+                probe['ok'] = time.monotonic() - now <= self.timeout
+            except pynvml.NVMLError as e:
+                logger.debug(f"GPU {gpu_id}: Re-probe error - {e}")
+
+        # 探测可能同样卡住，使用单独的守护线程，不占用采集线程
+        probe['thread'] = threading.Thread(target=run, name=f'nvml-probe-{gpu_id}', daemon=True)
+        self._probes[gpu_id] = probe
+        probe['thread'].start()
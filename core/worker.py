@@ -0,0 +1,78 @@
+"""NVML 采集线程 - 一个专用线程独占所有 NVML 调用
+
+默认线程池中每个 tick 为每个 GPU 和进程列表各提交一次任务，每次任务都要在线程间
+切换并通过 call_soon_threadsafe 唤醒事件循环，而 NVML 内部大部分调用本来就是串行的。
+采集线程在一次遍历中收集所有设备，整个 tick 只回到事件循环一次。
+"""
+
+import queue
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def _resolve(future, result, error):
+    """在事件循环中设置结果（等待方已取消时忽略）"""
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class NvmlWorker:
+    """按提交顺序在同一个线程中执行采集函数，结果通过一次 call_soon_threadsafe 发布"""
+
+    def __init__(self, name='nvml-collector'):
+        self.name = name
+        self.ticks = 0
+        self._requests = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动采集线程（重复调用无效）"""
+        with self._lock:
+            if not self.running:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    async def run(self, func, *args):
+        """在采集线程中执行 func(*args) 并等待结果"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.start()
+        self._requests.put((loop, future, func, args))
+        return await future
+
+    def stop(self, timeout=5.0):
+        """处理完已提交的请求后停止线程"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._requests.put(None)
+            thread.join(timeout=timeout)
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            loop, future, func, args = request
+            try:
+                result, error = func(*args), None
+            except Exception as e:
+                result, error = None, e
+            self.ticks += 1
+            try:
+                loop.call_soon_threadsafe(_resolve, future, result, error)
+            except RuntimeError:
+                # 事件循环已关闭（关闭过程中）
+                logger.debug("Event loop closed, dropping NVML collection result")
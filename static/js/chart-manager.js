@@ -130,6 +130,52 @@ function initGPUData(gpuId, initialValues = {}) {
     };
 }
 
+// Backfill the newest chart points of a GPU from server-side history (/api/history)
+// 用服务端历史（/api/history）回填 GPU 图表最新的数据点
+function backfillChartData(gpuId, series) {
+    const data = chartData[gpuId];
+    if (!data || !series || !series.timestamps) return;
+
+    const count = Math.min(series.timestamps.length, data.utilization.labels.length);
+    if (count === 0) return;
+
+    // Last `count` values of a metric, missing values as 0
+    // 指标最后 `count` 个值，缺失的值记为 0
+    const pick = name => {
+        const values = (series[name] || []).slice(-count).map(v => Number(v) || 0);
+        while (values.length < count) values.unshift(0);
+        return values;
+    };
+    // Replace the tail of an array in place (charts keep references to these arrays)
+    // 原地替换数组末尾（图表持有这些数组的引用）
+    const replaceTail = (arr, values) => arr.splice(arr.length - count, count, ...values);
+
+    const labels = series.timestamps.slice(-count).map(ts => new Date(ts * 1000).toLocaleTimeString());
+    const utilization = pick('utilization');
+    const power = pick('power_draw');
+    const memoryUsed = pick('memory_used');
+    const memoryTotal = pick('memory_total');
+
+    const singleLine = {
+        utilization: utilization,
+        temperature: pick('temperature'),
+        memory: memoryUsed.map((used, i) => (used / (memoryTotal[i] || 1)) * 100),
+        power: power,
+        fanSpeed: pick('fan_speed'),
+        efficiency: utilization.map((util, i) => power[i] > 0 ? util / power[i] : 0)
+    };
+
+    Object.entries(singleLine).forEach(([chartType, values]) => {
+        replaceTail(data[chartType].labels, labels);
+        replaceTail(data[chartType].data, values);
+    });
+
+    replaceTail(data.clocks.labels, labels);
+    replaceTail(data.clocks.graphicsData, pick('clock_graphics'));
+    replaceTail(data.clocks.smData, pick('clock_sm'));
+    replaceTail(data.clocks.memoryData, pick('clock_memory'));
+}
+
 // Calculate statistics for chart data
 function calculateStats(data) {
     if (!data || !Array.isArray(data) || data.length === 0) {
@@ -19,7 +19,7 @@ function createOverviewCard(gpuId, gpuInfo) {
                     </h2>
                     <p style="color: var(--text-secondary); font-size: 0.9rem;">${getMetricValue(gpuInfo, 'name', 'Unknown GPU')}</p>
                 </div>
-                <div class="gpu-status-badge">
+                <div class="gpu-status-badge" id="overview-status-${gpuId}">
                     <span class="status-dot"></span>
                     <span class="status-text">在线</span>
                 </div>
@@ -72,6 +72,7 @@ function updateOverviewCard(gpuId, gpuInfo, shouldUpdateDOM = true) {
         if (tempEl) tempEl.textContent = `${getMetricValue(gpuInfo, 'temperature', 0)}°C`;
         if (memEl) memEl.textContent = `${Math.round(memPercent)}%`;
         if (powerEl) powerEl.textContent = `${getMetricValue(gpuInfo, 'power_draw', 0).toFixed(0)}W`;
+        updateStatusBadge(document.getElementById(`overview-status-${gpuId}`), gpuInfo);
     }
 
     // ALWAYS update chart data for the mini chart (smooth animations)
@@ -118,7 +119,7 @@ function createGPUCard(gpuId, gpuInfo) {
                         </span>
                     </div>
                 </div>
-                <div class="gpu-status-badge">
+                <div class="gpu-status-badge" id="status-${gpuId}">
                     <span class="status-dot"></span>
                     <span class="status-text">在线</span>
                 </div>
@@ -638,6 +639,16 @@ function createGPUCard(gpuId, gpuInfo) {
     `;
 }
 
+// Status badge: online, or stale when the GPU timed out and shows its last good reading
+// 状态徽章：在线，或 GPU 采集超时、显示最近有效值时的过期状态
+function updateStatusBadge(badge, gpuInfo) {
+    if (!badge) return;
+    const stale = gpuInfo.stale === true;
+    badge.classList.toggle('stale', stale);
+    const text = badge.querySelector('.status-text');
+    if (text) text.textContent = stale ? `无响应 ${Math.round(gpuInfo.stale_seconds || 0)}s` : '在线';
+}
+
 // Helper function to format memory values
 // 帮助函数格式化内存值 (MB 转 GB 当适用)
 function formatMemory(mb) {
@@ -725,6 +736,7 @@ function updateGPUDisplay(gpuId, gpuInfo, shouldUpdateDOM = true) {
         if (memEl) memEl.textContent = formatMemory(memory_used);
         if (powerEl) powerEl.textContent = `${power_draw.toFixed(1)}W`;
         if (fanEl) fanEl.textContent = `${fan_speed}%`;
+        updateStatusBadge(document.getElementById(`status-${gpuId}`), gpuInfo);
 
         // Update temperature status
         // 更新温度状态
@@ -942,6 +954,14 @@ function updateGPUDisplay(gpuId, gpuInfo, shouldUpdateDOM = true) {
     }
 }
 
+// 进程的 GPU SM 利用率和主机 CPU（旧版本节点没有这些字段）
+function formatProcessUsage(proc) {
+    const parts = [];
+    if (proc.sm_utilization != null) parts.push(`SM ${proc.sm_utilization}%`);
+    if (proc.cpu_percent != null) parts.push(`CPU ${Math.round(proc.cpu_percent)}%`);
+    return parts.join(' · ');
+}
+
 // 更新进程显示
 function updateProcesses(processes) {
     const container = document.getElementById('processes-container');
@@ -969,6 +989,7 @@ function updateProcesses(processes) {
             <div class="process-name">
                 <strong>${proc.name}</strong>
                 <span style="color: var(--text-secondary); font-size: 0.85rem; margin-left: 0.5rem;">PID: ${proc.pid}</span>
+                ${formatProcessUsage(proc) ? `<span style="color: var(--text-secondary); font-size: 0.85rem; margin-left: 0.5rem;">${formatProcessUsage(proc)}</span>` : ''}
             </div>
             <div class="process-memory">
                 <span style="font-size: 1.1rem; font-weight: 700;">${formatMemory(proc.memory)}</span>
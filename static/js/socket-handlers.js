@@ -14,10 +14,104 @@ const RECONNECT_DELAY = 2000; // 2秒重连间隔
 // 创建WebSocket连接
 function createWebSocketConnection() {
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-    const ws = new WebSocket(protocol + '//' + window.location.host + '/socket.io/');
+    // Request the delta protocol by default (a keyframe first, then only changed fields);
+    // open the page with ?protocol=binary or ?protocol=json to choose another format
+    // 默认请求增量协议（先发送关键帧，之后只发送变化的字段）；
+    // 页面地址加 ?protocol=binary 或 ?protocol=json 可选择其他格式
+    const frameProtocol = new URLSearchParams(window.location.search).get('protocol') || 'delta';
+    const ws = new WebSocket(protocol + '//' + window.location.host + '/socket.io/?protocol=' + frameProtocol);
+    ws.binaryType = 'arraybuffer';
     return ws;
 }
 
+// Columnar binary protocol: numeric field schema, sent once as a text message
+// 列式二进制协议：数值字段的schema，以文本消息发送一次
+let binarySchema = null;
+const BINARY_HEADER_SIZE = 16;
+const BINARY_INT32_MISSING = -2147483648;
+
+// Decode a binary frame: header, JSON trailer, then one column per schema field
+// 解码二进制帧：头部、JSON尾部，然后每个schema字段一列
+function decodeBinaryFrame(buffer) {
+    const view = new DataView(buffer);
+    const schemaId = view.getUint16(4, true);
+    const count = view.getUint16(6, true);
+    const trailerLength = view.getUint32(12, true);
+    if (!binarySchema || schemaId !== binarySchema.id) return null;
+
+    let offset = BINARY_HEADER_SIZE;
+    const trailer = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, offset, trailerLength)));
+    offset += trailerLength;
+
+    const gpuIds = trailer.gpu_ids;
+    delete trailer.gpu_ids;
+    binarySchema.fields.forEach(([name, code]) => {
+        const size = code === 'd' ? 8 : 4;
+        for (let row = 0; row < count; row++) {
+            let value;
+            if (code === 'i') {
+                value = view.getInt32(offset, true);
+                if (value === BINARY_INT32_MISSING) value = NaN;
+            } else {
+                value = code === 'f' ? view.getFloat32(offset, true) : view.getFloat64(offset, true);
+            }
+            if (!Number.isNaN(value)) trailer.gpus[gpuIds[row]][name] = value;
+            offset += size;
+        }
+    });
+    return trailer;
+}
+
+// Delta protocol state: last reconstructed frame and its sequence number
+// 增量协议状态：最近重建的完整帧及其序号
+let deltaSeq = null;
+let deltaData = null;
+const DELTA_REMOVED_KEY = '__removed__';
+
+function isPlainObject(value) {
+    return value !== null && typeof value === 'object' && !Array.isArray(value);
+}
+
+// Merge changes into base and return a new object (base is not modified)
+// 将变化合并到base并返回新对象（不修改base）
+function applyDelta(base, changes) {
+    const result = Object.assign({}, base);
+    Object.keys(changes).forEach(key => {
+        const value = changes[key];
+        if (key === DELTA_REMOVED_KEY) {
+            value.forEach(removed => delete result[removed]);
+        } else if (isPlainObject(value) && isPlainObject(result[key])) {
+            result[key] = applyDelta(result[key], value);
+        } else {
+            result[key] = value;
+        }
+    });
+    return result;
+}
+
+// Rebuild the full frame from a keyframe/delta message; null means resync needed
+// 从关键帧/增量消息重建完整帧；返回null表示需要重新同步
+function decodeDeltaMessage(message) {
+    if (message.type === 'keyframe') {
+        deltaSeq = message.seq;
+        deltaData = message.data;
+        return deltaData;
+    }
+    if (message.type === 'delta') {
+        if (deltaData === null || message.seq !== deltaSeq + 1) {
+            deltaSeq = null;
+            deltaData = null;
+            return null;
+        }
+        deltaSeq = message.seq;
+        deltaData = applyDelta(deltaData, message.changes);
+        return deltaData;
+    }
+    // Plain full frame (json protocol)
+    // 普通完整帧（json协议）
+    return message;
+}
+
 
 // 连接网络套接字
 function connectWebSocket() {
@@ -42,6 +136,9 @@ function setupWebSocketHandlers() {
 // 处理网络套接字打开事件
 function handleSocketOpen() {
     console.log('Connected to server');
+    deltaSeq = null;
+    deltaData = null;
+    loadHistory();
     reconnectAttempts = 0;
     clearInterval(reconnectInterval);
     reconnectInterval = null;
@@ -153,10 +250,96 @@ let rafScheduled = false; // 防止重复调度RAF的标志
 const lastDOMUpdate = {}; // 跟踪每个GPU的最后更新时间
 const DOM_UPDATE_INTERVAL = 1000; // 文本/卡片每1秒更新一次，图表每帧更新一次
 
+// Server-side history fetched on connect, waiting for the GPU's charts to be created
+// 连接时获取的服务端历史，等待该GPU的图表创建后回填
+let pendingHistory = {};
+const HISTORY_METRICS = 'utilization,temperature,memory_used,memory_total,power_draw,fan_speed,clock_graphics,clock_sm,clock_memory';
+
+// Fetch the last minute of history so charts don't start from zero after a refresh
+// 获取最近一分钟的历史，使页面刷新后图表不会从零开始
+function loadHistory() {
+    fetch(`/api/history?seconds=60&max_points=120&metrics=${HISTORY_METRICS}`)
+        .then(response => response.ok ? response.json() : null)
+        .then(history => {
+            if (!history) return; // Hub mode or history disabled
+            Object.entries(history.gpus).forEach(([gpuId, series]) => {
+                if (chartData[gpuId]) {
+                    backfillChartData(gpuId, series);
+                } else {
+                    pendingHistory[gpuId] = series;
+                }
+            });
+        })
+        .catch(error => console.debug('History unavailable:', error));
+}
+
+// Apply fetched history once a GPU's chart data exists
+// GPU图表数据创建后应用已获取的历史
+function applyPendingHistory(gpuId) {
+    if (pendingHistory[gpuId]) {
+        backfillChartData(gpuId, pendingHistory[gpuId]);
+        delete pendingHistory[gpuId];
+    }
+}
+
+// Static GPU info (name, driver, max clocks...) sent once on connect
+// 静态GPU信息（名称、驱动、最大时钟等）仅在连接时发送一次
+let staticGPUInfo = {};
+
+// Merge cached static info into the dynamic per-tick GPU data
+// 将缓存的静态信息合并到每次更新的动态GPU数据中
+function mergeStaticInfo(gpus) {
+    Object.keys(gpus).forEach(gpuId => {
+        const staticInfo = staticGPUInfo[gpuId];
+        if (staticInfo) {
+            gpus[gpuId] = Object.assign({}, staticInfo, gpus[gpuId]);
+        }
+    });
+}
+
 // Handle incoming GPU data
 // 处理传入的GPU数据
 function handleSocketMessage(event) {
-    const data = JSON.parse(event.data);
+    const message = event.data instanceof ArrayBuffer
+        ? decodeBinaryFrame(event.data)
+        : JSON.parse(event.data);
+    if (message === null) return;
+
+    // Static info message: cache it and wait for the next data frame
+    // 静态信息消息：缓存后等待下一个数据帧
+    if (message.type === 'static_info') {
+        staticGPUInfo = message.gpus || {};
+        return;
+    }
+
+    // Binary schema message: used to decode the following binary frames
+    // 二进制schema消息：用于解码后续的二进制帧
+    if (message.type === 'binary_schema') {
+        binarySchema = message;
+        return;
+    }
+
+    // NVML event (XID, ECC, throttling): pushed immediately, outside data frames
+    // NVML 事件（XID、ECC、降频）：在数据帧之外立即推送
+    if (message.type === 'gpu_event') {
+        showGpuEvent(message);
+        return;
+    }
+
+    // Sequence gap: ask the server for a keyframe and skip this frame
+    // 序号不连续：请求服务器发送关键帧并跳过此帧
+    const frame = decodeDeltaMessage(message);
+    if (frame === null) {
+        if (socket && socket.readyState === WebSocket.OPEN) {
+            socket.send('resync');
+        }
+        return;
+    }
+
+    // Shallow copy so per-GPU merges below never modify the delta state
+    // 浅拷贝，使下面按GPU的合并不会修改增量状态
+    const data = Object.assign({}, frame, { gpus: Object.assign({}, frame.gpus) });
+
     // Hub mode: different data structure with nodes
     // 集群模式：具有节点的不同数据结构
     if (data.mode === 'hub') {
@@ -172,6 +355,8 @@ function handleSocketMessage(event) {
         overviewContainer.innerHTML = '';
     }
 
+    mergeStaticInfo(data.gpus);
+
     const gpuCount = Object.keys(data.gpus).length;
     const now = Date.now();
     
@@ -194,6 +379,7 @@ function handleSocketMessage(event) {
                     clockSm: gpuInfo.clock_sm,
                     clockMemory: gpuInfo.clock_memory
                 });
+                applyPendingHistory(gpuId);
             }
             updateAllChartDataOnly(gpuId, gpuInfo);
         });
@@ -219,6 +405,7 @@ function handleSocketMessage(event) {
                 clockSm: gpuInfo.clock_sm,
                 clockMemory: gpuInfo.clock_memory
             });
+            applyPendingHistory(gpuId);
         }
 
         // Determine if text/card DOM should update (throttled) or just charts (every frame)
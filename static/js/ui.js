@@ -193,6 +193,51 @@ function autoSwitchSingleGPU(gpuCount, gpuIds) {
     }
 }
 
+// Event banner: XID/ECC/throttle notifications from NVML events
+// 事件横幅：来自 NVML 事件的 XID/ECC/降频通知
+const GPU_EVENT_LABELS = {
+    xid: 'XID 错误',
+    ecc_double_bit: '双比特 ECC 错误',
+    ecc_single_bit: '单比特 ECC 错误',
+    throttle: '降频'
+};
+const GPU_EVENT_DISMISS_MS = 10000;
+const GPU_EVENT_MAX_VISIBLE = 5;
+
+function describeGpuEvent(event) {
+    const label = GPU_EVENT_LABELS[event.kind] || event.kind;
+    if (event.kind === 'xid') return `${label} ${event.xid}`;
+    if (event.kind === 'throttle') {
+        const reasons = event.throttle_reasons || [];
+        return reasons.length ? `${label}：${reasons.join('、')}` : '降频已解除';
+    }
+    return label;
+}
+
+function showGpuEvent(message) {
+    const event = message.event || {};
+    let container = document.getElementById('gpu-events');
+    if (!container) {
+        container = document.createElement('div');
+        container.id = 'gpu-events';
+        container.className = 'gpu-events';
+        document.body.appendChild(container);
+    }
+
+    const banner = document.createElement('div');
+    const cleared = event.kind === 'throttle' && !(event.throttle_reasons || []).length;
+    banner.className = `gpu-event ${cleared ? 'info' : event.kind === 'throttle' ? 'warning' : 'critical'}`;
+    banner.textContent = `${message.node_name ? message.node_name + ' · ' : ''}GPU ${event.gpu_id}: ${describeGpuEvent(event)}`;
+    banner.onclick = () => banner.remove();
+    container.prepend(banner);
+
+    // 只保留最近几条，超时自动消失
+    while (container.children.length > GPU_EVENT_MAX_VISIBLE) {
+        container.lastChild.remove();
+    }
+    setTimeout(() => banner.remove(), GPU_EVENT_DISMISS_MS);
+}
+
 // Make switchToView globally available
 // 使 switchToView 在全局可用
 window.switchToView = switchToView;
@@ -0,0 +1,48 @@
+"""
+Shared setup and report output for the benchmarks
+Puts the repository root on sys.path, turns off core features by environment
+variable before core is imported, and prints/writes the JSON report every
+benchmark produces
+"""
+
+import os
+import sys
+import json
+import platform
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def disable(*names):
+    """Set these feature flags to false unless already set
+
+    core.config reads the environment when it is imported, so call this before
+    the first `import core`
+    """
+    for name in names:
+        os.environ.setdefault(name, 'false')
+
+
+def write_report(results, output=None, config=None, **extra):
+    """Print the report (version, timestamp, Python, extra keys, config, results)
+    as JSON and also write it to output when given"""
+    from core import __version__
+
+    report = {
+        'version': __version__,
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        **extra,
+    }
+    if config is not None:
+        report['config'] = config
+    report['results'] = results
+
+    print(json.dumps(report, indent=2))
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
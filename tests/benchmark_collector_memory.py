@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Collector memory benchmark
+Runs GPUMonitor._collect_device() (collection plus conversion to the
+published dict) against a simulated NVML (mock_nvml.SimulatedNVML, zero call
+latency) and reports, per GPU per tick, the Python time spent, the transient
+allocation peak, the objects and bytes of the published data, and the
+state the collector keeps between ticks
+"""
+
+import sys
+import time
+import argparse
+import tracemalloc
+
+from bench_common import disable, write_report
+
+# 采集在本线程内同步运行：关闭采集线程，以及会在后台分配内存的历史、汇总和事件线程
+disable('HISTORY', 'ROLLUPS', 'NVML_EVENTS', 'NVML_COLLECTOR_THREAD')
+
+from core.metrics import MetricsCollector
+from core.monitor import GPUMonitor
+from mock_nvml import SimulatedNVML
+
+
+def collect_tick(monitor, gpu_ids):
+    return {gpu_id: monitor._collect_device(gpu_id) for gpu_id in gpu_ids}
+
+
+def measure(monitor, args):
+    gpu_ids = [gpu_id for gpu_id, _ in monitor.devices.items()]
+    per_tick = args.ticks * len(gpu_ids)
+    for _ in range(args.warmup):
+        collect_tick(monitor, gpu_ids)
+
+    # 时间：不启用 tracemalloc
+    started = time.perf_counter()
+    for _ in range(args.ticks):
+        collect_tick(monitor, gpu_ids)
+    elapsed = time.perf_counter() - started
+
+    # 一个 tick 内的瞬时分配峰值（相对 tick 开始时的内存）
+    tracemalloc.start()
+    peaks = []
+    for _ in range(args.ticks):
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        published = collect_tick(monitor, gpu_ids)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+        del published
+    tracemalloc.stop()
+
+    # 发布的数据：对象数和字节数（深度统计，不含共享的字符串键）
+    published = collect_tick(monitor, gpu_ids)
+    objects, size = 0, 0
+    for data in published.values():
+        counted = deep_size(data, set())
+        objects += counted[0]
+        size += counted[1]
+
+    gpus = len(gpu_ids)
+    return {
+        'us_per_gpu': round(elapsed / per_tick * 1e6, 2),
+        'peak_kib_per_gpu': round(sum(peaks) / len(peaks) / gpus / 1024, 2),
+        'published_objects_per_gpu': round(objects / gpus, 1),
+        'published_kib_per_gpu': round(size / gpus / 1024, 2),
+        'state_kib_per_gpu': round(collector_state_bytes(monitor.collector) / gpus / 1024, 2),
+    }
+
+
+def deep_size(obj, seen):
+    """(对象数, 字节数)，驻留的字符串（字典键）和小整数不计入"""
+    if id(obj) in seen or (isinstance(obj, str) and obj.isidentifier()) or obj is None or isinstance(obj, bool):
+        return 0, 0
+    seen.add(id(obj))
+    objects, size = 1, sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        children = [item for pair in obj.items() for item in pair]
+    elif isinstance(obj, (list, tuple, set)):
+        children = list(obj)
+    elif hasattr(obj, '__slots__'):
+        children = [getattr(obj, slot) for slot in obj.__slots__ if hasattr(obj, slot)]
+    else:
+        children = []
+    for child in children:
+        counted = deep_size(child, seen)
+        objects += counted[0]
+        size += counted[1]
+    return objects, size
+
+
+def collector_state_bytes(collector):
+    """每个 GPU 跨 tick 保留的状态（分组缓存除外，它在两种表示中相同）"""
+    seen = set()
+    return sum(deep_size(value, seen)[1] for name, value in vars(collector).items()
+               if isinstance(value, dict) and name not in ('group_cache', 'static_info'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Collector memory and allocations per tick (simulated NVML)')
+    parser.add_argument('--gpus', type=int, default=8, help='Simulated GPUs')
+    parser.add_argument('--ticks', type=int, default=200, help='Measured ticks')
+    parser.add_argument('--warmup', type=int, default=5, help='Ticks before measuring')
+    parser.add_argument('--all-groups', action='store_true', help='Poll every metric group on every tick')
+    parser.add_argument('--output', type=str, default=None, help='Write results JSON to this file')
+    args = parser.parse_args()
+
+    with SimulatedNVML(args.gpus, 0):
+        monitor = GPUMonitor()
+        if args.all_groups:
+            monitor.collector = MetricsCollector({})
+        results = measure(monitor, args)
+
+    write_report(results, args.output,
+                 config={'gpus': args.gpus, 'ticks': args.ticks, 'all_groups': args.all_groups})
+
+
+if __name__ == '__main__':
+    main()
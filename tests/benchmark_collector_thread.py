@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+NVML collector thread benchmark
+Runs GPUMonitor.collect() against a simulated NVML (mock_nvml.SimulatedNVML,
+with the GIL released and calls serialized like the real library) and
+compares one run_in_executor hop per GPU on the default thread pool with the
+dedicated collector thread, reporting tick latency and process CPU time per
+tick for 1-16 GPUs. With --stall-gpu, one GPU's calls block (like a GPU
+that fell off the bus) and the tick latency seen by the healthy GPUs, the
+stale marking and the quarantine/re-probe cycle are reported
+"""
+
+import os
+import time
+import asyncio
+import argparse
+
+from bench_common import disable, write_report
+
+# 两种采集方式的 tick 只包含设备调用：关闭历史、汇总、事件线程和缓冲样本读取
+disable('HISTORY', 'ROLLUPS', 'NVML_EVENTS', 'NVML_SAMPLES')
+
+from core.metrics import MetricsCollector
+from core.monitor import GPUMonitor
+from core.worker import NvmlWorker
+from core.watchdog import DeviceWatchdog
+from mock_nvml import SimulatedNVML
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def measure(monitor, args):
+    for _ in range(args.warmup):
+        await monitor.collect()
+
+    latencies = []
+    cpu_started = time.process_time()
+    for _ in range(args.ticks):
+        started = time.perf_counter()
+        gpu_data, _ = await monitor.collect()
+        latencies.append(time.perf_counter() - started)
+        if args.interval:
+            await asyncio.sleep(args.interval)
+    cpu = time.process_time() - cpu_started
+
+    assert len(gpu_data) == len(monitor.devices)
+    return {
+        'tick_ms': {
+            'mean': round(sum(latencies) / len(latencies) * 1000, 3),
+            'p50': round(percentile(latencies, 50) * 1000, 3),
+            'p99': round(percentile(latencies, 99) * 1000, 3),
+        },
+        'cpu_ms_per_tick': round(cpu / args.ticks * 1000, 3),
+    }
+
+
+def run(gpus, mode, args):
+    # 每个 GPU 上一个计算进程（本进程），使进程元数据和主机资源路径也被测量
+    processes = {index: [os.getpid()] for index in range(gpus)}
+    with SimulatedNVML(gpus, args.latency_us, processes=processes, release_gil=True):
+        monitor = GPUMonitor()
+        # 每个 tick 轮询所有指标组（最坏情况）
+        monitor.collector = MetricsCollector({})
+        monitor.worker = NvmlWorker() if mode == 'collector_thread' else None
+        try:
+            return asyncio.run(measure(monitor, args))
+        finally:
+            if monitor.worker is not None:
+                monitor.worker.stop()
+
+
+async def measure_stalled(monitor, nvml, args):
+    """Stall one GPU after warmup, then release it and wait for the re-probe"""
+    stalled = str(args.stall_gpu)
+    for _ in range(args.warmup):
+        await monitor.collect()
+
+    nvml.stall(args.stall_gpu, args.stall_seconds)
+    latencies, stale_ticks = [], 0
+    for _ in range(args.ticks):
+        started = time.perf_counter()
+        gpu_data, _ = await monitor.collect()
+        latencies.append(time.perf_counter() - started)
+        stale_ticks += bool(gpu_data.get(stalled, {}).get('stale'))
+        await asyncio.sleep(args.interval)
+    quarantined = not monitor.watchdog.active(stalled)
+
+    nvml.stall(args.stall_gpu, 0)
+    recovery_started = time.perf_counter()
+    recovered_after = None
+    while time.perf_counter() - recovery_started < args.recovery_timeout:
+        gpu_data, _ = await monitor.collect()
+        if not gpu_data.get(stalled, {}).get('stale'):
+            recovered_after = round(time.perf_counter() - recovery_started, 2)
+            break
+        await asyncio.sleep(args.interval)
+
+    return {
+        'tick_ms': {
+            'mean': round(sum(latencies) / len(latencies) * 1000, 3),
+            'p50': round(percentile(latencies, 50) * 1000, 3),
+            'p99': round(percentile(latencies, 99) * 1000, 3),
+            'max': round(max(latencies) * 1000, 3),
+        },
+        'stale_ticks': stale_ticks,
+        'quarantined': quarantined,
+        'recovered_after_s': recovered_after,
+        'watchdog': monitor.watchdog.stats()['devices'][stalled],
+    }
+
+
+def run_stalled(gpus, args):
+    with SimulatedNVML(gpus, args.latency_us, release_gil=True) as nvml:
+        monitor = GPUMonitor()
+        monitor.worker = NvmlWorker()
+        monitor.watchdog = DeviceWatchdog(reprobe_min=args.reprobe_min)
+        try:
+            return asyncio.run(measure_stalled(monitor, nvml, args))
+        finally:
+            monitor.worker.stop(timeout=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='NVML collector thread vs default thread pool (simulated NVML)')
+    parser.add_argument('--gpus', type=int, nargs='+', default=[1, 2, 4, 8, 16], help='Simulated GPU counts')
+    parser.add_argument('--ticks', type=int, default=100, help='Measured ticks per run')
+    parser.add_argument('--warmup', type=int, default=5, help='Ticks before measuring')
+    parser.add_argument('--interval', type=float, default=0.0, help='Seconds to sleep between ticks')
+    parser.add_argument('--latency-us', type=float, default=20, help='Simulated latency of every NVML call')
+    parser.add_argument('--stall-gpu', type=int, default=None, help='Make this GPU index hang instead of comparing modes')
+    parser.add_argument('--stall-seconds', type=float, default=2.0, help='How long each call on the stalled GPU blocks')
+    parser.add_argument('--reprobe-min', type=float, default=0.5, help='Watchdog re-probe interval for --stall-gpu')
+    parser.add_argument('--recovery-timeout', type=float, default=30.0, help='Max seconds to wait for the stalled GPU to recover')
+    parser.add_argument('--output', type=str, default=None, help='Write results JSON to this file')
+    args = parser.parse_args()
+
+    results = {}
+    for gpus in args.gpus:
+        if args.stall_gpu is not None:
+            results[str(gpus)] = {'stalled': run_stalled(gpus, args)}
+        else:
+            results[str(gpus)] = {mode: run(gpus, mode, args) for mode in ('executor', 'collector_thread')}
+
+    write_report(results, args.output, config={
+        'ticks': args.ticks,
+        'interval': args.interval,
+        'latency_us': args.latency_us,
+        'stall_gpu': args.stall_gpu,
+    }, cpus=os.cpu_count())
+
+
+if __name__ == '__main__':
+    main()
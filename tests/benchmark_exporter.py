@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Prometheus exporter benchmark
+Collects one tick from a simulated NVML (mock_nvml.SimulatedNVML) through
+GPUMonitor, renders /metrics from it with PrometheusExporter and reports the
+render time (new snapshot vs cached), exposition size and series counts.
+Also checks that every exporter field the tick published with a numeric value
+(including numbers published as strings, like the PCIe link generation and
+width) appears in the output, and exits non-zero when one is missing
+"""
+
+import sys
+import time
+import argparse
+
+from bench_common import disable, write_report
+
+# 只渲染单个 tick：关闭历史、汇总、事件和采集线程
+disable('HISTORY', 'ROLLUPS', 'NVML_EVENTS', 'NVML_COLLECTOR_THREAD')
+
+from core.exporter import PrometheusExporter, GPU_METRICS
+from core.monitor import GPUMonitor
+from mock_nvml import SimulatedNVML
+
+
+def exported_value(value):
+    """The tick published a number for this field (possibly as a numeric string)"""
+    if isinstance(value, bool) or value is None:
+        return False
+    try:
+        return float(value) == float(value)
+    except (TypeError, ValueError):
+        return False
+
+
+def check_series(gpu_data, body):
+    """Fields with numeric values that have no sample line in the exposition"""
+    missing = set()
+    for field, metric, _, _ in GPU_METRICS:
+        for gpu_id, gpu in gpu_data.items():
+            if exported_value(gpu.get(field)) and f'{metric}{{' not in body:
+                missing.add(metric)
+    return sorted(missing)
+
+
+def measure(monitor, args):
+    gpu_data = {gpu_id: monitor._collect_device(gpu_id) for gpu_id, _ in monitor.devices.items()}
+    frame = {'mode': 'default', 'node_name': 'bench', 'gpus': gpu_data, 'processes': [],
+             'system': {'cpu_percent': 12.5, 'memory_percent': 40.0}}
+    static_info = monitor.get_static_info()
+    exporter = PrometheusExporter()
+
+    # 新快照：每次 update 换一个帧对象，强制重新渲染
+    started = time.perf_counter()
+    for _ in range(args.renders):
+        exporter.update(dict(frame), static_info)
+        body = exporter.render()
+    fresh = (time.perf_counter() - started) / args.renders
+
+    # 同一快照的后续抓取返回缓存的字节
+    started = time.perf_counter()
+    for _ in range(args.renders):
+        exporter.render()
+    cached = (time.perf_counter() - started) / args.renders
+
+    text = body.decode('utf-8')
+    samples = [line for line in text.splitlines() if line and not line.startswith('#')]
+    return {
+        'render_us': round(fresh * 1e6, 1),
+        'cached_render_us': round(cached * 1e6, 2),
+        'body_kib': round(len(body) / 1024, 2),
+        'gzip_kib': round(len(exporter.render(compress=True)) / 1024, 2),
+        'families': text.count('# TYPE '),
+        'series': len(samples),
+        'pcie_link_series': sum(line.startswith(('gpu_hot_pcie_link_gen{', 'gpu_hot_pcie_link_width{'))
+                                for line in samples),
+        'missing_series': check_series(gpu_data, text),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prometheus exporter render time and series check (simulated NVML)')
+    parser.add_argument('--gpus', type=int, default=8, help='Simulated GPUs')
+    parser.add_argument('--renders', type=int, default=200, help='Renders to average')
+    parser.add_argument('--output', type=str, default=None, help='Write results JSON to this file')
+    args = parser.parse_args()
+
+    with SimulatedNVML(args.gpus, 0):
+        results = measure(GPUMonitor(), args)
+
+    write_report(results, args.output, config={'gpus': args.gpus, 'renders': args.renders})
+    if results['missing_series']:
+        sys.exit(f"Missing series: {', '.join(results['missing_series'])}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Hub scalability benchmark
+Starts N mock nodes x M GPUs (test_cluster.MockGPUNode), a Hub in its own
+process (optionally sharded across --hub-workers worker processes) and K
+synthetic dashboard clients, then reports hub CPU, RSS, ingest rate and
+node-to-browser latency as JSON for comparing releases
+"""
+
+import time
+import json
+import asyncio
+import argparse
+import logging
+import multiprocessing
+
+import psutil
+import uvicorn
+import websockets
+from fastapi import FastAPI
+
+from bench_common import write_report
+from core.delta import DeltaDecoder, RESYNC_MESSAGE
+from core.binary import BinaryDecoder
+from test_cluster import MockGPUNode
+
+logger = logging.getLogger('benchmark_hub')
+
+
+def run_nodes(specs, log_level):
+    """Run a group of mock nodes in this process: specs = [(name, gpu_count, port)]"""
+    logging.getLogger().setLevel(log_level)
+
+    async def serve():
+        await asyncio.gather(*[MockGPUNode(name, gpus, port).run() for name, gpus, port in specs])
+
+    asyncio.run(serve())
+
+
+def run_hub(node_urls, port, node_protocol, workers, log_level):
+    """Run the hub in this process so its CPU and RSS can be measured alone"""
+    logging.getLogger().setLevel(log_level)
+
+    from core import config
+    from core.hub import Hub
+    from core.hub_shards import ShardedHub
+    from core.hub_handlers import register_hub_handlers
+
+    config.HUB_NODE_PROTOCOL = node_protocol
+    hub = ShardedHub(node_urls, workers) if workers else Hub(node_urls)
+    app = FastAPI()
+    register_hub_handlers(app, hub)
+    try:
+        uvicorn.run(app, host='127.0.0.1', port=port, log_level='warning', access_log=False)
+    finally:
+        if workers:
+            asyncio.run(hub.shutdown())
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class DashboardClient:
+    """Synthetic dashboard client that decodes hub frames and records latency"""
+
+    def __init__(self, url, protocol):
+        self.url = f'{url}/socket.io/?protocol={protocol}'
+        self.frames = 0
+        self.bytes = 0
+        self.updates = 0
+        self.latencies = []
+        self.last_sent = {}  # node_name -> last sent_at seen
+        self.measuring = False
+
+    async def run(self, stop):
+        delta = DeltaDecoder()
+        binary = BinaryDecoder()
+        async with websockets.connect(self.url, max_size=None) as websocket:
+            while not stop.is_set():
+                try:
+                    message = await asyncio.wait_for(websocket.recv(), timeout=1)
+                except asyncio.TimeoutError:
+                    continue
+                received_at = time.time()
+
+                if isinstance(message, bytes):
+                    data = binary.decode(message)
+                else:
+                    data = json.loads(message)
+                    if data.get('type') == 'binary_schema':
+                        binary.set_schema(data)
+                        continue
+                    data = delta.decode(data)
+                    if data is None:
+                        await websocket.send(RESYNC_MESSAGE)
+                        continue
+                if data is None or data.get('mode') != 'hub':
+                    continue
+
+                if self.measuring:
+                    self.frames += 1
+                    self.bytes += len(message)
+                self._record(data, received_at)
+
+    def _record(self, data, received_at):
+        """Count each new node sample once and measure its end-to-end latency"""
+        for node_name, node in data.get('nodes', {}).items():
+            sent_at = node.get('system', {}).get('sent_at')
+            if sent_at is None or self.last_sent.get(node_name) == sent_at:
+                continue
+            self.last_sent[node_name] = sent_at
+            if self.measuring:
+                self.updates += 1
+                self.latencies.append(received_at - sent_at)
+
+
+async def measure(hub_pid, hub_url, args):
+    """Attach clients, wait for warmup, then sample hub CPU/RSS over the window"""
+    stop = asyncio.Event()
+    clients = [DashboardClient(hub_url, args.protocol) for _ in range(args.clients)]
+    tasks = [asyncio.create_task(client.run(stop)) for client in clients]
+
+    await asyncio.sleep(args.warmup)
+
+    # 分片模式下 hub 的 CPU 和内存包括工作进程
+    hub = psutil.Process(hub_pid)
+    processes = [hub] + hub.children(recursive=True)
+    for process in processes:
+        process.cpu_percent(None)
+    rss = []
+    for client in clients:
+        client.measuring = True
+    started = time.monotonic()
+
+    while time.monotonic() - started < args.duration:
+        await asyncio.sleep(1)
+        rss.append(sum(process.memory_info().rss for process in processes))
+
+    elapsed = time.monotonic() - started
+    front_cpu = hub.cpu_percent(None)
+    cpu = front_cpu + sum(process.cpu_percent(None) for process in processes[1:])
+    for client in clients:
+        client.measuring = False
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    latencies = [latency for client in clients for latency in client.latencies]
+    frames = sum(client.frames for client in clients)
+    updates = sum(client.updates for client in clients)
+    expected = args.nodes * args.clients * elapsed / args.node_interval
+
+    return {
+        'hub_cpu_percent': round(cpu, 1),
+        'hub_front_cpu_percent': round(front_cpu, 1),
+        'hub_processes': len(processes),
+        'hub_rss_mb': round(max(rss) / 1024 ** 2, 1) if rss else None,
+        'ingest_rate': round(updates / args.clients / elapsed, 1) if args.clients else None,
+        'ingest_ratio': round(updates / expected, 3) if expected else None,
+        'frames_per_client_per_s': round(frames / args.clients / elapsed, 2) if args.clients else None,
+        'bytes_per_client_per_s': round(sum(c.bytes for c in clients) / args.clients / elapsed) if args.clients else None,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+            'p99': round(percentile(latencies, 99) * 1000, 1) if latencies else None,
+            'max': round(max(latencies) * 1000, 1) if latencies else None,
+            'samples': len(latencies),
+        },
+        'duration_s': round(elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hub scalability benchmark')
+    parser.add_argument('--nodes', type=int, default=20, help='Number of mock nodes')
+    parser.add_argument('--gpus', type=int, default=8, help='GPUs per mock node')
+    parser.add_argument('--clients', type=int, default=5, help='Synthetic dashboard clients')
+    parser.add_argument('--node-procs', type=int, default=2, help='Processes to spread mock nodes across')
+    parser.add_argument('--protocol', default='json', choices=['json', 'delta', 'binary'],
+                        help='Hub -> dashboard protocol')
+    parser.add_argument('--node-protocol', default='binary', choices=['json', 'delta', 'binary'],
+                        help='Node -> hub protocol')
+    parser.add_argument('--hub-workers', type=int, default=0,
+                        help='Sharded hub worker processes (0 = single-process hub)')
+    parser.add_argument('--duration', type=float, default=20, help='Measurement window in seconds')
+    parser.add_argument('--warmup', type=float, default=8, help='Seconds before measuring (hub waits 2s before connecting)')
+    parser.add_argument('--base-port', type=int, default=14120, help='Base port for mock nodes')
+    parser.add_argument('--hub-port', type=int, default=14100, help='Hub port')
+    parser.add_argument('--output', type=str, default=None, help='Write results JSON to this file')
+    args = parser.parse_args()
+    args.node_interval = 0.5  # MockGPUNode broadcast interval
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(message)s')
+
+    specs = [(f'bench-node-{i + 1}', args.gpus, args.base_port + i) for i in range(args.nodes)]
+    node_urls = [f'http://127.0.0.1:{port}' for _, _, port in specs]
+    groups = [specs[i::args.node_procs] for i in range(args.node_procs)]
+
+    processes = [
+        multiprocessing.Process(target=run_nodes, args=(group, logging.WARNING), daemon=True)
+        for group in groups if group
+    ]
+    hub_process = multiprocessing.Process(
+        target=run_hub, args=(node_urls, args.hub_port, args.node_protocol, args.hub_workers, logging.WARNING),
+        daemon=True
+    )
+    for process in processes:
+        process.start()
+    time.sleep(1)
+    hub_process.start()
+    time.sleep(1)
+
+    try:
+        results = asyncio.run(measure(hub_process.pid, f'ws://127.0.0.1:{args.hub_port}', args))
+    finally:
+        for process in processes + [hub_process]:
+            process.terminate()
+
+    write_report(results, args.output, config={
+        'nodes': args.nodes,
+        'gpus_per_node': args.gpus,
+        'clients': args.clients,
+        'protocol': args.protocol,
+        'node_protocol': args.node_protocol,
+        'hub_workers': args.hub_workers,
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+NVML collection benchmark
+Runs MetricsCollector against a simulated NVML (mock_nvml.SimulatedNVML) and
+reports NVML calls and collection latency per tick, comparing per-metric calls
+with batched nvmlDeviceGetFieldValues reads, and the per-device capability map
+(unsupported calls skipped) with re-trying every unsupported call on every tick
+"""
+
+import time
+import argparse
+from types import SimpleNamespace
+
+from bench_common import write_report
+from core.metrics import sample as sample_module
+from core.metrics import MetricsCollector
+from core.metrics.capabilities import CapabilityMap
+from mock_nvml import SimulatedNVML
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_mode(args, field_values, driver_field_values, capabilities=True):
+    """Collect args.ticks ticks from args.gpus simulated GPUs, return per-tick stats"""
+    nvml = SimulatedNVML(args.gpus, args.latency_us, field_values=driver_field_values)
+    clock = SimpleNamespace(now=1_000_000.0)
+    saved_time = sample_module.time
+    # 模拟的时钟：每个 tick 前进 interval 秒，使分组轮询间隔按真实节奏生效
+    sample_module.time = SimpleNamespace(time_ns=lambda: int(clock.now * 1e9),
+                                         monotonic_ns=lambda: int(clock.now * 1e9))
+
+    try:
+        with nvml:
+            # refresh_interval=0: 每次采集都重建能力表，即每个 tick 重试所有不支持的调用
+            collector = MetricsCollector({} if args.all_groups else None, field_values=field_values,
+                                         capabilities=None if capabilities else CapabilityMap(refresh_interval=0))
+            handles = [nvml_handle for nvml_handle in range(1, args.gpus + 1)]
+
+            # 预热：静态信息探测和不支持字段的探测不计入结果
+            for tick in range(args.warmup):
+                for index, handle in enumerate(handles):
+                    collector.collect_all(handle, str(index)).to_dict()
+                clock.now += args.interval
+                nvml.advance()
+
+            nvml.reset_counts()
+            latencies = []
+            for tick in range(args.ticks):
+                started = time.perf_counter()
+                for index, handle in enumerate(handles):
+                    collector.collect_all(handle, str(index)).to_dict()
+                latencies.append(time.perf_counter() - started)
+                clock.now += args.interval
+                nvml.advance()
+    finally:
+        sample_module.time = saved_time
+
+    ticks_gpus = args.ticks * args.gpus
+    return {
+        'calls_per_gpu_per_tick': round(nvml.total_calls() / ticks_gpus, 2),
+        'tick_ms': {
+            'mean': round(sum(latencies) / len(latencies) * 1000, 3),
+            'p50': round(percentile(latencies, 50) * 1000, 3),
+            'p99': round(percentile(latencies, 99) * 1000, 3),
+        },
+        'top_calls': {
+            name: round(count / ticks_gpus, 2) for name, count in nvml.calls.most_common(args.top)
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='NVML collection benchmark (simulated NVML)')
+    parser.add_argument('--gpus', type=int, default=8, help='Simulated GPUs')
+    parser.add_argument('--ticks', type=int, default=240, help='Measured ticks')
+    parser.add_argument('--warmup', type=int, default=4, help='Ticks before measuring')
+    parser.add_argument('--interval', type=float, default=0.5, help='Simulated seconds between ticks')
+    parser.add_argument('--latency-us', type=float, default=50, help='Simulated latency of every NVML call')
+    parser.add_argument('--all-groups', action='store_true', help='Poll every metric group on every tick')
+    parser.add_argument('--top', type=int, default=8, help='Most frequent calls to list per mode')
+    parser.add_argument('--output', type=str, default=None, help='Write results JSON to this file')
+    args = parser.parse_args()
+
+    results = {
+        'per_metric_calls': run_mode(args, field_values=False, driver_field_values=True),
+        'field_values': run_mode(args, field_values=True, driver_field_values=True),
+        'field_values_unsupported_driver': run_mode(args, field_values=True, driver_field_values=False),
+        'field_values_no_capability_map': run_mode(args, field_values=True, driver_field_values=True,
+                                                   capabilities=False),
+    }
+
+    write_report(results, args.output, config={
+        'gpus': args.gpus,
+        'ticks': args.ticks,
+        'interval': args.interval,
+        'latency_us': args.latency_us,
+        'all_groups': args.all_groups,
+    })
+
+
+if __name__ == '__main__':
+    main()
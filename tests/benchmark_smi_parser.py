@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+nvidia-smi parser microbenchmark
+Parses canned `nvidia-smi --query-gpu ... --format=csv,noheader,nounits`
+outputs for the full and basic field sets and reports time per output and
+per line
+"""
+
+import timeit
+import argparse
+
+from bench_common import write_report
+from core.nvidia_smi_fallback import FULL_SCHEMA, BASIC_SCHEMA
+
+# Sample values per query field, as printed with nounits (a few N/A like real boards)
+SAMPLE_VALUES = {
+    'name': 'NVIDIA H100 80GB HBM3',
+    'uuid': 'GPU-3f9a1c2e-7b4d-4e8f-9a6b-{index:012d}',
+    'driver_version': '550.54.15',
+    'vbios_version': '96.00.74.00.01',
+    'temperature.gpu': '{temp}',
+    'utilization.gpu': '{util}',
+    'utilization.memory': '{mem_util}',
+    'memory.used': '61234',
+    'memory.total': '81559',
+    'memory.free': '20325',
+    'power.draw': '512.34',
+    'power.limit': '700.00',
+    'fan.speed': '[N/A]',
+    'clocks.gr': '1980',
+    'clocks.sm': '1980',
+    'clocks.mem': '2619',
+    'clocks.max.gr': '1980',
+    'clocks.max.sm': '1980',
+    'clocks.max.mem': '2619',
+    'pcie.link.gen.current': '5',
+    'pcie.link.gen.max': '5',
+    'pcie.link.width.current': '16',
+    'pcie.link.width.max': '16',
+    'encoder.stats.sessionCount': '0',
+    'encoder.stats.averageFps': '0',
+    'encoder.stats.averageLatency': '0',
+    'pstate': 'P0',
+    'compute_mode': 'Default',
+}
+
+
+def canned_output(schema, gpus):
+    lines = []
+    for index in range(gpus):
+        values = {'index': index, 'temp': 40 + index, 'util': (index * 13) % 100, 'mem_util': (index * 7) % 100}
+        row = [str(index) if name == 'index' else SAMPLE_VALUES.get(name, 'N/A').format(**values)
+               for name, _, _, _ in schema.fields]
+        lines.append(', '.join(row))
+    return '\n'.join(lines) + '\n'
+
+
+def measure(schema, gpus, repeat):
+    output = canned_output(schema, gpus)
+    assert len(schema.parse(output)) == gpus
+    seconds = min(timeit.repeat(lambda: schema.parse(output), number=repeat, repeat=5)) / repeat
+    return {
+        'us_per_output': round(seconds * 1e6, 2),
+        'us_per_line': round(seconds * 1e6 / gpus, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='nvidia-smi CSV parser microbenchmark')
+    parser.add_argument('--gpus', type=int, nargs='+', default=[8, 16], help='GPU counts to parse')
+    parser.add_argument('--repeat', type=int, default=2000, help='Parses per timing run')
+    parser.add_argument('--output', type=str, default=None, help='Write results JSON to this file')
+    args = parser.parse_args()
+
+    results = {}
+    for name, schema in (('full', FULL_SCHEMA), ('basic', BASIC_SCHEMA)):
+        results[name] = {
+            'fields': len(schema.fields),
+            'gpus': {str(gpus): measure(schema, gpus, args.repeat) for gpus in args.gpus},
+        }
+
+    write_report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
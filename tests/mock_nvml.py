@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Simulated NVML for benchmarks
+Patches the pynvml functions used by core.metrics with fakes that return
+plausible values, count every call and spend a fixed latency per call, so
+collection strategies can be compared without GPUs
+"""
+
+import time
+import threading
+from collections import Counter
+from ctypes import c_int64
+from types import SimpleNamespace
+
+import pynvml
+
+NOT_SUPPORTED = pynvml.NVML_ERROR_NOT_SUPPORTED
+
+SAMPLE_PERIOD_US = 100_000  # driver sampling period for nvmlDeviceGetSamples
+
+# field id -> (valueType, member, value)
+FIELD_VALUES = {
+    getattr(pynvml, 'NVML_FI_DEV_POWER_AVERAGE', 185): (1, 'uiVal', 310000),
+    getattr(pynvml, 'NVML_FI_DEV_POWER_CURRENT_LIMIT', 190): (1, 'uiVal', 700000),
+    getattr(pynvml, 'NVML_FI_DEV_TOTAL_ENERGY_CONSUMPTION', 83): (3, 'ullVal', 123456789),
+    getattr(pynvml, 'NVML_FI_DEV_MEMORY_TEMP', 82): (1, 'uiVal', 62),
+    getattr(pynvml, 'NVML_FI_DEV_PCIE_REPLAY_COUNTER', 94): (1, 'uiVal', 0),
+    getattr(pynvml, 'NVML_FI_DEV_NVLINK_THROUGHPUT_DATA_TX', 138): (3, 'ullVal', 10 ** 9),
+    getattr(pynvml, 'NVML_FI_DEV_NVLINK_THROUGHPUT_DATA_RX', 139): (3, 'ullVal', 10 ** 9),
+    getattr(pynvml, 'NVML_FI_DEV_ECC_SBE_VOL_TOTAL', 3): (3, 'ullVal', 0),
+    getattr(pynvml, 'NVML_FI_DEV_RETIRED_DBE', 30): (1, 'uiVal', 0),
+}
+
+
+class SimulatedNVML:
+    """Fake NVML device set: install() patches pynvml, uninstall() restores it
+
+    latency_us is spent (busy-waiting, for precision) inside every call.
+    release_gil=True instead sleeps while holding one process-wide lock, like a
+    real NVML call: ctypes releases the GIL and the library serializes calls.
+    stall(index, seconds) makes every device call on one GPU block, like a GPU
+    that has fallen off the bus.
+    field_values=False simulates a driver without nvmlDeviceGetFieldValues.
+    processes maps a GPU index to the PIDs reported as compute processes.
+    """
+
+    def __init__(self, gpu_count=8, latency_us=50, field_values=True, nvlinks=4, processes=None,
+                 release_gil=False):
+        self.gpu_count = gpu_count
+        self.processes = processes or {}  # GPU 索引 -> 在该 GPU 上运行的 PID 列表
+        self.latency = latency_us / 1e6
+        self.field_values = field_values
+        self.nvlinks = nvlinks
+        self.release_gil = release_gil
+        self.calls = Counter()
+        self._library_lock = threading.Lock()
+        self._stalled = {}  # handle -> seconds each device call blocks
+        self._saved = {}
+        self._tick = 0
+
+    # --- plumbing ---
+
+    def _spend(self):
+        if self.latency and self.release_gil:
+            with self._library_lock:
+                time.sleep(self.latency)
+        elif self.latency:
+            deadline = time.perf_counter() + self.latency
+            while time.perf_counter() < deadline:
+                pass
+
+    def _wrap(self, name, func):
+        device_call = name.startswith('nvmlDevice') and name not in ('nvmlDeviceGetCount', 'nvmlDeviceGetHandleByIndex')
+
+        def call(*args):
+            self.calls[name] += 1
+            if device_call and args and args[0] in self._stalled:
+                time.sleep(self._stalled[args[0]])
+            self._spend()
+            return func(*args)
+        # 与 pynvml 的函数同名（能力表按函数名记录不支持的调用）
+        call.__name__ = name
+        return call
+
+    def install(self):
+        for name, func in self._functions().items():
+            self._saved[name] = getattr(pynvml, name, None)
+            setattr(pynvml, name, self._wrap(name, func))
+        return self
+
+    def uninstall(self):
+        for name, func in self._saved.items():
+            if func is None:
+                delattr(pynvml, name)
+            else:
+                setattr(pynvml, name, func)
+        self._saved.clear()
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc):
+        self.uninstall()
+
+    def reset_counts(self):
+        self.calls.clear()
+
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def stall(self, index, seconds):
+        """Block every device call on GPU index for seconds (0 to recover)"""
+        if seconds:
+            self._stalled[index + 1] = seconds
+        else:
+            self._stalled.pop(index + 1, None)
+
+    def advance(self):
+        """Move the simulated workload forward one tick"""
+        self._tick += 1
+
+    # --- fake device API ---
+
+    @staticmethod
+    def _unsupported(*args):
+        raise pynvml.NVMLError(NOT_SUPPORTED)
+
+    def _field_values(self, handle, field_ids):
+        if not self.field_values:
+            raise pynvml.NVMLError(pynvml.NVML_ERROR_FUNCTION_NOT_FOUND)
+        values = (pynvml.c_nvmlFieldValue_t * len(field_ids))()
+        for value, (field_id, scope) in zip(values, field_ids):
+            value.fieldId = field_id
+            value.scopeId = scope
+            value.timestamp = c_int64(int(time.time() * 1e6))
+            if field_id in FIELD_VALUES:
+                value_type, member, number = FIELD_VALUES[field_id]
+                value.valueType = value_type
+                setattr(value.value, member, number)
+                value.nvmlReturn = pynvml.NVML_SUCCESS
+            else:
+                value.nvmlReturn = NOT_SUPPORTED
+        return values
+
+    def _nvlink_state(self, handle, link):
+        if link >= self.nvlinks:
+            raise pynvml.NVMLError(NOT_SUPPORTED)
+        return 1
+
+    def _running_processes(self, handle):
+        return [SimpleNamespace(pid=pid, usedGpuMemory=(1 + pid % 8) * 1024 ** 3)
+                for pid in self.processes.get(handle - 1, [])]
+
+    def _process_utilization(self, handle, since):
+        now = int(time.time() * 1e6)
+        pids = self.processes.get(handle - 1, [])
+        if not pids or now <= since:
+            raise pynvml.NVMLError(pynvml.NVML_ERROR_NOT_FOUND)
+        return [SimpleNamespace(pid=pid, timeStamp=now, smUtil=(pid + self._tick) % 100,
+                                memUtil=(pid + self._tick) % 50, encUtil=0, decUtil=0) for pid in pids]
+
+    def _samples(self, handle, sampling_type, since):
+        """Driver sample buffer: one sample every SAMPLE_PERIOD_US, last 120 kept"""
+        now = int(time.time() * 1e6)
+        first = max(since // SAMPLE_PERIOD_US + 1, now // SAMPLE_PERIOD_US - 119)
+        stamps = range(first * SAMPLE_PERIOD_US, now + 1, SAMPLE_PERIOD_US)
+        if not stamps:
+            raise pynvml.NVMLError(pynvml.NVML_ERROR_NOT_FOUND)
+        samples = (pynvml.c_nvmlSample_t * len(stamps))()
+        for sample, stamp in zip(samples, stamps):
+            sample.timeStamp = stamp
+            # a short spike every 2s on top of the utilization pattern
+            spike = 40 if stamp // SAMPLE_PERIOD_US % 20 == 0 else 0
+            sample.sampleValue.uiVal = min(100, 50 + handle % 10 + spike) \
+                if sampling_type != pynvml.NVML_TOTAL_POWER_SAMPLES else 300000 + spike * 5000
+        return 1, samples
+
+    def _utilization(self, handle):
+        busy = 60 + (handle * 7 + self._tick) % 40
+        return SimpleNamespace(gpu=busy, memory=busy // 2)
+
+    def _functions(self):
+        mib = 1024 ** 2
+        return {
+            'nvmlInit': lambda: None,
+            'nvmlShutdown': lambda: None,
+            'nvmlDeviceGetCount': lambda: self.gpu_count,
+            'nvmlDeviceGetHandleByIndex': lambda index: index + 1,  # non-zero, like real handles
+            'nvmlSystemGetDriverVersion': lambda: '550.54.15',
+            'nvmlDeviceGetName': lambda h: 'NVIDIA H100 80GB HBM3',
+            'nvmlDeviceGetUUID': lambda h: f'GPU-00000000-0000-0000-0000-{h:012d}',
+            'nvmlDeviceGetVbiosVersion': lambda h: '96.00.74.00.01',
+            'nvmlDeviceGetBrand': lambda h: 3,
+            'nvmlDeviceGetArchitecture': lambda h: 7,
+            'nvmlDeviceGetCudaComputeCapability': lambda h: (9, 0),
+            'nvmlDeviceGetSerial': lambda h: f'165{h:010d}',
+            'nvmlDeviceGetPowerManagementLimitConstraints': lambda h: (200000, 700000),
+            'nvmlDeviceGetMultiGpuBoard': lambda h: 0,
+            'nvmlDeviceGetUtilizationRates': self._utilization,
+            'nvmlDeviceGetPerformanceState': lambda h: 0,
+            'nvmlDeviceGetComputeMode': lambda h: 0,
+            'nvmlDeviceGetMemoryInfo': lambda h: SimpleNamespace(
+                used=(20000 + self._tick % 100) * mib, total=81559 * mib, free=(61559 - self._tick % 100) * mib),
+            'nvmlDeviceGetBAR1MemoryInfo': lambda h: SimpleNamespace(bar1Used=5 * mib, bar1Total=131072 * mib),
+            'nvmlDeviceGetTemperature': lambda h, sensor: 55 + h % 5 if sensor == pynvml.NVML_TEMPERATURE_GPU else 62,
+            'nvmlDeviceGetPowerUsage': lambda h: 310000,
+            'nvmlDeviceGetPowerManagementLimit': lambda h: 700000,
+            'nvmlDeviceGetTotalEnergyConsumption': lambda h: 123456789,
+            'nvmlDeviceGetFanSpeed': self._unsupported,
+            'nvmlDeviceGetNumFans': lambda h: 0,
+            'nvmlDeviceGetFanSpeed_v2': self._unsupported,
+            'nvmlDeviceGetCurrentClocksThrottleReasons': lambda h: 0,
+            'nvmlDeviceGetClockInfo': lambda h, clock: 1980,
+            'nvmlDeviceGetApplicationsClock': lambda h, clock: 1755,
+            'nvmlDeviceGetMaxClockInfo': lambda h, clock: 1980,
+            'nvmlDeviceGetDefaultApplicationsClock': lambda h, clock: 1755,
+            'nvmlDeviceGetSupportedMemoryClocks': lambda h: [2619],
+            'nvmlDeviceGetCurrPcieLinkGeneration': lambda h: 5,
+            'nvmlDeviceGetCurrPcieLinkWidth': lambda h: 16,
+            'nvmlDeviceGetPcieThroughput': lambda h, counter: 1024,
+            'nvmlDeviceGetMaxPcieLinkGeneration': lambda h: 5,
+            'nvmlDeviceGetMaxPcieLinkWidth': lambda h: 16,
+            'nvmlDeviceGetPciInfo': lambda h: SimpleNamespace(busId=f'00000000:{h + 0x18:02X}:00.0'.encode()),
+            'nvmlDeviceGetEncoderUtilization': lambda h: (0, 167000),
+            'nvmlDeviceGetEncoderSessions': lambda h: [],
+            'nvmlDeviceGetDecoderUtilization': lambda h: (0, 167000),
+            'nvmlDeviceGetDecoderSessions': lambda h: [],
+            'nvmlDeviceGetEccMode': lambda h: (1, 1),
+            'nvmlDeviceGetTotalEccErrors': lambda h, error_type, counter: 0,
+            'nvmlDeviceGetRetiredPages': lambda h, cause: [],
+            'nvmlDeviceGetPersistenceMode': lambda h: 1,
+            'nvmlDeviceGetDisplayActive': lambda h: 0,
+            'nvmlDeviceGetGraphicsRunningProcesses': lambda h: [],
+            'nvmlDeviceGetComputeRunningProcesses': self._running_processes,
+            'nvmlDeviceGetProcessUtilization': self._process_utilization,
+            'nvmlDeviceGetMigMode': lambda h: (0, 0),
+            'nvmlDeviceGetNvLinkState': self._nvlink_state,
+            'nvmlDeviceGetNvLinkCapability': lambda h, link, cap: 1,
+            'nvmlDeviceGetFieldValues': self._field_values,
+            'nvmlDeviceGetSamples': self._samples,
+        }
@@ -14,6 +14,15 @@ import logging
 from fastapi import FastAPI, WebSocket
 import uvicorn
 
+try:
+    # Speak the same frame protocols as real nodes when core is importable (benchmark_hub.py)
+    from core.broadcast import Broadcaster
+    from core.delta import RESYNC_MESSAGE
+except ImportError:
+    # Standalone (tests/Dockerfile.test): plain JSON frames only
+    Broadcaster = None
+    RESYNC_MESSAGE = None
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(message)s')
 logger = logging.getLogger(__name__)
 
@@ -27,6 +36,7 @@ class MockGPUNode:
         self.port = port
         self.app = FastAPI(title=f"Mock GPU Node {node_name}")
         self.websocket_connections = set()
+        self.broadcaster = Broadcaster() if Broadcaster else None
         self.broadcasting = False
         
         # Initialize per-GPU state for realistic patterns
@@ -153,7 +163,8 @@ class MockGPUNode:
             'cpu_percent': round(random.gauss(15 + avg_gpu_util * 0.3, 5), 1),
             'memory_percent': round(random.gauss(60, 10), 1),
             'memory_used': round(random.gauss(80, 15), 1),
-            'memory_total': 128.0
+            'memory_total': 128.0,
+            'sent_at': time.time()  # Used by benchmark_hub.py to measure node-to-browser latency
         }
         
         return {
@@ -169,8 +180,11 @@ class MockGPUNode:
             try:
                 data = self.generate_gpu_data()
                 
+                if self.broadcaster is not None:
+                    self.broadcaster.broadcast(data)
+                
                 # Send to all connected clients
-                if self.websocket_connections:
+                elif self.websocket_connections:
                     disconnected = set()
                     for websocket in self.websocket_connections:
                         try:
@@ -191,7 +205,10 @@ class MockGPUNode:
         @self.app.websocket("/socket.io/")
         async def websocket_endpoint(websocket: WebSocket):
             await websocket.accept()
-            self.websocket_connections.add(websocket)
+            if self.broadcaster is not None:
+                self.broadcaster.add(websocket, websocket.query_params.get('protocol', 'json'))
+            else:
+                self.websocket_connections.add(websocket)
             logger.info(f'[{self.node_name}] Client connected')
             
             # Start broadcasting when first client connects
@@ -202,10 +219,13 @@ class MockGPUNode:
             try:
                 # Keep connection alive
                 while True:
-                    await websocket.receive_text()
+                    if await websocket.receive_text() == RESYNC_MESSAGE and self.broadcaster is not None:
+                        self.broadcaster.request_keyframe(websocket)
             except Exception as e:
                 logger.debug(f'[{self.node_name}] Client disconnected: {e}')
             finally:
+                if self.broadcaster is not None:
+                    self.broadcaster.remove(websocket)
                 self.websocket_connections.discard(websocket)
     
     async def run(self):